@@ -0,0 +1,217 @@
+"""
+Run reports for many teams without the HTTP server.
+
+Meant for cron: one process logs in to Bugzilla once, runs the selected
+reports for every team in parallel over shared connection pools, posts one
+Chat message per team, and writes the results as JSON. Reports that are the
+same for every team (current_day, open_prs) are fetched once.
+
+A timing summary is printed to stderr. The exit code is 0 when every report
+ran and every message was delivered, 1 when any report or delivery failed,
+and 2 for invalid arguments or Chat configuration.
+
+Usage:
+    python -m app.cli --teams OS,POS --reports priority,sla_missed
+    python -m app.cli --teams OS --skip-chat --output-dir reports/
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Routers read their configuration at import time
+load_dotenv()
+
+from app.log import configure_logging
+
+# Log records go to stderr, leaving stdout for the JSON results
+configure_logging()
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.routers import bugzilla
+from app.routers.reports import (
+    DEFAULT_DIGEST_REPORTS,
+    DIGEST_REPORTS,
+    SHARED_REPORTS,
+    build_digest,
+    login_for_reports,
+    parse_report_names,
+    run_reports
+)
+from app.services.google_chat import CHAT_DIGEST_WINDOW_SECONDS, GoogleChatService, get_digest_batcher, resolve_webhooks
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--teams", default="OS", help="Comma-separated teams (default OS)")
+    parser.add_argument("--reports", default=DEFAULT_DIGEST_REPORTS,
+                        help=f"Comma-separated reports out of {', '.join(DIGEST_REPORTS)} (default {DEFAULT_DIGEST_REPORTS})")
+    parser.add_argument("--days", type=int, default=3, help="Look-back for sla_missed (default 3)")
+    parser.add_argument("--authors", help="Comma-separated author filter for open_prs")
+    parser.add_argument("--max-bugs", type=int, help="Stop reading each bug list after this many bugs")
+    freshness = parser.add_mutually_exclusive_group()
+    freshness.add_argument("--refresh", dest="use_cache", action="store_false", default=False,
+                           help="Fetch every report from the upstreams (default)")
+    freshness.add_argument("--use-cache", dest="use_cache", action="store_true",
+                           help="Reuse cached reports younger than REPORT_FRESH_SECONDS; older ones are still fetched")
+    parser.add_argument("--parallel", type=int, default=4, help="Teams run at the same time (default 4)")
+    parser.add_argument("--webhook", action="append", help="Google Chat webhook URL; repeat for several spaces")
+    parser.add_argument("--webhook-group", help="Named target group from GOOGLE_CHAT_WEBHOOK_GROUPS")
+    parser.add_argument("--skip-chat", action="store_true", help="Do not post to Google Chat")
+    parser.add_argument("--send-now", action="store_true", help="Post immediately even when digest batching is enabled")
+    parser.add_argument("--output", help="Write all results to this JSON file instead of stdout")
+    parser.add_argument("--output-dir", help="Write one <team>.json file per team to this directory instead of stdout")
+    args = parser.parse_args(argv)
+    if args.max_bugs is not None and args.max_bugs < 1:
+        parser.error("--max-bugs must be at least 1")
+    if args.parallel < 1:
+        parser.error("--parallel must be at least 1")
+    return args
+
+
+async def run_team(
+    args,
+    team: str,
+    selected: List[str],
+    session: Any,
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """Run the reports that depend on the team"""
+    async with semaphore:
+        started = time.perf_counter()
+        # Stale results are never served: a background refresh would die with the process
+        results = await run_reports(
+            [name for name in selected if name not in SHARED_REPORTS],
+            team, args.days, args.authors, session, not args.use_cache, args.max_bugs, True
+        )
+        return {"team": team, "reports": results, "took_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+async def post_team(outcome: Dict[str, Any], chat_service: GoogleChatService, send_now: bool) -> None:
+    """Post the team's reports as one message, like /reports/digest"""
+    message, urgent = build_digest(chat_service, outcome["reports"], outcome["team"])
+    outcome["posted_to_chat"] = False
+    if message:
+        outcome["deliveries"] = await run_in_threadpool(chat_service.deliver, message, send_now or urgent)
+        outcome["posted_to_chat"] = True
+
+
+async def run(args, teams: List[str], selected: List[str], chat_service: Optional[GoogleChatService]) -> Dict[str, Any]:
+    session, login_error = await login_for_reports(selected)
+    semaphore = asyncio.Semaphore(args.parallel)
+
+    # Team-independent reports run once, alongside the per-team ones
+    shared = [name for name in selected if name in SHARED_REPORTS]
+    shared_results, *outcomes = await asyncio.gather(
+        run_reports(shared, teams[0], args.days, args.authors, session, not args.use_cache, args.max_bugs, True),
+        *(run_team(args, team, selected, session, semaphore) for team in teams)
+    )
+
+    for outcome in outcomes:
+        results = dict(outcome["reports"], **shared_results)
+        outcome["reports"] = {name: results[name] for name in selected}
+        failed = [name for name, result in outcome["reports"].items() if "error" in result]
+        outcome["status"] = "partial" if failed else "success"
+        if chat_service is not None:
+            await post_team(outcome, chat_service, args.send_now)
+
+    summary = {"outcomes": outcomes, "login_error": login_error, "flushed": []}
+    # A one-shot run cannot wait for the digest window; post queued batches now,
+    # which still merges the teams' messages per webhook
+    if chat_service is not None and CHAT_DIGEST_WINDOW_SECONDS > 0:
+        summary["flushed"] = await run_in_threadpool(get_digest_batcher().flush_all)
+    return summary
+
+
+def delivery_failed(delivery: Dict[str, Any]) -> bool:
+    return not (delivery["delivered"] or delivery.get("queued"))
+
+
+def print_timing(outcomes: List[Dict[str, Any]], elapsed: float) -> None:
+    print(f"{'team':<12} {'report':<14} {'status':<8} {'ms':>9}", file=sys.stderr)
+    failures = 0
+    for outcome in outcomes:
+        for name, result in outcome["reports"].items():
+            status = "failed" if "error" in result else ("stale" if result.get("stale") else "ok")
+            failures += status == "failed"
+            print(f"{outcome['team']:<12} {name:<14} {status:<8} {result['duration_ms']:>9.1f}", file=sys.stderr)
+    reports = sum(len(outcome["reports"]) for outcome in outcomes)
+    print(f"{len(outcomes)} teams, {reports} reports, {failures} failed in {elapsed:.2f}s", file=sys.stderr)
+
+
+def write_results(args, summary: Dict[str, Any]) -> None:
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for outcome in summary["outcomes"]:
+            path = os.path.join(args.output_dir, f"{outcome['team']}.json")
+            with open(path, "w") as f:
+                json.dump(outcome, f, indent=2, default=str)
+                f.write("\n")
+        print(f"Results written to {args.output_dir}", file=sys.stderr)
+        return
+
+    output = json.dumps(summary, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    teams = list(dict.fromkeys(team.strip() for team in args.teams.split(",") if team.strip()))
+    if not teams:
+        print("No teams given", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        selected = parse_report_names(args.reports)
+        chat_service = None
+        if not args.skip_chat:
+            chat_urls, _ = resolve_webhooks(args.webhook, args.webhook_group, bugzilla.GOOGLE_CHAT_WEBHOOK)
+            chat_service = GoogleChatService(chat_urls, bugzilla.BUGZILLA_URL)
+    except HTTPException as he:
+        print(he.detail, file=sys.stderr)
+        return EXIT_USAGE
+
+    started = time.time()
+    summary = asyncio.run(run(args, teams, selected, chat_service))
+    elapsed = time.time() - started
+    summary = {
+        "status": "success",
+        "started_at": int(started),
+        "took_ms": round(elapsed * 1000, 1),
+        **summary
+    }
+
+    failed = any(
+        "error" in result
+        for outcome in summary["outcomes"]
+        for result in outcome["reports"].values()
+    ) or any(
+        delivery_failed(delivery)
+        for outcome in summary["outcomes"]
+        for delivery in outcome.get("deliveries", [])
+    ) or any(delivery_failed(delivery) for delivery in summary["flushed"])
+    summary["status"] = "partial" if failed else "success"
+
+    write_results(args, summary)
+    print_timing(summary["outcomes"], elapsed)
+    # Non-zero exit when anything failed, so cron can alert on it
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.jobs import JOB_QUEUE_LIMIT, JOB_WORKERS, current_job, get_job_store, job_key
+from app.services.profiler import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# GET routes under these prefixes accept async=true
+JOB_PATH_PREFIXES = ("/bugzilla/", "/bitbucket/", "/reports/")
+
+
+def decode_result(headers: List, body: bytes) -> Any:
+    """Decode a captured response body, keeping non-JSON bodies as text"""
+    content_type = dict(headers).get(b"content-type", b"")
+    if content_type.startswith(b"application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode(errors="replace")
+
+
+class AsyncJobMiddleware:
+    """
+    Run report requests as background jobs on demand
+
+    A GET report request with `async=true` is answered at once with 202 and
+    a job id. The request itself then runs through the app in the
+    background, at most JOB_WORKERS at a time per worker, and its response
+    becomes the job's result at /jobs/{id}. While an identical request
+    (same path and query) is queued or running, it gets the existing job's
+    id instead of starting another run.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or b"async=" not in scope.get("query_string", b"")
+            or not scope["path"].startswith(JOB_PATH_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qsl(scope["query_string"].decode(), keep_blank_values=True)
+        flag = [value for name, value in query if name == "async"]
+        if not flag or flag[-1].lower() not in ("1", "true", "yes"):
+            await self.app(scope, receive, send)
+            return
+
+        if len(self._tasks) >= JOB_QUEUE_LIMIT:
+            response = JSONResponse(
+                {"detail": "Too many report jobs queued, retry later"},
+                status_code=503,
+                headers={"Retry-After": "30"}
+            )
+            await response(scope, receive, send)
+            return
+
+        query = [(name, value) for name, value in query if name != "async"]
+        key = job_key(scope["method"], scope["path"], query)
+        store = get_job_store()
+        job, existing = await run_in_threadpool(store.submit, scope["method"], scope["path"], key)
+
+        if not existing:
+            job_scope = dict(scope, query_string=urlencode(query).encode())
+            task = asyncio.create_task(self._run(job_scope, job, key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        response = JSONResponse(
+            {
+                "status": "accepted",
+                "job_id": job["id"],
+                "job_status": job["status"],
+                "existing_job": existing,
+                "status_url": f"/jobs/{job['id']}"
+            },
+            status_code=202,
+            headers={"Location": f"/jobs/{job['id']}"}
+        )
+        await response(scope, receive, send)
+
+    async def _run(self, scope: Scope, job: Dict[str, Any], key: str) -> None:
+        """Run the request through the app once a slot is free and store its response"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(JOB_WORKERS)
+        store = get_job_store()
+        response: Dict[str, Any] = {"status": None, "headers": [], "body": []}
+
+        async def receive() -> Message:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+
+        async with self._semaphore:
+            await run_in_threadpool(store.start, job)
+            token = current_job.set(job)
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send)
+                result = decode_result(response["headers"], b"".join(response["body"]))
+            except Exception as e:
+                logger.exception("Report job %s for %s failed: %s", job["id"], scope["path"], e)
+                response["status"] = 500
+                result = {"detail": f"Error processing request: {str(e)}"}
+            finally:
+                current_job.reset(token)
+            await run_in_threadpool(store.finish, job, key, response["status"], result)
+            logger.info(
+                "Report job %s for %s finished in %.0f ms", job["id"], scope["path"], (time.perf_counter() - started) * 1000,
+                extra={"job_id": job["id"], "status_code": response["status"]}
+            )
@@ -0,0 +1,200 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Level of the "app" loggers; raise to DEBUG at runtime through /admin/log-level
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# "json" for one JSON object per line, "text" for plain lines
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# Share of sampled records (per-page and per-query details) that are kept
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+# Records waiting for the writer thread; beyond this they are dropped rather than blocking a request
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+logger = logging.getLogger(__name__)
+
+# Correlation id of the request being handled, copied into every record logged for it
+request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "sampled"}
+
+
+class ContextFilter(logging.Filter):
+    """
+    Adds the request id to each record and thins out sampled records
+
+    Records logged with `extra={"sampled": True}` are kept with probability
+    `sample_rate`, so per-page messages stay visible without costing one
+    line per page under load.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False) and random.random() >= self.sample_rate:
+            return False
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields alongside the message"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None)
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            # Records logged outside a request, such as warm-up and the CLI
+            record.request_id = "-"
+        return super().format(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without blocking
+
+    Only the message arguments are merged in the calling thread (they may
+    change afterwards); formatting and writing happen in the listener
+    thread. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging() -> None:
+    """
+    Route the "app" loggers through a queue to a writer thread on stderr
+
+    Safe to call more than once; only the first call sets up handlers.
+    """
+    global _handler, _listener
+    if _handler is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(ContextFilter(LOG_SAMPLE_RATE))
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+    _listener.start()
+    # Write out what is still queued when the process exits
+    atexit.register(_listener.stop)
+
+    logger = logging.getLogger("app")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def get_context_filter() -> Optional[ContextFilter]:
+    """The filter holding the sample rate, once logging is configured"""
+    if _handler is None:
+        return None
+    return next((f for f in _handler.filters if isinstance(f, ContextFilter)), None)
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+
+class RequestIdMiddleware:
+    """
+    Give every request a correlation id
+
+    The id comes from the caller's X-Request-ID header when it looks like
+    an id, or is generated. It is attached to every record logged while the
+    request is handled, including in threadpool workers and background jobs
+    started by it, and returned in the X-Request-ID response header. At
+    DEBUG, one line per request records its status and duration.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        current = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex[:16]
+        token = request_id.set(current)
+        started = time.perf_counter()
+        status = {"code": None}
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", current.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            # The query string is left out; it can carry webhook keys and tokens
+            logger.debug(
+                "%s %s answered %s in %.1f ms", scope["method"], scope["path"], status["code"],
+                (time.perf_counter() - started) * 1000
+            )
+            request_id.reset(token)
@@ -1,26 +1,112 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from app.routers import bugzilla, bitbucket
 
 # Load environment variables
 load_dotenv()
 
+from app.log import RequestIdMiddleware, configure_logging
+
+# Before the routers are imported, so their import-time warnings are formatted too
+configure_logging()
+
+from app.responses import GZIP_LEVEL, GZIP_MIN_BYTES, get_response_class
+from app.jobs import AsyncJobMiddleware
+from app.profiling import ADMIN_TOKEN, ProfilingMiddleware
+from app.routers import admin, bugzilla, bitbucket, jobs, reports
+from app.services.google_chat import CHAT_DIGEST_WINDOW_SECONDS, get_digest_batcher
+from app.services.http import warm_connection
+from app.services.warmup import Warmup
+
 title = os.getenv('APP_NAME', 'Bitzilla Report API')
 description = os.getenv('APP_DESC', 'API for generating reports from Bugzilla and Bitbucket')
 version = os.getenv('APP_VERSION', '0.0.1')
 
+# Startup warm-up: log in and open upstream connections before the first request
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '60'))
+# Teams whose reports are pre-fetched into the report cache (comma-separated, empty for none)
+WARMUP_TEAMS = [team.strip() for team in os.getenv('WARMUP_TEAMS', '').split(',') if team.strip()]
+WARMUP_REPORTS = [
+    report.strip()
+    for report in os.getenv('WARMUP_REPORTS', 'priority,priority_miss,sla_missed,current_day,open_prs').split(',')
+    if report.strip()
+]
+
+warmup = Warmup(timeout_seconds=WARMUP_TIMEOUT_SECONDS)
+
+
+def warmup_steps() -> list:
+    """
+    Build the startup warm-up steps
+
+    Pre-fetches use the same cache keys and fetch functions as the report
+    endpoints, so the first request for a warmed report is a cache hit.
+
+    Returns:
+        list: (name, callable, step it waits for) tuples
+    """
+    steps = [
+        ("bugzilla_connection", lambda: warm_connection("bugzilla", bugzilla.BUGZILLA_URL), None),
+        ("bugzilla_login", bugzilla.get_session_with_login, "bugzilla_connection"),
+        ("bitbucket_connection", lambda: warm_connection("bitbucket", bitbucket.BITBUCKET_API_URL), None),
+        ("chat_connection", lambda: warm_connection("chat", bitbucket.GOOGLE_CHAT_WEBHOOK), None)
+    ]
+
+    def prefetch(report, team=None):
+        return lambda: bugzilla.report_cache.get(*bugzilla.report_source(report, team))
+
+    for team in WARMUP_TEAMS:
+        for report in ("priority", "priority_miss", "sla_missed"):
+            if report in WARMUP_REPORTS:
+                steps.append((f"prefetch:{report}:{team}", prefetch(report, team), "bugzilla_login"))
+
+    if WARMUP_TEAMS and "current_day" in WARMUP_REPORTS:
+        steps.append(("prefetch:current_day", prefetch("current_day"), "bugzilla_login"))
+    if WARMUP_TEAMS and "open_prs" in WARMUP_REPORTS:
+        steps.append(("prefetch:open_prs", bitbucket.get_open_prs_report, "bitbucket_connection"))
+    return steps
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so startup and the liveness route are never blocked
+    if WARMUP_ENABLED:
+        warmup.start(warmup_steps())
+    yield
+    # Post notifications still waiting for their digest window instead of dropping them
+    if CHAT_DIGEST_WINDOW_SECONDS > 0:
+        await run_in_threadpool(get_digest_batcher().flush_all)
+
 # Initialize FastAPI app with environment variables for title, description, and version
 app = FastAPI(
     title=title,
     description=description,
-    version=version
+    version=version,
+    default_response_class=get_response_class(),
+    lifespan=lifespan
 )
 
+# Report requests with async=true run as background jobs; added first so the job replays skip gzip
+app.add_middleware(AsyncJobMiddleware)
+
+# Compress large responses for clients that send Accept-Encoding: gzip
+if GZIP_MIN_BYTES > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+# Per-request profiling and admin routes need an admin token; without one the middleware is not installed
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so every record logged for a request, including by the middleware above, carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Validate environment variables
 required_vars = [
-    'BUGZILLA_EMAIL',
-    'BUGZILLA_PASSWORD',
     'BUGZILLA_URL',
     'GOOGLE_CHAT_WEBHOOK',
     'BITBUCKET_USERNAME', 
@@ -28,6 +114,10 @@ required_vars = [
     'BITBUCKET_URL'
 ]
 
+# Password login is only needed when no Bugzilla API key is configured
+if not os.getenv('BUGZILLA_API_KEY'):
+    required_vars += ['BUGZILLA_EMAIL', 'BUGZILLA_PASSWORD']
+
 missing_vars = [var for var in required_vars if not os.getenv(var)]
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
@@ -35,6 +125,9 @@ if missing_vars:
 # Include routers
 app.include_router(bugzilla.router)
 app.include_router(bitbucket.router)
+app.include_router(reports.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -43,4 +136,22 @@ async def root():
         "status": "active",
         "message": f"Hello World! I am {title}",
         "version": version
-    }
\ No newline at end of file
+    }
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe, separate from the "/" liveness route
+
+    Answers 503 while the startup warm-up is running. Once it has finished,
+    answers 200 with status "ready", or "degraded" when a step failed; the
+    service still works then, fetching on demand.
+    """
+    warmup_status = warmup.status()
+    state = warmup_status["state"]
+    body = {
+        "status": "ready" if state == "disabled" else state,
+        "version": version,
+        "warmup": warmup_status
+    }
+    return JSONResponse(body, status_code=503 if state == "warming" else 200)
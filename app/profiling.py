@@ -0,0 +1,94 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.profiler import StackSampler, current_sampler, get_profile_store, new_profile_id
+
+logger = logging.getLogger(__name__)
+
+# Admin routes and request profiling are only available when a token is configured
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a presented admin token in constant time"""
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests on demand
+
+    A request is profiled when it carries an `X-Profile: 1` header or a
+    `profile=true` query parameter together with a valid `X-Admin-Token`
+    header. The profile's id is returned in the `X-Profile-Id` response
+    header, and the profile is stored once the response has been sent.
+    Without the flag, a request costs one header lookup; the middleware is
+    not installed at all when no ADMIN_TOKEN is configured.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        flag = headers.get(b"x-profile")
+        if flag is None and b"profile=" in scope.get("query_string", b""):
+            flag = parse_qs(scope["query_string"].decode()).get("profile", [""])[0].encode()
+        if flag is None or flag.lower() not in (b"1", b"true", b"yes"):
+            await self.app(scope, receive, send)
+            return
+
+        token = headers.get(b"x-admin-token")
+        if not is_admin_token(token.decode() if token else None):
+            response = JSONResponse({"detail": "Profiling requires a valid X-Admin-Token header"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        started_at = time.time()
+        started = time.perf_counter()
+        status = {"code": None}
+        profile_id = new_profile_id()
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        # The event loop thread, plus threadpool threads while they run calls made for this request
+        sampler.add_thread(threading.get_ident())
+        token = current_sampler.set(sampler)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            current_sampler.reset(token)
+            meta = {
+                "method": scope["method"],
+                # The query string is left out; it can carry webhook keys and tokens
+                "path": scope["path"],
+                "status_code": status["code"],
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            try:
+                await run_in_threadpool(get_profile_store().save, profile_id, sampler, meta)
+                logger.info("Saved profile %s for %s %s (%s ms)", profile_id, scope["method"], scope["path"], meta["duration_ms"])
+            except OSError as e:
+                logger.warning("Failed to save profile: %s", e)
@@ -0,0 +1,120 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.log import dropped_records, get_context_filter
+from app.profiling import is_admin_token
+from app.services.profiler import get_profile_store, run_in_threadpool
+
+
+def require_admin(x_admin_token: str = Header(None)) -> None:
+    """Reject requests without the configured X-Admin-Token"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=403,
+            detail="A valid X-Admin-Token header is required"
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    List stored request profiles, newest first
+    
+    Returns:
+        dict: Profile metadata (id, method, path, status code, duration and sample count)
+    """
+    store = get_profile_store()
+    profiles = await run_in_threadpool(store.list)
+    return {
+        "status": "success",
+        "retention": store.retention,
+        "profiles": profiles
+    }
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    """
+    Download a profile as folded stacks
+    
+    Each line is a root-first stack of frames separated by ";" followed by
+    its sample count. Render it with flamegraph.pl or open it in speedscope.
+    
+    Raises:
+        HTTPException: If the profile does not exist
+    """
+    folded = await run_in_threadpool(get_profile_store().folded, profile_id)
+    if folded is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Profile {profile_id} not found"
+        )
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+    )
+
+
+@router.get("/log-level")
+async def get_log_level(logger: str = "app"):
+    """
+    Show the level of a logger and the share of sampled records kept
+
+    Args:
+        logger (str): Logger name, "app" for the whole service or e.g. "app.services.bitbucket"
+    """
+    context_filter = get_context_filter()
+    return {
+        "status": "success",
+        "logger": logger,
+        "level": logging.getLevelName(logging.getLogger(logger).getEffectiveLevel()),
+        "sample_rate": context_filter.sample_rate if context_filter else None,
+        "dropped_records": dropped_records()
+    }
+
+
+@router.put("/log-level")
+async def set_log_level(level: str, logger: str = "app", sample_rate: Optional[float] = None):
+    """
+    Change a logger's level, and optionally the sample rate, without a restart
+
+    Applies to the worker process that answers; with several workers, call
+    it once per worker or set LOG_LEVEL and restart.
+
+    Args:
+        level (str): DEBUG, INFO, WARNING or ERROR
+        logger (str): Logger name, "app" for the whole service or e.g. "app.services.bitbucket"
+        sample_rate (float, optional): Share of sampled (per-page) records to keep, 0 to 1
+
+    Raises:
+        HTTPException: If the level or sample rate is invalid
+    """
+    level = level.upper()
+    if level not in ("DEBUG", "INFO", "WARNING", "ERROR"):
+        raise HTTPException(
+            status_code=400,
+            detail="level must be one of DEBUG, INFO, WARNING, ERROR"
+        )
+    if sample_rate is not None and not 0 <= sample_rate <= 1:
+        raise HTTPException(
+            status_code=400,
+            detail="sample_rate must be between 0 and 1"
+        )
+
+    target = logging.getLogger(logger)
+    previous = logging.getLevelName(target.getEffectiveLevel())
+    target.setLevel(level)
+    context_filter = get_context_filter()
+    if sample_rate is not None and context_filter is not None:
+        context_filter.sample_rate = sample_rate
+    return {
+        "status": "success",
+        "logger": logger,
+        "previous_level": previous,
+        "level": level,
+        "sample_rate": context_filter.sample_rate if context_filter else None
+    }
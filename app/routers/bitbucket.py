@@ -1,69 +1,331 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+import json
+import logging
 import os
-from app.services.bitbucket import BitbucketAPI
-from app.services.google_chat import GoogleChatService
+import time
+from app.services.bitbucket import BitbucketAPI, filter_by_authors, format_open_prs
+from typing import List
+from app.services.google_chat import GoogleChatService, resolve_webhooks
+from app.services.report_cache import ReportCache
+from app.responses import json_response
+from app.services.rate_limiter import get_bitbucket_limiter
+from app.services.pr_index import get_pr_index, verify_signature
+from app.services.pr_aging import GROUP_FIELDS, build_pr_aging
+from app.services.profiler import run_in_threadpool
 
 router = APIRouter(prefix="/bitbucket", tags=["bitbucket"])
+logger = logging.getLogger(__name__)
 
 # Get environment variables
 BITBUCKET_USERNAME = os.getenv('BITBUCKET_USERNAME')
 BITBUCKET_PASSWORD = os.getenv('BITBUCKET_PASSWORD')
 BITBUCKET_URL = os.getenv('BITBUCKET_URL')
+BITBUCKET_API_URL = os.getenv('BITBUCKET_API_URL', 'https://api.bitbucket.org/2.0')
 GOOGLE_CHAT_WEBHOOK = os.getenv('GOOGLE_CHAT_WEBHOOK')
 
+# Answer /open-prs from the webhook-fed PR index instead of polling Bitbucket
+PR_INDEX_ENABLED = os.getenv('BITBUCKET_PR_INDEX', 'false').lower() in ('1', 'true', 'yes')
+PR_INDEX_RECONCILE_SECONDS = int(os.getenv('PR_INDEX_RECONCILE_SECONDS', '900'))
+BITBUCKET_WEBHOOK_SECRET = os.getenv('BITBUCKET_WEBHOOK_SECRET')
+
+# PRs open longer than this are flagged in /pr-aging; buckets split ages at these day counts
+PR_REVIEW_SLA_HOURS = float(os.getenv('PR_REVIEW_SLA_HOURS', '48'))
+PR_AGE_BUCKETS_DAYS = [float(days) for days in os.getenv('PR_AGE_BUCKETS_DAYS', '1,3,7,14,30').split(',') if days.strip()]
+
+report_cache = ReportCache(
+    fresh_seconds=int(os.getenv('REPORT_FRESH_SECONDS', '300')),
+    max_stale_seconds=int(os.getenv('REPORT_MAX_STALE_SECONDS', '3600'))
+)
+
+def get_bitbucket_api() -> BitbucketAPI:
+    """Create the Bitbucket API client from the configured credentials"""
+    if not BITBUCKET_USERNAME or not BITBUCKET_PASSWORD:
+        raise HTTPException(
+            status_code=500,
+            detail="Bitbucket credentials not configured"
+        )
+        
+    return BitbucketAPI(
+        username=BITBUCKET_USERNAME,
+        app_password=BITBUCKET_PASSWORD,
+        workspace="bizom",
+        api_base=BITBUCKET_API_URL
+    )
+
+def fetch_open_prs(authors: str = None, enrich: bool = False, fresh: bool = False) -> list:
+    """
+    Fetch open PRs from Bitbucket with an optional author filter and enrichment
+    
+    With `fresh`, the PR listing is refetched instead of taken from the
+    Bitbucket listing cache.
+    """
+    return get_bitbucket_api().get_all_open_prs(authors, enrich=enrich, use_cache=not fresh)
+
+def fetch_fresh_pr_listing() -> list:
+    """Open PRs of every indexed repository straight from Bitbucket, bypassing the listing cache"""
+    api = get_bitbucket_api()
+    return [pr for repository in get_pr_index().repositories for pr in api.get_repository_prs(repository, use_cache=False)]
+
+def reconcile_pr_index() -> dict:
+    """Replace the PR index with a full listing from Bitbucket"""
+    started_at = time.time()
+    return get_pr_index().replace_all(fetch_fresh_pr_listing(), started_at)
+
+def fetch_open_prs_from_index(authors: str = None, enrich: bool = False, refresh: bool = False) -> list:
+    """
+    Build the open-PRs report from the PR index
+    
+    The index is filled by a full listing on first use or when `refresh` is
+    set. After that, only webhook events and the reconciliation poll change it.
+    The formatted, sorted listing is kept until the index changes, so
+    unenriched requests only filter it by author.
+    """
+    index = get_pr_index()
+    if refresh or not index.synced:
+        reconcile_pr_index()
+    index.start_reconciler(fetch_fresh_pr_listing, PR_INDEX_RECONCILE_SECONDS)
+    if enrich:
+        # Enrichment adds fields per request, so it works on fresh rows
+        return get_bitbucket_api().get_all_open_prs(authors, enrich=enrich, prs=index.open_prs())
+    return filter_by_authors(index.formatted_prs(format_open_prs), authors)
+
+def get_open_prs_report(authors: str = None, enrich: bool = False, refresh: bool = False, require_fresh: bool = False) -> dict:
+    """
+    Open PRs with freshness metadata, in the shape of a report cache entry
+    
+    Served from the PR index when it is enabled, otherwise from the report
+    cache (stale-while-revalidate). With `require_fresh`, a stale cached
+    report is refetched before answering, and still served if that fails.
+    """
+    if PR_INDEX_ENABLED:
+        # The index is current as of the last webhook event, so it needs no report cache
+        prs = fetch_open_prs_from_index(authors, enrich, refresh)
+        return {"data": prs, "data_age_seconds": get_pr_index().age_seconds(), "stale": False, "refresh_error": None}
+    return report_cache.get(
+        ("open_prs", authors, enrich),
+        lambda: fetch_open_prs(authors, enrich, refresh),
+        refresh,
+        require_fresh
+    )
+
 @router.get("/open-prs")
 async def get_all_open_prs(
     authors: str = Query(
         None, 
         description="Filter PRs by authors (comma-separated, e.g., 'laxmikanthtd,sumithhegde')"
     ),
-    webhook_url: str = Query(
+    webhook_url: List[str] = Query(
         None,
-        description="Optional custom Google Chat webhook URL. If not provided, default webhook will be used."
+        description="Optional custom Google Chat webhook URLs (repeat or comma-separate for several spaces). If not provided, default webhook will be used."
+    ),
+    webhook_group: str = Query(
+        None,
+        description="Optional named target group from GOOGLE_CHAT_WEBHOOK_GROUPS"
     ),
     skip_chat: bool = Query(
         False,
         description="Set to true to skip posting to Google Chat"
+    ),
+    refresh: bool = Query(
+        False,
+        description="Set to true to fetch from Bitbucket instead of serving the cached report"
+    ),
+    require_fresh: bool = Query(
+        False,
+        description="Set to true to fetch from Bitbucket when the cached report is stale, falling back to it if the fetch fails"
+    ),
+    enrich: bool = Query(
+        False,
+        description="Set to true to include reviewers, approvals, diff size and build status for each PR"
+    ),
+    send_now: bool = Query(
+        False,
+        description="Set to true to post immediately even when Chat digest batching is enabled"
     )
 ):
     """Get all open PRs across repositories"""
     try:
-        if not BITBUCKET_USERNAME or not BITBUCKET_PASSWORD:
-            raise HTTPException(
-                status_code=500,
-                detail="Bitbucket credentials not configured"
-            )
-            
-        # Initialize Bitbucket API client
-        bitbucket = BitbucketAPI(
-            username=BITBUCKET_USERNAME,
-            app_password=BITBUCKET_PASSWORD,
-            workspace="bizom"
-        )
-        
-        # Get all open PRs with optional author filter
-        prs = bitbucket.get_all_open_prs(authors)
+        cached = await run_in_threadpool(get_open_prs_report, authors, enrich, refresh, require_fresh)
+        prs = cached["data"]
         
         # Post to Google Chat by default unless skip_chat is True
         chat_posted = False
+        webhook_type = "none"
         if not skip_chat:
-            chat_url = webhook_url or GOOGLE_CHAT_WEBHOOK       
-            chat_service = GoogleChatService(chat_url)   
-            responseChat = chat_service.send_open_bitbucket_prs_notification(prs)
+            chat_urls, webhook_type = resolve_webhooks(webhook_url, webhook_group, GOOGLE_CHAT_WEBHOOK)
+            chat_service = GoogleChatService(chat_urls)
+            # Render once, then fan the same message out to every target
+            message = chat_service.build_open_bitbucket_prs_message(prs)
+            deliveries = await run_in_threadpool(chat_service.deliver, message, send_now)
             chat_posted = True
         
-        return {
+        response = {
             "status": "success",
             "data": prs,
             "posted_to_chat": chat_posted,
-            "webhook_used": "custom" if webhook_url else "default" if chat_posted else "none"
+            "webhook_used": webhook_type,
+            "data_age_seconds": cached["data_age_seconds"],
+            "stale": cached["stale"]
         }
+        if chat_posted:
+            response["deliveries"] = deliveries
+        if cached["refresh_error"]:
+            response["refresh_error"] = cached["refresh_error"]
+        return json_response(response)
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error details: {str(e)}")
+        logger.exception("Error processing request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/webhook")
+async def bitbucket_webhook(
+    request: Request,
+    x_event_key: str = Header(None),
+    x_hub_signature: str = Header(None)
+):
+    """
+    Receive Bitbucket pull request webhook events and update the PR index.
+    
+    Handles pullrequest:created, pullrequest:updated, pullrequest:fulfilled
+    and pullrequest:rejected; other events are acknowledged and ignored.
+    The X-Hub-Signature header must carry the HMAC-SHA256 of the body,
+    keyed with BITBUCKET_WEBHOOK_SECRET.
+    
+    Raises:
+        HTTPException: 404 when the PR index is disabled, 403 when no webhook
+            secret is configured, 401 for a missing or invalid signature
+    """
+    if not PR_INDEX_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail="PR index is disabled"
+        )
+    # Unsigned events could add or remove PRs in the persisted index
+    if not BITBUCKET_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=403,
+            detail="Webhook is disabled until BITBUCKET_WEBHOOK_SECRET is set"
+        )
+        
+    body = await request.body()
+    if not verify_signature(BITBUCKET_WEBHOOK_SECRET, body, x_hub_signature):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid webhook signature"
+        )
+        
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Webhook body is not valid JSON"
+        )
+        
+    try:
+        index = get_pr_index()
+        action = await run_in_threadpool(index.apply_event, x_event_key or "", payload)
+        pr = payload.get("pullrequest") or {}
+        logger.info("Bitbucket webhook %s for PR #%s: %s", x_event_key, pr.get("id"), action)
+        return {
+            "status": "success",
+            "data": {
+                "event": x_event_key,
+                "pull_request": pr.get("id"),
+                "action": action,
+                "index": index.status()
+            }
+        }
+        
+    except Exception as e:
+        logger.exception("Error processing webhook: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing webhook: {str(e)}"
+        )
+
+@router.get("/pr-index")
+async def get_pr_index_status():
+    """Get the size and freshness of the webhook-fed PR index"""
+    return {
+        "status": "success",
+        "data": dict(get_pr_index().status(), enabled=PR_INDEX_ENABLED)
+    }
+
+@router.get("/rate-limit")
+async def get_rate_limit():
+    """Get the remaining Bitbucket request quota as tracked by the shared rate limiter"""
+    return {
+        "status": "success",
+        "data": get_bitbucket_limiter().snapshot()
+    }
+
+@router.get("/pr-aging")
+async def get_pr_aging(
+    authors: str = Query(
+        None,
+        description="Filter PRs by authors (comma-separated)"
+    ),
+    group_by: str = Query(
+        "author",
+        description="Group the oldest PRs by 'author' or 'repository'"
+    ),
+    top_k: int = Query(
+        5,
+        ge=1,
+        le=100,
+        description="Number of oldest PRs listed per group"
+    ),
+    sla_hours: float = Query(
+        None,
+        gt=0,
+        description="Review SLA in hours; older PRs are flagged (default: PR_REVIEW_SLA_HOURS)"
+    ),
+    refresh: bool = Query(
+        False,
+        description="Set to true to fetch from Bitbucket instead of serving the cached report"
+    )
+):
+    """
+    Get open PRs bucketed by age, with the oldest PRs per author or repository
+    
+    Uses the same open-PRs listing as /open-prs, so it is served from the
+    same cache or PR index.
+    """
+    if group_by not in GROUP_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by must be one of: {', '.join(GROUP_FIELDS)}"
+        )
+    try:
+        cached = await run_in_threadpool(get_open_prs_report, authors, False, refresh)
+        aging = build_pr_aging(
+            cached["data"],
+            sla_hours or PR_REVIEW_SLA_HOURS,
+            PR_AGE_BUCKETS_DAYS,
+            top_k,
+            group_by
+        )
+        response = {
+            "status": "success",
+            "data": aging,
+            "data_age_seconds": cached["data_age_seconds"],
+            "stale": cached["stale"]
+        }
+        if cached["refresh_error"]:
+            response["refresh_error"] = cached["refresh_error"]
+        return json_response(response)
+        
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.exception("Error processing request: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        )
@@ -2,45 +2,121 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
 import requests
 from bs4 import BeautifulSoup
+import logging
 import os
-from typing import List, Dict, Any, Tuple, Optional
-from app.services.google_chat import GoogleChatService
+import threading
+import time
+from typing import List, Dict, Any, Callable, Tuple, Optional, Union
+from app.services.google_chat import GoogleChatService, resolve_webhooks
 from app.services.bitbucket import BitbucketAPI
+from app.services.report_cache import ReportCache
+from app.services.cache_backend import get_cache_backend
+from app.services.report_delta import ReportDeltaTracker, has_changes
+from app.services.snapshot_store import get_snapshot_store
+from app.services.bug_search import bug_search_index
+from app.services.pivot import PIVOT_FIELDS, encode_rows, parse_filters, pivot
+from app.services.http import StreamedBody, new_session, read_body
+from app.services.profiler import run_in_threadpool
+from app.services.bug_columns import (
+    CARD_COLUMNS, COLUMN_BASELINE, COLUMN_PROJECTION, DELTA_COLUMNS, column_stats, columnlist_param, parse_csv,
+    parse_csv_lines, project_rows, report_columns
+)
+from app.responses import json_response
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # Ensure environment variables are loaded
 load_dotenv()
 
 router = APIRouter(prefix="/bugzilla", tags=["bugzilla"])
+logger = logging.getLogger(__name__)
 
 # Get environment variables with validation
 BUGZILLA_EMAIL = os.getenv('BUGZILLA_EMAIL')
 BUGZILLA_PASSWORD = os.getenv('BUGZILLA_PASSWORD')
+BUGZILLA_API_KEY = os.getenv('BUGZILLA_API_KEY')
 BUGZILLA_URL = os.getenv('BUGZILLA_URL')
 GOOGLE_CHAT_WEBHOOK = os.getenv('GOOGLE_CHAT_WEBHOOK')
 
 # Validate critical environment variables
 if not BUGZILLA_URL:
-    print("WARNING: BUGZILLA_URL environment variable is not set!")
     BUGZILLA_URL = "https://bugzilla.bizom.in"  # Fallback default
-    print(f"Using default BUGZILLA_URL: {BUGZILLA_URL}")
+    logger.warning("BUGZILLA_URL is not set, using %s", BUGZILLA_URL)
 
 REPORT_URL = f"{BUGZILLA_URL}/report.cgi"
 
+# Reports older than this are still served, but trigger a background refresh
+REPORT_FRESH_SECONDS = int(os.getenv('REPORT_FRESH_SECONDS', '300'))
+# Reports older than this are fetched again before answering (0 for no limit)
+REPORT_MAX_STALE_SECONDS = int(os.getenv('REPORT_MAX_STALE_SECONDS', '3600'))
 
-def get_session_with_login():
+report_cache = ReportCache(fresh_seconds=REPORT_FRESH_SECONDS, max_stale_seconds=REPORT_MAX_STALE_SECONDS)
+report_deltas = ReportDeltaTracker()
+
+# Login cookies are shared through the cache backend so workers reuse one session
+BUGZILLA_SESSION_TTL = int(os.getenv('BUGZILLA_SESSION_TTL', '3600'))
+SESSION_CACHE_KEY = f"bugzilla:cookies:{BUGZILLA_URL}"
+
+OPEN_BUG_STATUSES = ["UNCONFIRMED", "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"]
+ALL_PRIORITIES = ["Highest", "High", "Normal", "Low", "Lowest", "---"]
+
+# Most bugs read from one buglist.cgi download; max_bugs on a request can lower it
+BUGZILLA_MAX_BUGS = int(os.getenv('BUGZILLA_MAX_BUGS', '20000'))
+
+# buglist.cgi columns each report needs for its card and delta tracking
+REPORT_COLUMNS = {
+    "priority": report_columns(CARD_COLUMNS, DELTA_COLUMNS),
+    "priority_miss": report_columns(CARD_COLUMNS, DELTA_COLUMNS),
+    "sla_missed": report_columns(CARD_COLUMNS, DELTA_COLUMNS),
+    "pivot": report_columns(("bug_id",), PIVOT_FIELDS)
+}
+
+
+def get_api_key_session() -> requests.Session:
+    """
+    Create a session that authenticates every request with the Bugzilla API key
+    
+    The key is sent both as the Bugzilla_api_key parameter (honoured by
+    buglist.cgi, report.cgi and the REST API) and as the X-BUGZILLA-API-KEY
+    header, so no login page, token scrape or cookie is needed.
+    
+    Returns:
+        requests.Session: Stateless authenticated session
+    """
+    session = new_session("bugzilla")
+    session.params = {"Bugzilla_api_key": BUGZILLA_API_KEY.strip()}
+    session.headers.update({"X-BUGZILLA-API-KEY": BUGZILLA_API_KEY.strip()})
+    return session
+
+def get_session_with_login(fresh: bool = False):
     """
     Create and return an authenticated session for Bugzilla
     
+    Uses the API key when BUGZILLA_API_KEY is set, otherwise reuses login
+    cookies from the cache backend or logs in with BUGZILLA_EMAIL and
+    BUGZILLA_PASSWORD through the HTML login form.
+    
+    Args:
+        fresh: Ignore cached login cookies and log in again
+    
     Returns:
         requests.Session: Authenticated session
         
     Raises:
         HTTPException: If login fails
     """
+    if BUGZILLA_API_KEY:
+        return get_api_key_session()
+        
+    cookies = None if fresh else get_cache_backend().get(SESSION_CACHE_KEY)
+    if cookies:
+        session = new_session("bugzilla")
+        session.cookies.update(cookies)
+        return session
+        
     try:
-        session = requests.Session()
-        print(f"Attempting login to: {BUGZILLA_URL}")
+        session = new_session("bugzilla")
+        logger.info("Logging in to %s", BUGZILLA_URL)
         
         # Get the login page first to get the token
         login_page = session.get(
@@ -48,11 +124,12 @@ def get_session_with_login():
             headers={
                 "User-Agent": "Mozilla/5.0",
                 "Accept": "text/html,application/xhtml+xml"
-            }
+            },
+            stream=True
         )
         
         # Parse the login page
-        soup = BeautifulSoup(login_page.text, 'html.parser')
+        soup = BeautifulSoup(read_body(login_page), 'html.parser')
         
         # Get both login token and forgot password token
         login_token = soup.find('input', {'name': 'Bugzilla_login_token'})
@@ -86,11 +163,13 @@ def get_session_with_login():
                 "Origin": BUGZILLA_URL,
                 "Referer": f"{BUGZILLA_URL}/report.cgi"
             },
-            allow_redirects=True
+            allow_redirects=True,
+            stream=True
         )
+        read_body(login_response)
         
-        print(f"Login response status: {login_response.status_code}")
-        print(f"Cookies received: {session.cookies.get_dict()}")
+        # Cookie names only; their values are the session credentials
+        logger.debug("Login answered %d with cookies %s", login_response.status_code, sorted(session.cookies.keys()))
         
         # Verify login success
         if "The username or password you entered is not valid" in login_response.text:
@@ -105,49 +184,141 @@ def get_session_with_login():
                 detail="Login failed - no session cookie received"
             )
         
+        get_cache_backend().set(SESSION_CACHE_KEY, session.cookies.get_dict(), BUGZILLA_SESSION_TTL)
         return session
         
     except Exception as e:
-        print(f"Login error: {str(e)}")
+        logger.error("Login failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Login failed: {str(e)}"
         )
 
-def process_csv_response(response: requests.Response) -> List[Dict[str, Any]]:
+def is_login_page(response: requests.Response) -> bool:
+    """Check whether Bugzilla answered with its login form instead of the requested data"""
+    if not response.headers.get("Content-Type", "").startswith("text/html"):
+        return False
+    # Only HTML answers are read here; CSV bodies stay unread for streaming
+    read_body(response)
+    return "Bugzilla_login_token" in response.text
+
+def bugzilla_get(url: str, params: Dict[str, Any], session: Optional[requests.Session] = None) -> requests.Response:
     """
-    Process CSV response from Bugzilla into a list of dictionaries
+    Run an authenticated GET against Bugzilla
+    
+    If cached login cookies have expired, logs in again and retries once.
+    The body is not read yet; read it with read_body() or StreamedBody and
+    close the response afterwards.
     
     Args:
-        response: HTTP response containing CSV data
+        url: Bugzilla URL to request
+        params: Query parameters
+        session: Authenticated session to reuse; a new one is created when omitted
         
     Returns:
-        List of dictionaries representing bugs
+        requests.Response: Bugzilla response, opened with stream=True
     """
-    # Process CSV data
-    csv_data = [[cell.strip().strip('"') for cell in row.split(',')] 
-               for row in response.text.strip().split('\n')]
+    session = session or get_session_with_login()
+    response = session.get(url, params=params, stream=True)
     
-    if not csv_data or len(csv_data) <= 1:  # Only headers or empty
-        return []
+    if not BUGZILLA_API_KEY and is_login_page(response):
+        logger.info("Cached Bugzilla session expired, logging in again")
+        session = get_session_with_login(fresh=True)
+        response = session.get(url, params=params, stream=True)
         
-    headers = csv_data[0]
-    bugs = []
+    return response
+
+def read_bug_csv(response: requests.Response, max_rows: int) -> Tuple[List[str], List[List[str]], int]:
+    """
+    Stream a buglist.cgi CSV download, stopping after max_rows rows
     
-    # Convert rows to dictionaries
-    for row in csv_data[1:]:
-        if len(row) == len(headers):
-            bug_dict = {headers[i]: row[i] for i in range(len(headers))}
-            bugs.append(bug_dict)
+    Returns:
+        Header row, data rows and the number of bytes read
+        
+    Raises:
+        HTTPException: If the request failed or the body exceeds UPSTREAM_MAX_BYTES
+    """
+    try:
+        if response.status_code != 200:
+            read_body(response)
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch report: {response.text}"
+            )
+        body = StreamedBody(response)
+        headers, rows = parse_csv_lines(body.lines(), max_rows)
+        return headers, rows, body.bytes_read
+    finally:
+        response.close()
+
+def bug_limit(max_bugs: Optional[int] = None) -> int:
+    """Rows kept from a buglist.cgi download for an optional per-request max_bugs"""
+    return min(max_bugs, BUGZILLA_MAX_BUGS) if max_bugs else BUGZILLA_MAX_BUGS
+
+def limit_bugs(bugs: List[Dict[str, Any]], max_bugs: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Cut a fetched bug list to its limit
     
+    Fetches keep one row beyond the limit, which tells a cut-off download
+    apart from one that happened to have exactly as many rows as the limit.
+    
+    Returns:
+        At most bug_limit(max_bugs) bugs, and whether any were left out
+    """
+    limit = bug_limit(max_bugs)
+    return bugs[:limit], len(bugs) > limit
+
+def process_csv_response(
+    response: requests.Response,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Process CSV response from Bugzilla into a list of dictionaries
+    
+    Args:
+        response: HTTP response containing CSV data, opened with stream=True
+        columns: Optional columns to keep; all columns are kept when omitted
+        max_rows: Rows to read at most (default: BUGZILLA_MAX_BUGS)
+        
+    Returns:
+        List of dictionaries representing bugs
+    """
+    headers, rows, _ = read_bug_csv(response, max_rows or BUGZILLA_MAX_BUGS)
+    bugs, _, _ = project_rows(headers, rows, columns)
     return bugs
 
-def get_chat_service(webhook_url: Optional[str] = None) -> Tuple[GoogleChatService, str]:
+def advance_delta(
+    key: Tuple,
+    bugs: List[Dict[str, Any]],
+    bug_delta: Optional[Dict[str, Any]],
+    skip_chat: bool,
+    deliveries: Optional[List[Dict[str, Any]]]
+) -> None:
     """
-    Get Google Chat service with appropriate webhook URL
+    Make bugs the new delta baseline once their changes have reached Chat
+    
+    With skip_chat the delta is only a preview, and after a failed post the
+    baseline is kept, so the next run reports the same changes again. A
+    card still waiting in the digest batcher does not count as posted. A
+    run without changes has nothing to deliver and always advances it.
+    """
+    if bug_delta is None or skip_chat:
+        return
+    if has_changes(bug_delta) and not (deliveries and all(delivery["delivered"] for delivery in deliveries)):
+        return
+    report_deltas.commit(key, bugs)
+
+def get_chat_service(
+    webhook_url: Optional[Union[str, List[str]]] = None,
+    webhook_group: Optional[str] = None
+) -> Tuple[GoogleChatService, str]:
+    """
+    Get Google Chat service with appropriate webhook URLs
     
     Args:
-        webhook_url: Optional custom webhook URL
+        webhook_url: Optional custom webhook URL, or a list of them
+        webhook_group: Optional target group from GOOGLE_CHAT_WEBHOOK_GROUPS
         
     Returns:
         Tuple of (GoogleChatService, webhook_type)
@@ -155,21 +326,17 @@ def get_chat_service(webhook_url: Optional[str] = None) -> Tuple[GoogleChatServi
     Raises:
         HTTPException: If no webhook URL is available
     """
-    chat_url = webhook_url or GOOGLE_CHAT_WEBHOOK
-    if not chat_url:
-        raise HTTPException(
-            status_code=400,
-            detail="Google Chat webhook URL not configured"
-        )
-    
-    webhook_type = "custom" if webhook_url else "default"
-    return GoogleChatService(chat_url, BUGZILLA_URL), webhook_type
+    webhook_urls = [webhook_url] if isinstance(webhook_url, str) else webhook_url
+    chat_urls, webhook_type = resolve_webhooks(webhook_urls, webhook_group, GOOGLE_CHAT_WEBHOOK)
+    return GoogleChatService(chat_urls, BUGZILLA_URL), webhook_type
 
 def format_response(
     result: Dict[str, Any], 
     chat_posted: bool, 
-    webhook_type: str
-) -> Dict[str, Any]:
+    webhook_type: str,
+    cached: Optional[Dict[str, Any]] = None,
+    deliveries: Optional[List[Dict[str, Any]]] = None
+) -> JSONResponse:
     """
     Format standard API response
     
@@ -177,174 +344,499 @@ def format_response(
         result: Result data
         chat_posted: Whether notification was posted to chat
         webhook_type: Type of webhook used
+        cached: Optional report cache entry whose freshness metadata is included
+        deliveries: Optional per-webhook delivery results
         
     Returns:
-        Formatted response dictionary
+        JSON response with the formatted body
     """
-    return {
+    response = {
         "status": "success",
         "data": result,
         "posted_to_chat": chat_posted,
         "webhook_used": webhook_type if chat_posted else "none"
     }
+    if deliveries is not None:
+        response["deliveries"] = deliveries
+    if cached:
+        response["data_age_seconds"] = cached["data_age_seconds"]
+        response["stale"] = cached["stale"]
+        if cached["refresh_error"]:
+            response["refresh_error"] = cached["refresh_error"]
+    return json_response(response)
+
+def fetch_bug_list(
+    params: Dict[str, Any],
+    report: str,
+    session: Optional[requests.Session] = None,
+    max_bugs: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Log in and run a buglist.cgi query
+    
+    Only the columns listed for the report in REPORT_COLUMNS are requested.
+    The returned header is checked against them and the download size is
+    recorded in column_stats. The download is streamed and cut off one row
+    past bug_limit(max_bugs); see limit_bugs().
+    
+    Args:
+        params: buglist.cgi query parameters
+        report: Report name, a key of REPORT_COLUMNS
+        session: Authenticated session to reuse; a new one is created when omitted
+        max_bugs: Optional lower row limit than BUGZILLA_MAX_BUGS
+        
+    Returns:
+        List of dictionaries representing bugs
+        
+    Raises:
+        HTTPException: If login or the query fails, or the response has no bug_id column
+    """
+    columns = list(REPORT_COLUMNS[report]) if COLUMN_PROJECTION else None
+    query_params = dict(params, columnlist=columnlist_param(columns)) if columns else params
+    response = bugzilla_get(f"{BUGZILLA_URL}/buglist.cgi", query_params, session)
+    headers, rows, size = read_bug_csv(response, bug_limit(max_bugs) + 1)
+    bugs, missing, unexpected = project_rows(headers, rows, columns)
+    
+    if headers and "bug_id" not in headers:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Unexpected buglist.cgi columns for {report}: {', '.join(headers)}"
+        )
+    if missing or unexpected:
+        logger.warning("buglist.cgi columns for %s differ from the request: missing %s, unexpected %s", report, missing, unexpected)
+    
+    if len(rows) > bug_limit(max_bugs):
+        # Bytes read past the cut-off row would skew the per-row figures, so stats are skipped
+        logger.warning("buglist.cgi %s: cut off after %d rows, %d bytes read", report, bug_limit(max_bugs), size)
+    else:
+        if columns is None:
+            column_stats.record_baseline(report, size, len(bugs))
+        query = column_stats.record_query(report, size, len(bugs), missing, unexpected)
+        logger.debug(
+            "buglist.cgi %s: %d bytes, %d rows, %d bytes saved", report, query["bytes"], query["rows"], query["bytes_saved"],
+            extra={"sampled": True}
+        )
+    
+    # Rows without a summary (such as pivot rows) would blank out indexed bugs
+    if "short_desc" in headers:
+        bug_search_index.add_bugs(bugs)
+    
+    # Opt-in: measure what the unprojected download would cost once, off the request path
+    if COLUMN_BASELINE and columns and bugs and column_stats.claim_baseline(report):
+        threading.Thread(target=sample_column_baseline, args=(report, params), daemon=True).start()
+        
+    return bugs
+
+def sample_column_baseline(report: str, params: Dict[str, Any]) -> None:
+    """
+    Download a report once without columnlist to learn its default bytes per row
+    
+    A failed sample is recorded and not retried, so an unprojected download
+    that always fails (e.g. over UPSTREAM_MAX_BYTES) costs one query only.
+    """
+    try:
+        response = bugzilla_get(f"{BUGZILLA_URL}/buglist.cgi", params)
+        _, rows, size = read_bug_csv(response, BUGZILLA_MAX_BUGS)
+        column_stats.record_baseline(report, size, len(rows))
+    except Exception as e:
+        column_stats.record_baseline_failure(report, getattr(e, "detail", None) or str(e))
+        logger.warning("Failed to sample buglist.cgi baseline for %s: %s", report, e)
+
+def save_snapshot(write) -> None:
+    """
+    Persist a report result to the snapshot store
+    
+    Failures are logged and swallowed so history never breaks a report.
+    
+    Args:
+        write: Callable receiving the SnapshotStore
+    """
+    try:
+        store = get_snapshot_store()
+        if store is not None:
+            write(store)
+    except Exception as e:
+        logger.exception("Failed to save report snapshot: %s", e)
+
+def bug_ids(bugs: List[Dict[str, Any]]) -> List[int]:
+    """Integer bug ids of a bug list, skipping malformed rows"""
+    return [int(bug["bug_id"]) for bug in bugs if str(bug.get("bug_id", "")).isdigit()]
+
+def fetch_priority_bugs(
+    notify_team: str,
+    session: Optional[requests.Session] = None,
+    max_bugs: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Fetch open blocker/critical bugs for a team"""
+    bugs = fetch_bug_list({
+        "bug_severity": ["blocker", "critical"],
+        "bug_status": [ "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"],
+        "chfield": "[Bug creation]",
+        "priority": ALL_PRIORITIES,
+        "product": ["BizomWeb", "ELL", "Mobile App", "OneView DIY"],
+        "version": notify_team,
+        "action": "wrap",
+        "ctype": "csv"
+    }, "priority", session, max_bugs)
+    # A cut-off list would show up in the trends as closed bugs
+    if not limit_bugs(bugs, max_bugs)[1]:
+        save_snapshot(lambda store: store.record_bug_set("priority", notify_team, bug_ids(bugs)))
+    return bugs
+
+def fetch_priority_miss_bugs(
+    notify_team: str,
+    session: Optional[requests.Session] = None,
+    max_bugs: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Fetch blocker/critical bugs for a team created more than a day ago"""
+    bugs = fetch_bug_list({
+        "bug_severity": ["blocker", "critical"],
+        "bug_status": OPEN_BUG_STATUSES,
+        "chfield": "[Bug creation]",
+        "chfieldto": "-1D",
+        "priority": ALL_PRIORITIES,
+        "product": ["BizomWeb", "ELL", "Mobile App", "OneView DIY"],
+        "version": notify_team,
+        "action": "wrap",
+        "ctype": "csv"
+    }, "priority_miss", session, max_bugs)
+    # A cut-off list would show up in the trends as closed bugs
+    if not limit_bugs(bugs, max_bugs)[1]:
+        save_snapshot(lambda store: store.record_bug_set("priority_miss", notify_team, bug_ids(bugs)))
+    return bugs
+
+def sla_trend_report(days: int) -> str:
+    """Snapshot report name of the SLA missed report for a look-back window"""
+    return f"sla_missed:{days}"
+
+def fetch_sla_missed_bugs(
+    notify_team: str,
+    days: int,
+    session: Optional[requests.Session] = None,
+    max_bugs: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Fetch open bugs for a team created more than `days` days ago"""
+    days = days or 3
+    bugs = fetch_bug_list({
+        "bug_severity": ["blocker", "critical", "major", "normal", "minor", "trivial"],
+        "bug_status": OPEN_BUG_STATUSES,
+        "chfield": "[Bug creation]",
+        "chfieldto": f"-{days}d",
+        "component": ["API", "Aqua", "Backend", "Bourbon", "Cross Platform", "Custom Feature", 
+                     "Distiman", "MDM (Changes)", "MDM (New)", "RetailerApp", 
+                     "Templates (Changes)", "Templates (New)", "UI", "Windows Phone"],
+        "priority": ALL_PRIORITIES,
+        "product": ["BizomWeb", "Mobile App"],
+        "version": notify_team,
+        "action": "wrap",
+        "ctype": "csv"
+    }, "sla_missed", session, max_bugs)
+    # A cut-off list would show up in the trends as closed bugs
+    if not limit_bugs(bugs, max_bugs)[1]:
+        # Each look-back window returns a different bug set, so each gets its own series
+        save_snapshot(lambda store: store.record_bug_set(sla_trend_report(days), notify_team, bug_ids(bugs)))
+    return bugs
+
+def fetch_current_day_status(session: Optional[requests.Session] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Fetch the team x status matrix of open bugs from report.cgi
+    
+    Args:
+        session: Authenticated session to reuse; a new one is created when omitted
+    
+    Returns:
+        Dictionary mapping team name to a dictionary of status counts
+        
+    Raises:
+        HTTPException: If login or the query fails
+    """
+    params = {
+        "bug_severity": ["blocker", "critical", "major", "normal", "minor", "trivial"],
+        "bug_status": OPEN_BUG_STATUSES,
+        "chfield": "[Bug creation]",
+        "chfieldto": "Now",
+        "priority": ALL_PRIORITIES,
+        "product": ["BizomWeb", "Mobile App"],
+        "x_axis_field": "version",
+        "y_axis_field": "bug_status",
+        "format": "table",
+        "action": "wrap",
+        "ctype": "csv"
+    }
+
+    response = bugzilla_get(REPORT_URL, params, session)
+    read_body(response)
+    
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to fetch report: {response.text}"
+        )
+    
+    headers, rows = parse_csv(response.text)
+    teams = headers[1:]
+    
+    matrix = {
+        team: {
+            row[0]: int(row[team_index])
+            for row in rows
+        }
+        for team_index, team in enumerate(teams, 1)
+    }
+    save_snapshot(lambda store: store.record_status_matrix(matrix))
+    return matrix
+
+def fetch_pivot_snapshot(session: Optional[requests.Session] = None) -> Dict[str, Any]:
+    """
+    Fetch every open bug once with the pivot fields, encoded for local pivots
+    
+    Covers the same bugs as the current-day status matrix.
+    
+    Returns:
+        Encoded snapshot (see app.services.pivot.encode_rows) with a truncated flag
+    """
+    bugs = fetch_bug_list({
+        "bug_severity": ["blocker", "critical", "major", "normal", "minor", "trivial"],
+        "bug_status": OPEN_BUG_STATUSES,
+        "chfield": "[Bug creation]",
+        "chfieldto": "Now",
+        "priority": ALL_PRIORITIES,
+        "product": ["BizomWeb", "Mobile App"],
+        "action": "wrap",
+        "ctype": "csv"
+    }, "pivot", session)
+    bugs, truncated = limit_bugs(bugs)
+    snapshot = encode_rows(bugs, PIVOT_FIELDS)
+    snapshot["truncated"] = truncated
+    return snapshot
+
+def report_source(
+    report: str,
+    notify_team: str = "OS",
+    days: int = 3,
+    session: Optional[requests.Session] = None,
+    max_bugs: Optional[int] = None
+) -> Tuple[Tuple, Callable[[], Any]]:
+    """
+    Cache key and fetch function for a report
+    
+    Endpoints, the digest and the startup warm-up all go through this, so
+    they share cache entries.
+    
+    Args:
+        report: "priority", "priority_miss", "sla_missed", "current_day" or "pivot"
+        notify_team: Team the report is for (the current-day matrix covers every team)
+        days: Look-back for the SLA missed report
+        session: Authenticated session the fetch should reuse
+        max_bugs: Row limit for bug lists; limited lists are cached separately
+        
+    Returns:
+        Cache key and zero-argument fetch function
+    """
+    # Lists cut off at a lower limit must not be served to requests without one
+    limit = (f"max{bug_limit(max_bugs)}",) if bug_limit(max_bugs) < BUGZILLA_MAX_BUGS else ()
+    if report == "priority":
+        return ("priority", notify_team) + limit, lambda: fetch_priority_bugs(notify_team, session, max_bugs)
+    if report == "priority_miss":
+        return ("priority_miss", notify_team) + limit, lambda: fetch_priority_miss_bugs(notify_team, session, max_bugs)
+    if report == "sla_missed":
+        return ("sla_missed", notify_team, days) + limit, lambda: fetch_sla_missed_bugs(notify_team, days, session, max_bugs)
+    if report == "current_day":
+        # The matrix covers every team, so a single cache entry serves all of them
+        return ("current_day",), lambda: fetch_current_day_status(session)
+    if report == "pivot":
+        # One snapshot of raw rows serves every combination of axes
+        return ("pivot_rows",), lambda: fetch_pivot_snapshot(session)
+    raise ValueError(f"Unknown report: {report}")
+
+def check_max_bugs(max_bugs: Optional[int], delta: bool) -> None:
+    """Reject max_bugs in delta mode, where a cut-off list would report the missing bugs as removed"""
+    if max_bugs and delta:
+        raise HTTPException(
+            status_code=400,
+            detail="max_bugs cannot be combined with delta=true"
+        )
+
+async def get_cached_report(key: Tuple, fetch, refresh: bool = False, require_fresh: bool = False) -> Dict[str, Any]:
+    """
+    Get a report from the stale-while-revalidate cache without blocking the event loop
+    
+    Args:
+        key: Cache key identifying the report and its parameters
+        fetch: Zero-argument callable producing a fresh result
+        refresh: Force a synchronous refresh before answering
+        require_fresh: Refresh synchronously when the cached report is stale, serving it if that fails
+        
+    Returns:
+        Report cache entry with data and freshness metadata
+    """
+    return await run_in_threadpool(report_cache.get, key, fetch, refresh, require_fresh)
+
 
 @router.get("/get-priority-bug")
 async def get_priority_bug_report(
     notify_team: str = "OS",
-    google_chat_webhook: str = None,
-    skip_chat: bool = False
+    google_chat_webhook: List[str] = Query(None),
+    webhook_group: str = None,
+    skip_chat: bool = False,
+    refresh: bool = False,
+    require_fresh: bool = False,
+    delta: bool = False,
+    max_bugs: Optional[int] = Query(None, ge=1)
 )-> dict:
     """
     Get Priority report for a specific team and optionally notify via Google Chat.
     Args:
         notify_team (str): Team to notify (default: "OS")
-        google_chat_webhook (str, optional): Custom webhook URL for Google Chat notifications
+        google_chat_webhook (list, optional): Custom webhook URLs for Google Chat notifications (repeat or comma-separate for several spaces)
+        webhook_group (str, optional): Named target group from GOOGLE_CHAT_WEBHOOK_GROUPS
         skip_chat (bool): Flag to skip sending notification to Google Chat (default: False)
+        refresh (bool): Fetch from Bugzilla before answering instead of serving the cached report
+        require_fresh (bool): Fetch from Bugzilla before answering when the cached report is stale, falling back to it if the fetch fails
+        delta (bool): Report only bugs added, changed or removed since the previous delta run, and post only when something changed
+        max_bugs (int, optional): Stop reading the bug list after this many bugs and flag the result as truncated
     Returns:
         dict: Dictionary containing:
             - status (str): Operation status
-            - data (dict): Priority report details including team, bugs list, and count
+            - data (dict): Priority report details including team, bugs list, count and truncated flag
             - posted_to_chat (bool): Whether notification was sent to Google Chat
-            - webhook_used (str): Type of webhook used ('custom', 'default', or 'none')
+            - webhook_used (str): Type of webhook used ('custom', 'default', 'group:<name>' or 'none')
+            - deliveries (list): Delivery result for each webhook, when posted
+            - data_age_seconds (float): Age of the served report
+            - stale (bool): Whether the report is older than the freshness threshold
     Raises:
         HTTPException: If there are errors during API requests or processing
     """
     try:
-        session = get_session_with_login()
-        
-        params = {
-            "bug_severity": ["blocker", "critical"],
-            "bug_status": [ "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"],
-            "chfield": "[Bug creation]",
-            "priority": ["Highest", "High", "Normal", "Low", "Lowest", "---"],
-            "product": ["BizomWeb", "ELL", "Mobile App", "OneView DIY"],
-            "version": notify_team,
-            "action": "wrap",
-            "ctype": "csv"
-        }
+        check_max_bugs(max_bugs, delta)
+        cached = await get_cached_report(*report_source("priority", notify_team, max_bugs=max_bugs), refresh, require_fresh)
+        bugs, truncated = limit_bugs(cached["data"], max_bugs)
         
-        response = session.get(f"{BUGZILLA_URL}/buglist.cgi", params=params)
+        # In delta mode, compare with the previous result for this team and report
+        delta_key = ("priority", notify_team)
+        bug_delta = report_deltas.compare(delta_key, bugs) if delta else None
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to fetch report: {response.text}"
-            )
-            
-        bugs = process_csv_response(response)
-        
-        if not bugs:
-            return {
-                "status": "success",
-                "data": "No priority bugs found",
-                "posted_to_chat": False,
-                "webhook_used": "none"
-            }
+        if not bugs and not has_changes(bug_delta):
+            advance_delta(delta_key, bugs, bug_delta, skip_chat, None)
+            return format_response("No priority bugs found", False, "none", cached)
                 
         # Format the data for return
         result = {
             "team": notify_team,
             "bugs": bugs,
-            "count": len(bugs)
+            "count": len(bugs),
+            "truncated": truncated
         }
+        if bug_delta is not None:
+            result["delta"] = bug_delta
         
         # Post to Google Chat if needed
         chat_posted = False
         webhook_type = "none"
-        if not skip_chat and bugs:
-            chat_service, webhook_type = get_chat_service(google_chat_webhook)
-            chat_service.send_priority_bug_notification(result, notify_team)
+        deliveries = None
+        if not skip_chat and (has_changes(bug_delta) if delta else bugs):
+            chat_service, webhook_type = get_chat_service(google_chat_webhook, webhook_group)
+            if delta:
+                card = chat_service.build_bug_delta_card(bug_delta, notify_team, "P0/P1 SLA Miss")
+            else:
+                card = chat_service.build_priority_bug_card(result, notify_team)
+            # Render once, then fan the same card out to every target; P0/P1 cards skip the digest window
+            deliveries = await run_in_threadpool(chat_service.deliver, card, True)
             chat_posted = True
             
-        return format_response(result, chat_posted, webhook_type)
+        advance_delta(delta_key, bugs, bug_delta, skip_chat, deliveries)
+        return format_response(result, chat_posted, webhook_type, cached, deliveries)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
+        logger.exception("Error processing request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
         )
     
 @router.get("/get-priority-bug-miss")
-async def get_priority_bug_report(
+async def get_priority_bug_miss_report(
     notify_team: str = "OS", 
-    google_chat_webhook: str = None,
-    skip_chat: bool = False
+    google_chat_webhook: List[str] = Query(None),
+    webhook_group: str = None,
+    skip_chat: bool = False,
+    refresh: bool = False,
+    require_fresh: bool = False,
+    delta: bool = False,
+    max_bugs: Optional[int] = Query(None, ge=1)
 )-> dict:
     """
     Get Priority miss report for a specific team and optionally notify via Google Chat.
 
     Args:
         notify_team (str): Team to notify (default: "OS")
-        google_chat_webhook (str, optional): Custom webhook URL for Google Chat notifications
+        google_chat_webhook (list, optional): Custom webhook URLs for Google Chat notifications (repeat or comma-separate for several spaces)
+        webhook_group (str, optional): Named target group from GOOGLE_CHAT_WEBHOOK_GROUPS
         skip_chat (bool): Flag to skip sending notification to Google Chat (default: False)
+        refresh (bool): Fetch from Bugzilla before answering instead of serving the cached report
+        require_fresh (bool): Fetch from Bugzilla before answering when the cached report is stale, falling back to it if the fetch fails
+        delta (bool): Report only bugs added, changed or removed since the previous delta run, and post only when something changed
+        max_bugs (int, optional): Stop reading the bug list after this many bugs and flag the result as truncated
 
     Returns:
         dict: Dictionary containing:
             - status (str): Operation status
-            - data (dict): SLA miss report details including team, bugs list, and count
+            - data (dict): SLA miss report details including team, bugs list, count and truncated flag
             - posted_to_chat (bool): Whether notification was sent to Google Chat
-            - webhook_used (str): Type of webhook used ('custom', 'default', or 'none')
+            - webhook_used (str): Type of webhook used ('custom', 'default', 'group:<name>' or 'none')
+            - deliveries (list): Delivery result for each webhook, when posted
+            - data_age_seconds (float): Age of the served report
+            - stale (bool): Whether the report is older than the freshness threshold
 
     Raises:
         HTTPException: If there are errors during API requests or processing
     """
     try:
-        session = get_session_with_login()
-
-        params = {
-            "bug_severity": ["blocker", "critical"],
-            "bug_status": ["UNCONFIRMED", "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"],
-            "chfield": "[Bug creation]",
-            "chfieldto": "-1D",
-            "priority": ["Highest", "High", "Normal", "Low", "Lowest", "---"],
-            "product": ["BizomWeb", "ELL", "Mobile App", "OneView DIY"],
-            "version": notify_team,
-            "action": "wrap",
-            "ctype": "csv"
-        }
+        check_max_bugs(max_bugs, delta)
+        cached = await get_cached_report(*report_source("priority_miss", notify_team, max_bugs=max_bugs), refresh, require_fresh)
+        bugs, truncated = limit_bugs(cached["data"], max_bugs)
         
-        response = session.get(f"{BUGZILLA_URL}/buglist.cgi", params=params)
+        # In delta mode, compare with the previous result for this team and report
+        delta_key = ("priority_miss", notify_team)
+        bug_delta = report_deltas.compare(delta_key, bugs) if delta else None
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to fetch report: {response.text}"
-            )
-            
-        bugs = process_csv_response(response)
-        
-        if not bugs:
-            return {
-                "status": "success",
-                "data": "No SLA miss bugs found",
-                "posted_to_chat": False,
-                "webhook_used": "none"
-            }
+        if not bugs and not has_changes(bug_delta):
+            advance_delta(delta_key, bugs, bug_delta, skip_chat, None)
+            return format_response("No SLA miss bugs found", False, "none", cached)
                 
         # Format the data for return
         result = {
             "team": notify_team,
             "bugs": bugs,
-            "count": len(bugs)
+            "count": len(bugs),
+            "truncated": truncated
         }
+        if bug_delta is not None:
+            result["delta"] = bug_delta
         
         # Post to Google Chat if needed
         chat_posted = False
         webhook_type = "none"
-        if not skip_chat and bugs:
-            chat_service, webhook_type = get_chat_service(google_chat_webhook)
-            chat_service.send_priority_bug_notification(result, notify_team)
+        deliveries = None
+        if not skip_chat and (has_changes(bug_delta) if delta else bugs):
+            chat_service, webhook_type = get_chat_service(google_chat_webhook, webhook_group)
+            if delta:
+                card = chat_service.build_bug_delta_card(bug_delta, notify_team, "P0/P1 SLA Miss")
+            else:
+                card = chat_service.build_priority_bug_card(result, notify_team)
+            # Render once, then fan the same card out to every target; P0/P1 cards skip the digest window
+            deliveries = await run_in_threadpool(chat_service.deliver, card, True)
             chat_posted = True
             
-        return format_response(result, chat_posted, webhook_type)
+        advance_delta(delta_key, bugs, bug_delta, skip_chat, deliveries)
+        return format_response(result, chat_posted, webhook_type, cached, deliveries)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
+        logger.exception("Error processing request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
@@ -353,68 +845,41 @@ async def get_priority_bug_report(
 @router.get("/current-day-status")
 async def get_current_day_bug_count(
     notify_team: str = "OS", 
-    google_chat_webhook: str = None,
-    skip_chat: bool = False
+    google_chat_webhook: List[str] = Query(None),
+    webhook_group: str = None,
+    skip_chat: bool = False,
+    refresh: bool = False,
+    require_fresh: bool = False,
+    send_now: bool = False
 ) -> dict:
     """
     Get current day's bug status for all teams and optionally notify via Google Chat.
     
     Args:
         notify_team: Team to notify (default: "OS")
-        google_chat_webhook: Optional custom webhook URL for Google Chat notifications
+        google_chat_webhook: Optional custom webhook URLs for Google Chat notifications
+        webhook_group: Optional named target group from GOOGLE_CHAT_WEBHOOK_GROUPS
         skip_chat: Whether to skip sending notification to Google Chat
+        refresh: Fetch from Bugzilla before answering instead of serving the cached report
+        require_fresh: Fetch from Bugzilla before answering when the cached report is stale, falling back to it if the fetch fails
+        send_now: Post immediately even when Chat digest batching is enabled
         
     Returns:
-        dict: Status counts for each team and notification status
+        dict: Status counts for each team, notification status and report freshness
     """
     try:
-        session = get_session_with_login()
-        
-        params = {
-            "bug_severity": ["blocker", "critical", "major", "normal", "minor", "trivial"],
-            "bug_status": ["UNCONFIRMED", "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", 
-                          "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"],
-            "chfield": "[Bug creation]",
-            "chfieldto": "Now",
-            "priority": ["Highest", "High", "Normal", "Low", "Lowest", "---"],
-            "product": ["BizomWeb", "Mobile App"],
-            "x_axis_field": "version",
-            "y_axis_field": "bug_status",
-            "format": "table",
-            "action": "wrap",
-            "ctype": "csv"
-        }
-
-        response = session.get(REPORT_URL, params=params)
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to fetch report: {response.text}"
-            )
-        
-        # Process CSV data
-        csv_data = [[cell.strip().strip('"') for cell in row.split(',')] 
-                   for row in response.text.strip().split('\n')]
-        
-        headers = csv_data[0]
-        teams = headers[1:]
+        cached = await get_cached_report(*report_source("current_day"), refresh, require_fresh)
+        result = cached["data"]
+        teams = list(result.keys())
         
         # Create case-insensitive team mapping
         team_mapping = {team.lower(): team for team in teams}
         
-        result = {
-            team: {
-                row[0]: int(row[team_index])
-                for row in csv_data[1:]
-            }
-            for team_index, team in enumerate(teams, 1)
-        }
-        
         chat_posted = False
         webhook_type = "none"
+        deliveries = None
         if not skip_chat:
-            chat_service, webhook_type = get_chat_service(google_chat_webhook)
+            chat_service, webhook_type = get_chat_service(google_chat_webhook, webhook_group)
             
             # Get the correct case version of the team name
             team_key = notify_team.lower()
@@ -424,15 +889,16 @@ async def get_current_day_bug_count(
                     detail=f"Team '{notify_team}' not found in the report. Available teams: {', '.join(teams)}"
                 )
             
-            chat_service.send_current_day_bug_notification(result, team_mapping[team_key])
+            card = chat_service.build_current_day_bug_card(result, team_mapping[team_key])
+            deliveries = await run_in_threadpool(chat_service.deliver, card, send_now)
             chat_posted = True
         
-        return format_response(result, chat_posted, webhook_type)
+        return format_response(result, chat_posted, webhook_type, cached, deliveries)
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
+        logger.exception("Error processing request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
@@ -442,87 +908,285 @@ async def get_current_day_bug_count(
 @router.get("/get-sla-missed-bugs")
 async def get_sla_missed_bugs_report(
     notify_team: str = "OS", 
-    google_chat_webhook: str = None,
+    google_chat_webhook: List[str] = Query(None),
+    webhook_group: str = None,
     days: int = 3,
-    skip_chat: bool = False
+    skip_chat: bool = False,
+    refresh: bool = False,
+    require_fresh: bool = False,
+    delta: bool = False,
+    max_bugs: Optional[int] = Query(None, ge=1),
+    send_now: bool = False
 )-> dict:
     """
     Get SLA missed bugs report (last 3 days) for a specific team and optionally notify via Google Chat.
 
     Args:
         notify_team (str): Team to notify (default: "OS")
-        google_chat_webhook (str, optional): Custom webhook URL for Google Chat notifications
+        google_chat_webhook (list, optional): Custom webhook URLs for Google Chat notifications (repeat or comma-separate for several spaces)
+        webhook_group (str, optional): Named target group from GOOGLE_CHAT_WEBHOOK_GROUPS
         days (int): Number of days to look back (default: 3)
         skip_chat (bool): Flag to skip sending notification to Google Chat (default: False)
+        refresh (bool): Fetch from Bugzilla before answering instead of serving the cached report
+        require_fresh (bool): Fetch from Bugzilla before answering when the cached report is stale, falling back to it if the fetch fails
+        delta (bool): Report only bugs added, changed or removed since the previous delta run, and post only when something changed
+        max_bugs (int, optional): Stop reading the bug list after this many bugs and flag the result as truncated
+        send_now (bool): Post immediately even when Chat digest batching is enabled
 
     Returns:
         dict: Dictionary containing:
             - status (str): Operation status
-            - data (dict): Recent bugs report details including team, bugs list, and count
+            - data (dict): Recent bugs report details including team, bugs list, count and truncated flag
             - posted_to_chat (bool): Whether notification was sent to Google Chat
-            - webhook_used (str): Type of webhook used ('custom', 'default', or 'none')
+            - webhook_used (str): Type of webhook used ('custom', 'default', 'group:<name>' or 'none')
+            - deliveries (list): Delivery result for each webhook, when posted
+            - data_age_seconds (float): Age of the served report
+            - stale (bool): Whether the report is older than the freshness threshold
 
     Raises:
         HTTPException: If there are errors during API requests or processing
     """
     try:
-        session = get_session_with_login()
-
-        params = {
-            "bug_severity": ["blocker", "critical", "major", "normal", "minor", "trivial"],
-            "bug_status": ["UNCONFIRMED", "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"],
-            "chfield": "[Bug creation]",
-            "chfieldto": f"-{days}d" if days else "-3d",  # Default 3 days if not specified
-            "component": ["API", "Aqua", "Backend", "Bourbon", "Cross Platform", "Custom Feature", 
-                         "Distiman", "MDM (Changes)", "MDM (New)", "RetailerApp", 
-                         "Templates (Changes)", "Templates (New)", "UI", "Windows Phone"],
-            "priority": ["Highest", "High", "Normal", "Low", "Lowest", "---"],
-            "product": ["BizomWeb", "Mobile App"],
-            "version": notify_team,
-            "action": "wrap",
-            "ctype": "csv"
-        }
+        check_max_bugs(max_bugs, delta)
+        cached = await get_cached_report(*report_source("sla_missed", notify_team, days, max_bugs=max_bugs), refresh, require_fresh)
+        bugs, truncated = limit_bugs(cached["data"], max_bugs)
         
-        response = session.get(f"{BUGZILLA_URL}/buglist.cgi", params=params)
+        # In delta mode, compare with the previous result for this team and report
+        delta_key = ("sla_missed", notify_team, days)
+        bug_delta = report_deltas.compare(delta_key, bugs) if delta else None
         
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Failed to fetch report: {response.text}"
-            )
-            
-        bugs = process_csv_response(response)
-        
-        if not bugs:
-            return {
-                "status": "success",
-                "data": "No SLA Miss bugs found",
-                "posted_to_chat": False,
-                "webhook_used": "none"
-            }
+        if not bugs and not has_changes(bug_delta):
+            advance_delta(delta_key, bugs, bug_delta, skip_chat, None)
+            return format_response("No SLA Miss bugs found", False, "none", cached)
                 
         # Format the data for return
         result = {
             "team": notify_team,
             "bugs": bugs,
-            "count": len(bugs)
+            "count": len(bugs),
+            "truncated": truncated
         }
+        if bug_delta is not None:
+            result["delta"] = bug_delta
         
         # Post to Google Chat if needed
         chat_posted = False
         webhook_type = "none"
-        if not skip_chat and bugs:
-            chat_service, webhook_type = get_chat_service(google_chat_webhook)
-            chat_service.send_sla_missed_bugs_notification(result, notify_team)
+        deliveries = None
+        if not skip_chat and (has_changes(bug_delta) if delta else bugs):
+            chat_service, webhook_type = get_chat_service(google_chat_webhook, webhook_group)
+            if delta:
+                card = chat_service.build_bug_delta_card(bug_delta, notify_team, "SLA Missed Bugs")
+            else:
+                card = chat_service.build_sla_missed_bugs_card(result, notify_team)
+            # Render once, then fan the same card out to every target; delta cards
+            # skip the digest window, since the baseline only moves once they are posted
+            deliveries = await run_in_threadpool(chat_service.deliver, card, send_now or delta)
             chat_posted = True
             
-        return format_response(result, chat_posted, webhook_type)
+        advance_delta(delta_key, bugs, bug_delta, skip_chat, deliveries)
+        return format_response(result, chat_posted, webhook_type, cached, deliveries)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error processing request: {str(e)}")
+        logger.exception("Error processing request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+TREND_BUCKETS = {"raw": 0, "hour": 3600, "day": 86400, "week": 604800}
+
+@router.get("/trends")
+async def get_trends(
+    team: List[str] = Query(None, description="Teams to include (repeatable). All teams when omitted."),
+    status: List[str] = Query(None, description="Statuses to include (repeatable). All statuses when omitted."),
+    report: str = Query(
+        None,
+        description="Return bug counts of a buglist report (priority, priority_miss, sla_missed, or sla_missed:<days> for another look-back) instead of the status matrix"
+    ),
+    start: datetime = Query(None, description="Range start (ISO 8601). Defaults to 30 days before end."),
+    end: datetime = Query(None, description="Range end (ISO 8601). Defaults to now."),
+    bucket: str = Query("raw", description="Downsampling bucket: raw, hour, day or week"),
+    include_bug_ids: bool = Query(False, description="Include the bug ids of each point (report trends only)")
+) -> dict:
+    """
+    Get historical time series from recorded report snapshots.
+    
+    Every upstream fetch of /current-day-status records the team x status
+    matrix, and every fetch of a buglist report records its bug ids. Each
+    point is [epoch_seconds, count]; with a bucket, the last snapshot in each
+    bucket is returned.
+    
+    Returns:
+        dict: Series per team and status (or per team for report trends)
+        
+    Raises:
+        HTTPException: If snapshots are disabled or the parameters are invalid
+    """
+    store = get_snapshot_store()
+    if store is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Report snapshots are disabled (SNAPSHOT_DB_PATH is empty)"
+        )
+    if bucket not in TREND_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bucket '{bucket}'. Use one of: {', '.join(TREND_BUCKETS)}"
+        )
+        
+    end_ts = int(end.timestamp()) if end else int(datetime.now().timestamp())
+    start_ts = int(start.timestamp()) if start else int((datetime.fromtimestamp(end_ts) - timedelta(days=30)).timestamp())
+    if start_ts > end_ts:
+        raise HTTPException(
+            status_code=400,
+            detail="start must be before end"
+        )
+    
+    if report == "sla_missed":
+        report = sla_trend_report(3)
+
+    try:
+        if report:
+            series = await run_in_threadpool(
+                store.bug_count_series, report, start_ts, end_ts, team, TREND_BUCKETS[bucket], include_bug_ids
+            )
+        else:
+            series = await run_in_threadpool(
+                store.status_series, start_ts, end_ts, team, status, TREND_BUCKETS[bucket]
+            )
+            
+        return json_response({
+            "status": "success",
+            "data": {
+                "start": start_ts,
+                "end": end_ts,
+                "bucket": bucket,
+                "report": report,
+                "series": series
+            }
+        })
+        
+    except Exception as e:
+        logger.exception("Error processing request: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        )
+
+@router.get("/pivot")
+async def get_pivot(
+    x_axis: str = Query("version", description=f"Field for the rows: {', '.join(PIVOT_FIELDS)}"),
+    y_axis: Optional[str] = Query("bug_status", description="Field for the columns; empty for a single count per row"),
+    filter: List[str] = Query(None, description="Only count bugs matching field:value; repeat for several"),
+    refresh: bool = False
+) -> dict:
+    """
+    Count open bugs by any one or two fields, e.g. component by status or severity by team.
+    
+    All open bugs are fetched once with every pivot field and cached, so
+    any breakdown of the same snapshot costs no further Bugzilla query.
+    
+    Args:
+        x_axis (str): Field for the rows of the matrix (default: "version", i.e. team)
+        y_axis (str, optional): Field for the columns (default: "bug_status")
+        filter (list, optional): field:value filters; values for the same field are alternatives
+        refresh (bool): Fetch from Bugzilla before answering instead of serving the cached snapshot
+        
+    Returns:
+        dict: Dictionary containing:
+            - status (str): Operation status
+            - data (dict): Axis values, count matrix, row and column totals, and truncated flag
+            - data_age_seconds (float): Age of the served snapshot
+            - stale (bool): Whether the snapshot is older than the freshness threshold
+    
+    Raises:
+        HTTPException: If an axis or filter is invalid, or the fetch fails
+    """
+    try:
+        filters = parse_filters(filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    y_axis = y_axis or None
+    unknown = [field for field in [x_axis, y_axis] + [field for field, _ in filters] if field and field not in PIVOT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown pivot fields: {', '.join(unknown)}. Available fields: {', '.join(PIVOT_FIELDS)}"
+        )
+        
+    try:
+        cached = await get_cached_report(*report_source("pivot"), refresh)
+        snapshot = cached["data"]
+        result = pivot(snapshot, x_axis, y_axis, filters)
+        result["truncated"] = snapshot["truncated"]
+        response = {
+            "status": "success",
+            "data": result,
+            "data_age_seconds": cached["data_age_seconds"],
+            "stale": cached["stale"]
+        }
+        if cached["refresh_error"]:
+            response["refresh_error"] = cached["refresh_error"]
+        return json_response(response)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error processing request: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        )
+
+
+@router.get("/column-stats")
+async def get_column_stats() -> dict:
+    """
+    Get buglist.cgi download statistics per report.
+    
+    Shows the columns requested for each report, the bytes and rows
+    downloaded, and, with BUGZILLA_COLUMN_BASELINE enabled, the estimated
+    bytes saved compared with Bugzilla's default columns.
+    """
+    return {
+        "status": "success",
+        "data": {
+            "projection": COLUMN_PROJECTION,
+            "baseline_sampling": COLUMN_BASELINE,
+            "columns": {report: list(columns) for report, columns in REPORT_COLUMNS.items()},
+            "reports": column_stats.snapshot()
+        }
+    }
+
+@router.get("/search")
+async def search_bugs(
+    q: str = Query(..., min_length=1, description="Search text matched against summary, component and assignee"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results"),
+    component: str = Query(None, description="Only return bugs in this component")
+) -> dict:
+    """
+    Search open bugs seen by recent report fetches.
+    
+    Answers from a local index that every priority and SLA report fetch
+    updates, so it only knows bugs those reports returned. Results are
+    ranked by relevance; the last word also matches as a prefix.
+    """
+    started = time.perf_counter()
+    found = bug_search_index.search(q, limit, component)
+    return {
+        "status": "success",
+        "data": {
+            "query": q,
+            "results": [
+                dict(result, url=f"{BUGZILLA_URL}/show_bug.cgi?id={result['bug_id']}")
+                for result in found["results"]
+            ],
+            "total_matches": found["total_matches"],
+            "index": bug_search_index.stats(),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    }
@@ -0,0 +1,41 @@
+import time
+from fastapi import APIRouter, HTTPException
+from app.responses import json_response
+from app.services.jobs import get_job_store
+from app.services.profiler import run_in_threadpool
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status, progress, timing and result of a report job
+
+    Jobs are started by calling a report endpoint with `async=true`.
+
+    Args:
+        job_id (str): Id returned with the 202 response
+
+    Returns:
+        dict: Job record containing:
+            - status (str): "queued", "running", "succeeded" or "failed"
+            - progress (dict): Finished and total steps, for reports that record them
+            - queue_ms, duration_ms (float): Time spent waiting and running
+            - status_code (int): Status the report endpoint answered with
+            - result: The report endpoint's response body, once finished
+
+    Raises:
+        HTTPException: 404 if the job does not exist or its result has expired
+    """
+    job = await run_in_threadpool(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job {job_id} not found or expired"
+        )
+    # The memory backend returns the stored record itself; response-only fields go on a copy
+    job = dict(job)
+    if job["status"] == "running":
+        job["elapsed_ms"] = round((time.time() - job["started_at"]) * 1000, 1)
+    return json_response(job)
@@ -0,0 +1,252 @@
+from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.routers import bugzilla, bitbucket
+from app.services.google_chat import GoogleChatService, resolve_webhooks
+from app.services.jobs import report_progress
+from app.services.profiler import run_in_threadpool
+from app.responses import json_response
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+logger = logging.getLogger(__name__)
+
+BUGZILLA_REPORTS = ("current_day", "priority", "priority_miss", "sla_missed")
+# Reports whose data is the same for every team
+SHARED_REPORTS = ("current_day", "open_prs")
+# P0/P1 reports; a digest carrying one of them is posted without waiting for the Chat digest window
+URGENT_REPORTS = ("priority", "priority_miss")
+DIGEST_REPORTS = BUGZILLA_REPORTS + ("open_prs",)
+DEFAULT_DIGEST_REPORTS = "current_day,priority,sla_missed,open_prs"
+
+
+def build_report_message(chat_service: GoogleChatService, report: str, data: Any, notify_team: str) -> Optional[Dict[str, Any]]:
+    """Render the Chat message the standalone endpoint would post for one sub-report"""
+    if report == "current_day":
+        team_mapping = {team.lower(): team for team in data}
+        if notify_team.lower() not in team_mapping:
+            return None
+        return chat_service.build_current_day_bug_card(data, team_mapping[notify_team.lower()])
+    if report in ("priority", "priority_miss"):
+        return chat_service.build_priority_bug_card(data, notify_team)
+    if report == "sla_missed":
+        return chat_service.build_sla_missed_bugs_card(data, notify_team)
+    if report == "open_prs":
+        return chat_service.build_open_bitbucket_prs_message(data)
+    return None
+
+
+def parse_report_names(reports: str) -> List[str]:
+    """
+    Split a comma-separated report list, dropping duplicates
+    
+    Raises:
+        HTTPException: If a report is unknown or none is given
+    """
+    selected = list(dict.fromkeys(name.strip() for name in reports.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in DIGEST_REPORTS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown reports: {', '.join(unknown) or '(none)'}. Available reports: {', '.join(DIGEST_REPORTS)}"
+        )
+    return selected
+
+
+async def login_for_reports(selected: List[str]) -> Tuple[Any, Optional[str]]:
+    """
+    Log in once for every Bugzilla report in `selected`
+    
+    On failure each fetch tries on its own, so reports that are already
+    cached are still served.
+    
+    Returns:
+        Tuple of (session or None, login error or None)
+    """
+    if not any(name in BUGZILLA_REPORTS for name in selected):
+        return None, None
+    try:
+        return await run_in_threadpool(bugzilla.get_session_with_login), None
+    except HTTPException as he:
+        logger.warning("Digest login failed: %s", he.detail)
+        return None, he.detail
+
+
+async def run_reports(
+    selected: List[str],
+    notify_team: str,
+    days: int = 3,
+    authors: Optional[str] = None,
+    session: Any = None,
+    refresh: bool = False,
+    max_bugs: Optional[int] = None,
+    require_fresh: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run reports concurrently from the same cache entries as their endpoints
+    
+    A failing report gets an "error" entry in place of its data without
+    failing the others. With `require_fresh`, stale cached reports are
+    refetched first and still served if that fails.
+    
+    Returns:
+        Per report its data, freshness and duration, or its error
+    """
+    async def run_report(name: str) -> Dict[str, Any]:
+        report_started = time.perf_counter()
+        try:
+            if name == "open_prs":
+                cached = await run_in_threadpool(bitbucket.get_open_prs_report, authors, False, refresh, require_fresh)
+            else:
+                cached = await bugzilla.get_cached_report(
+                    *bugzilla.report_source(name, notify_team, days, session, max_bugs),
+                    refresh,
+                    require_fresh
+                )
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            logger.warning("Digest report %s failed: %s", name, detail)
+            return {"error": detail, "duration_ms": round((time.perf_counter() - report_started) * 1000, 1)}
+
+        data = cached["data"]
+        if name in ("priority", "priority_miss", "sla_missed"):
+            bugs, truncated = bugzilla.limit_bugs(data, max_bugs)
+            data = {"team": notify_team, "bugs": bugs, "count": len(bugs), "truncated": truncated}
+        result = {
+            "data": data,
+            "data_age_seconds": cached["data_age_seconds"],
+            "stale": cached["stale"],
+            "duration_ms": round((time.perf_counter() - report_started) * 1000, 1)
+        }
+        if cached["refresh_error"]:
+            result["refresh_error"] = cached["refresh_error"]
+        return result
+
+    finished = []
+
+    async def run_and_count(name: str) -> Dict[str, Any]:
+        result = await run_report(name)
+        finished.append(name)
+        # Visible at /jobs/{id} when the digest runs as a job
+        await report_progress(len(finished), len(selected), name)
+        return result
+
+    return dict(zip(selected, await asyncio.gather(*(run_and_count(name) for name in selected))))
+
+
+def build_digest(
+    chat_service: GoogleChatService,
+    results: Dict[str, Dict[str, Any]],
+    notify_team: str
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Render the successful reports, in order, as one Chat message
+    
+    Returns:
+        Tuple of (message or None when there is nothing to post, whether it carries P0/P1 bugs)
+    """
+    parts = {
+        name: build_report_message(chat_service, name, result["data"], notify_team)
+        for name, result in results.items()
+        if "error" not in result
+    }
+    message = chat_service.build_digest_message(list(parts.values()))
+    return message, any(parts[name] for name in URGENT_REPORTS if name in parts)
+
+
+@router.get("/digest")
+async def get_digest(
+    notify_team: str = "OS",
+    reports: str = Query(
+        DEFAULT_DIGEST_REPORTS,
+        description=f"Comma-separated sub-reports to include: {', '.join(DIGEST_REPORTS)}"
+    ),
+    days: int = 3,
+    authors: str = Query(None, description="Filter open PRs by authors (comma-separated)"),
+    google_chat_webhook: List[str] = Query(None),
+    webhook_group: str = None,
+    skip_chat: bool = False,
+    refresh: bool = False,
+    require_fresh: bool = False,
+    max_bugs: Optional[int] = Query(None, ge=1),
+    send_now: bool = False
+) -> dict:
+    """
+    Run several reports concurrently and optionally post them as one Chat message.
+
+    Bugzilla sub-reports share one authenticated session, and every
+    sub-report is served from the same cache entries as its own endpoint.
+    The digest takes as long as its slowest sub-report. A failing sub-report
+    is reported in place of its data without failing the others.
+
+    Args:
+        notify_team (str): Team the digest is for (default: "OS")
+        reports (str): Comma-separated sub-reports (default: current_day,priority,sla_missed,open_prs)
+        days (int): Look-back for the SLA missed report (default: 3)
+        authors (str, optional): Author filter for open PRs
+        google_chat_webhook (list, optional): Custom webhook URLs for Google Chat notifications
+        webhook_group (str, optional): Named target group from GOOGLE_CHAT_WEBHOOK_GROUPS
+        skip_chat (bool): Flag to skip sending the combined message to Google Chat (default: False)
+        refresh (bool): Fetch every sub-report before answering instead of serving cached results
+        require_fresh (bool): Fetch stale sub-reports before answering, falling back to the cached ones if a fetch fails
+        max_bugs (int, optional): Stop reading each bug list after this many bugs and flag it as truncated
+        send_now (bool): Post immediately even when Chat digest batching is enabled (digests with priority bugs are always posted at once)
+
+    Returns:
+        dict: Dictionary containing:
+            - status (str): "success", or "partial" when a sub-report failed
+            - team (str): Team the digest is for
+            - reports (dict): Per sub-report data, freshness and duration, or its error
+            - posted_to_chat (bool): Whether the combined message was sent to Google Chat
+            - webhook_used (str): Type of webhook used
+            - deliveries (list): Delivery result for each webhook, when posted
+            - took_ms (float): Total time spent
+
+    Raises:
+        HTTPException: If an unknown sub-report is requested
+    """
+    started = time.perf_counter()
+    selected = parse_report_names(reports)
+
+    # Log in once for every Bugzilla sub-report
+    session, login_error = await login_for_reports(selected)
+
+    try:
+        results = await run_reports(selected, notify_team, days, authors, session, refresh, max_bugs, require_fresh)
+        failed = [name for name, result in results.items() if "error" in result]
+
+        chat_posted = False
+        webhook_type = "none"
+        deliveries = None
+        if not skip_chat:
+            chat_urls, webhook_type = resolve_webhooks(google_chat_webhook, webhook_group, bugzilla.GOOGLE_CHAT_WEBHOOK)
+            chat_service = GoogleChatService(chat_urls)
+            # Sub-reports are rendered in the requested order and posted as one message
+            message, urgent = build_digest(chat_service, results, notify_team)
+            if message:
+                deliveries = await run_in_threadpool(chat_service.deliver, message, send_now or urgent)
+                chat_posted = True
+
+        response = {
+            "status": "partial" if failed else "success",
+            "team": notify_team,
+            "reports": results,
+            "posted_to_chat": chat_posted,
+            "webhook_used": webhook_type if chat_posted else "none"
+        }
+        if deliveries is not None:
+            response["deliveries"] = deliveries
+        if login_error:
+            response["login_error"] = login_error
+        response["took_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return json_response(response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error processing request: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        )
@@ -1,15 +1,82 @@
 import requests
+import contextvars
+import logging
+import math
+import os
 from fastapi import HTTPException
-from typing import List, Dict
-from datetime import datetime
-import pytz
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 from base64 import b64encode
+from app.services.cache_backend import get_cache_backend
+from app.services.http import read_body, shared_session
+from app.services.profiler import sampled
+from app.services.rate_limiter import RateLimitExceeded, get_bitbucket_limiter, parse_retry_after
+from app.services.timestamps import format_ist, to_epoch
+
+logger = logging.getLogger(__name__)
+
+# How long Bitbucket listings and user lookups are shared between requests and workers
+BITBUCKET_CACHE_SECONDS = int(os.getenv('BITBUCKET_CACHE_SECONDS', '60'))
+USER_UUID_CACHE_SECONDS = int(os.getenv('BITBUCKET_USER_CACHE_SECONDS', '86400'))
+
+# Bounded pool for per-PR enrichment calls; results are cached per PR revision
+ENRICH_WORKERS = int(os.getenv('BITBUCKET_ENRICH_WORKERS', '8'))
+ENRICHMENT_CACHE_SECONDS = int(os.getenv('BITBUCKET_ENRICHMENT_CACHE_SECONDS', '604800'))
+
+# Pages of one listing fetched at the same time once its size is known
+PAGE_WORKERS = int(os.getenv('BITBUCKET_PAGE_WORKERS', '4'))
+
+# Longest a call queues for quota, and how many 429s it retries, before giving up with a 429
+RATE_LIMIT_MAX_WAIT = float(os.getenv('BITBUCKET_RATE_MAX_WAIT_SECONDS', '30'))
+RATE_LIMIT_RETRIES = int(os.getenv('BITBUCKET_RATE_RETRIES', '2'))
+
+PR_LIST_FIELDS = (
+    "values.id,values.title,values.author,values.destination.repository.name,values.destination.repository.full_name,"
+    "values.created_on,values.updated_on,values.links.html.href,values.links.self.href,"
+    "values.source.branch.name,values.destination.branch.name,next,size,pagelen"
+)
+
+def author_key(name: str) -> str:
+    """Author name as compared by the author filter: lowercase, without spaces"""
+    return name.strip().lower().replace(" ", "")
+
+def parse_authors(authors: Optional[str]) -> List[str]:
+    """Author filter keys from a comma-separated list; empty means every author"""
+    return [author_key(name) for name in (authors or "").split(",") if name.strip()]
+
+def format_open_pr(pr: Dict) -> Dict:
+    """Report row for one PR from the listing"""
+    # Normalize once to an epoch timestamp; the IST string is for display only
+    created_at = to_epoch(pr['created_on'])
+    return {
+        "id": pr['id'],
+        "author": pr['author']['display_name'],
+        "title": pr['title'],
+        "repository": pr['destination']['repository']['name'],
+        "source_branch": pr['source']['branch']['name'],
+        "destination_branch": pr['destination']['branch']['name'],
+        "created_on": format_ist(created_at),
+        "created_at": created_at,
+        "updated_at": to_epoch(pr['updated_on']) if pr.get('updated_on') else created_at,
+        "url": pr['links']['html']['href']
+    }
+
+def format_open_prs(prs: List[Dict]) -> List[Dict]:
+    """Report rows for PRs from the listing, newest first"""
+    return sorted((format_open_pr(pr) for pr in prs), key=lambda x: x['created_at'], reverse=True)
+
+def filter_by_authors(rows: List[Dict], authors: Optional[str]) -> List[Dict]:
+    """Report rows by the given authors, keeping their order"""
+    author_list = parse_authors(authors)
+    if not author_list:
+        return rows
+    return [row for row in rows if author_key(row['author']) in author_list]
 
 class BitbucketAPI:
-    def __init__(self, username: str, app_password: str, workspace: str):
+    def __init__(self, username: str, app_password: str, workspace: str, api_base: str = None):
         self.auth = (username, app_password)
         self.workspace = workspace
-        self.api_base = "https://api.bitbucket.org/2.0"
+        self.api_base = (api_base or "https://api.bitbucket.org/2.0").rstrip("/")
         self.headers = {
             "Accept": "application/json",
             "Content-Type": "application/json"
@@ -17,23 +84,21 @@ class BitbucketAPI:
         
     def get_repositories(self) -> List[Dict]:
         """Get all repositories in the workspace"""
+        cache_key = f"bitbucket:repos:{self.workspace}"
+        cached = get_cache_backend().get(cache_key)
+        if cached is not None:
+            return cached
+            
         url = f"{self.api_base}/workspaces/{self.workspace}/repositories"
-        print(f"Requesting URL: {url}")
-        print(f"Using auth: {self.auth[0]}:****")  # Print username but hide password
         
-        response = requests.get(
+        response = self._request(
             url,
-            auth=self.auth,
-            headers=self.headers,
             params={
                 "pagelen": 100,
                 "fields": "values.slug,values.name"
             }
         )
-        
-        print(f"Response status: {response.status_code}")
-        print(f"Response headers: {response.headers}")
-        print(f"Response body: {response.text[:200]}")
+        logger.debug("Repository listing for %s answered %d", self.workspace, response.status_code)
         
         if response.status_code == 401:
             raise HTTPException(
@@ -46,20 +111,25 @@ class BitbucketAPI:
                 detail=f"Failed to fetch repositories: {response.text}"
             )
             
-        return response.json().get('values', [])
+        repositories = response.json().get('values', [])
+        get_cache_backend().set(cache_key, repositories, BITBUCKET_CACHE_SECONDS)
+        return repositories
         
     def get_user_uuid(self, username: str) -> str:
         """Get user's UUID from their username"""
+        cache_key = f"bitbucket:uuid:{username}"
+        cached = get_cache_backend().get(cache_key)
+        if cached is not None:
+            return cached
+            
         url = f"{self.api_base}/users/{username}"
         
-        response = requests.get(
-            url,
-            auth=self.auth,
-            headers=self.headers
-        )
+        response = self._request(url)
         
         if response.status_code == 200:
-            return response.json().get('uuid')
+            uuid = response.json().get('uuid')
+            get_cache_backend().set(cache_key, uuid, USER_UUID_CACHE_SECONDS)
+            return uuid
         elif response.status_code == 404:
             raise HTTPException(
                 status_code=404,
@@ -71,110 +141,317 @@ class BitbucketAPI:
                 detail=f"Failed to fetch user info: {response.text}"
             )
 
-    def get_repository_prs(self, repo_slug: str = "bizomweb2") -> List[Dict]:
-        """Get all open PRs for a repository"""
+    def _request(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """
+        GET a Bitbucket API URL within the shared request quota
+        
+        Every call takes a token from the process-wide limiter first, and
+        quota headers on the response update it. On a 429 all callers pause
+        for Retry-After and the call is retried. The body is read in chunks,
+        up to UPSTREAM_MAX_BYTES.
+        
+        Raises:
+            HTTPException: 429 with Retry-After when quota is not available in time,
+                or 502 when the body exceeds UPSTREAM_MAX_BYTES
+        """
+        limiter = get_bitbucket_limiter()
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                limiter.acquire(RATE_LIMIT_MAX_WAIT)
+            except RateLimitExceeded as e:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Bitbucket request quota exhausted, retry in {e.retry_after:.0f}s",
+                    headers={"Retry-After": str(int(e.retry_after) + 1)}
+                )
+                
+            response = shared_session("bitbucket").get(
+                url,
+                auth=self.auth,
+                headers=self.headers,
+                params=params,
+                stream=True
+            )
+            limiter.observe(response.headers)
+            read_body(response)
+            
+            if response.status_code != 429:
+                return response
+            
+            retry_after = parse_retry_after(response.headers.get("Retry-After"), 60)
+            logger.warning("Bitbucket rate limit hit, pausing requests for %.0fs", retry_after)
+            limiter.pause(retry_after)
+            
+        raise HTTPException(
+            status_code=429,
+            detail="Bitbucket rate limit exceeded",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
+
+    def _get_json(self, url: str, params: Optional[Dict] = None, error_context: str = "Request failed") -> Dict:
+        """
+        GET a Bitbucket API URL and return the decoded JSON body
+        
+        Raises:
+            HTTPException: On authentication failure or any non-200 response
+        """
+        response = self._request(url, params)
+        # One line per page or lookup; sampled so busy listings don't flood the log
+        logger.debug(
+            "Bitbucket %s answered %d (%d bytes)", url, response.status_code, len(response.content),
+            extra={"sampled": True, "page": (params or {}).get("page")}
+        )
+        
+        if response.status_code == 401:
+            raise HTTPException(
+                status_code=401,
+                detail="Authentication failed. Please check your Bitbucket credentials."
+            )
+        elif response.status_code != 200:
+            error_msg = response.text
+            try:
+                error_json = response.json()
+                if 'error' in error_json:
+                    error_msg = error_json['error'].get('message', error_msg)
+            except:
+                pass
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"{error_context}: {error_msg}"
+            )
+            
+        return response.json()
+
+    def _get_all_pages(self, url: str, params: Optional[Dict] = None, error_context: str = "Request failed") -> List[Dict]:
+        """Follow `next` links and collect the values of every page"""
+        values = []
+        while url:
+            data = self._get_json(url, params, error_context)
+            values.extend(data.get('values', []))
+            url = data.get('next')
+            # Params are already included in the next URL
+            params = None
+        return values
+
+    def _get_numbered_pages(self, url: str, params: Dict, error_context: str = "Request failed") -> List[Dict]:
+        """
+        Collect every page of a listing, fetching pages 2..N concurrently
+        
+        The first page's `size` and `pagelen` give the number of pages, so
+        the rest are requested by page number from a bounded pool instead of
+        one `next` link at a time. Values keep page order. Listings without
+        a `size` are followed cursor by cursor.
+        
+        Items can move between pages while they are fetched, so values are
+        de-duplicated by id, and a `next` link on the last page is followed.
+        """
+        first = self._get_json(url, params, error_context)
+        values = list(first.get('values', []))
+        next_url = first.get('next')
+        size = first.get('size')
+        pagelen = first.get('pagelen') or params.get('pagelen')
+        if not next_url:
+            return values
+        if size is None or not pagelen:
+            # Without a total, pages can only be followed one after another
+            return values + self._get_all_pages(next_url, None, error_context)
+            
+        page_numbers = list(range(2, math.ceil(size / pagelen) + 1))
+        pages = []
+        if page_numbers:
+            with ThreadPoolExecutor(max_workers=min(PAGE_WORKERS, len(page_numbers))) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, sampled(self._get_json), url, dict(params, page=number), error_context)
+                    for number in page_numbers
+                ]
+                try:
+                    pages = [future.result() for future in futures]
+                except Exception:
+                    # Don't spend more quota on a listing that already failed
+                    for future in futures:
+                        future.cancel()
+                    raise
+                    
+        for page in pages:
+            values.extend(page.get('values', []))
+        # The listing grew since the first page
+        last_next = pages[-1].get('next') if pages else next_url
+        if last_next:
+            values.extend(self._get_all_pages(last_next, None, error_context))
+            
+        seen = set()
+        unique = []
+        for value in values:
+            key = value.get('id')
+            if key is None or key not in seen:
+                seen.add(key)
+                unique.append(value)
+        return unique
+
+    def get_repository_prs(self, repo_slug: str = "bizomweb2", use_cache: bool = True) -> List[Dict]:
+        """
+        Get all open PRs for a repository
+        
+        Args:
+            repo_slug: Repository to list
+            use_cache: Serve a listing cached within BITBUCKET_CACHE_SECONDS; False always
+                refetches (and caches the new listing)
+        """
+        cache_key = f"bitbucket:prs:{self.workspace}:{repo_slug}"
+        if use_cache:
+            cached = get_cache_backend().get(cache_key)
+            if cached is not None:
+                return cached
+            
         url = f"{self.api_base}/repositories/{self.workspace}/{repo_slug}/pullrequests"
-        print(f"Requesting URL: {url}")
         
         params = {
             "state": "OPEN",
             "pagelen": 50,  # Keep page size reasonable
-            "fields": "values.id,values.title,values.author,values.destination.repository.name,values.created_on,values.links.html.href,values.source.branch.name,values.destination.branch.name,next"
+            "fields": PR_LIST_FIELDS
         }
         
         try:
-            all_prs = []
-            while url:
-                response = requests.get(
-                    url,
-                    auth=self.auth,
-                    headers=self.headers,
-                    params=params
-                )
-                
-                print(f"Response status: {response.status_code}")
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Authentication failed. Please check your Bitbucket credentials."
-                    )
-                elif response.status_code != 200:
-                    error_msg = response.text
-                    try:
-                        error_json = response.json()
-                        if 'error' in error_json:
-                            error_msg = error_json['error'].get('message', error_msg)
-                    except:
-                        pass
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"Failed to fetch PRs: {error_msg}"
-                    )
-                
-                data = response.json()
-                all_prs.extend(data.get('values', []))
-                
-                # Get next page URL if it exists
-                url = data.get('next')
-                # Clear params as they're included in the next URL
-                params = None if url else params
-                
-                print(f"Fetched {len(all_prs)} PRs so far...")
-            
-            print(f"Total PRs fetched: {len(all_prs)}")
+            all_prs = self._get_numbered_pages(url, params, "Failed to fetch PRs")
+            logger.info("Fetched %d open PRs for %s", len(all_prs), repo_slug)
+            get_cache_backend().set(cache_key, all_prs, BITBUCKET_CACHE_SECONDS)
             return all_prs
             
         except requests.RequestException as e:
-            print(f"Request error: {str(e)}")
+            logger.error("Fetching PRs for %s failed: %s", repo_slug, e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Request failed: {str(e)}"
             )
 
-    def get_all_open_prs(self, authors: str = None) -> List[Dict]:
-        """Get all open PRs for bizomweb2"""
+    def get_pr_enrichment(self, pr: Dict) -> Dict:
+        """
+        Get reviewers, approvals, diff size and build status for a PR
+        
+        Results are cached per PR and `updated_on`, so unchanged PRs cost no
+        API calls. While a build is still running the result is only cached
+        briefly, since build statuses do not bump `updated_on`.
+        
+        Args:
+            pr: Raw PR from the listing, including links.self.href and updated_on
+            
+        Returns:
+            Dictionary of review, diffstat and build fields
+        """
+        repository = pr['destination']['repository']['name']
+        cache_key = f"bitbucket:pr-enrichment:{self.workspace}:{repository}:{pr['id']}:{pr.get('updated_on')}"
+        cached = get_cache_backend().get(cache_key)
+        if cached is not None:
+            return cached
+            
+        pr_url = pr['links']['self']['href']
+        
+        details = self._get_json(
+            pr_url,
+            {"fields": "participants.role,participants.approved,participants.state,participants.user.display_name"},
+            "Failed to fetch PR participants"
+        )
+        participants = details.get('participants', [])
+        
+        diffstat = self._get_all_pages(
+            f"{pr_url}/diffstat",
+            {"pagelen": 500, "fields": "values.lines_added,values.lines_removed,next"},
+            "Failed to fetch PR diffstat"
+        )
+        
+        statuses = self._get_all_pages(
+            f"{pr_url}/statuses",
+            {"pagelen": 100, "fields": "values.state,values.name,next"},
+            "Failed to fetch PR build statuses"
+        )
+        states = [status.get('state') for status in statuses]
+        if not states:
+            build_state = "NONE"
+        elif "FAILED" in states or "STOPPED" in states:
+            build_state = "FAILED"
+        elif "INPROGRESS" in states:
+            build_state = "INPROGRESS"
+        else:
+            build_state = "SUCCESSFUL"
+        
+        enrichment = {
+            "reviewers": [
+                p['user']['display_name'] for p in participants if p.get('role') == "REVIEWER"
+            ],
+            "approved_by": [
+                p['user']['display_name'] for p in participants if p.get('approved')
+            ],
+            "changes_requested_by": [
+                p['user']['display_name'] for p in participants if p.get('state') == "changes_requested"
+            ],
+            "files_changed": len(diffstat),
+            "lines_added": sum(d.get('lines_added') or 0 for d in diffstat),
+            "lines_removed": sum(d.get('lines_removed') or 0 for d in diffstat),
+            "build_status": build_state,
+            "failed_builds": [
+                status.get('name') for status in statuses if status.get('state') in ("FAILED", "STOPPED")
+            ]
+        }
+        enrichment["approval_count"] = len(enrichment["approved_by"])
+        
+        ttl = BITBUCKET_CACHE_SECONDS if build_state == "INPROGRESS" else ENRICHMENT_CACHE_SECONDS
+        get_cache_backend().set(cache_key, enrichment, ttl)
+        return enrichment
+
+    def enrich_prs(self, prs: List[Dict]) -> List[Dict]:
+        """Fetch enrichment for many PRs concurrently, preserving input order"""
+        if not prs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(ENRICH_WORKERS, len(prs))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, sampled(self.get_pr_enrichment), pr) for pr in prs]
+            try:
+                return [future.result() for future in futures]
+            except Exception:
+                # Don't spend more quota on a report that already failed
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def get_all_open_prs(self, authors: str = None, enrich: bool = False, prs: Optional[List[Dict]] = None, use_cache: bool = True) -> List[Dict]:
+        """
+        Get all open PRs for bizomweb2
+        
+        Args:
+            authors: Optional comma-separated author filter
+            enrich: Also fetch reviewers, approvals, diff size and build status per PR
+            prs: Raw PRs to report on, e.g. from the webhook-fed PR index; fetched from the API when omitted
+            use_cache: Accept a cached PR listing when fetching; False refetches it
+        """
         try:
             # Get all PRs first
-            prs = self.get_repository_prs()
+            if prs is None:
+                prs = self.get_repository_prs(use_cache=use_cache)
             
             # Process author names if provided
-            author_list = []
-            if authors:
-                # Split by comma, clean each name (lowercase, no spaces)
-                author_list = [
-                    name.strip().lower().replace(" ", "")
-                    for name in authors.split(",")
-                    if name.strip()
-                ]
+            author_list = parse_authors(authors)
             
             # Process each PR
             all_prs = []
+            matched_prs = []
             for pr in prs:
-                # Convert UTC to IST
-                created_on = datetime.fromisoformat(pr['created_on'].replace('Z', '+00:00'))
-                ist_time = created_on.astimezone(pytz.timezone('Asia/Kolkata'))
-                
-                pr_data = {
-                    "author": pr['author']['display_name'],
-                    "title": pr['title'],
-                    "repository": pr['destination']['repository']['name'],
-                    "source_branch": pr['source']['branch']['name'],
-                    "destination_branch": pr['destination']['branch']['name'],
-                    "created_on": ist_time.strftime('%d %b %Y | %I:%M %p IST'),
-                    "url": pr['links']['html']['href']
-                }
-                
                 # Filter by authors if provided
-                if not author_list or pr['author']['display_name'].lower().replace(" ", "") in author_list:
-                    all_prs.append(pr_data)
+                if not author_list or author_key(pr['author']['display_name']) in author_list:
+                    all_prs.append(format_open_pr(pr))
+                    matched_prs.append(pr)
+            
+            # Enrich only the PRs that survived the author filter
+            if enrich:
+                for pr_data, enrichment in zip(all_prs, self.enrich_prs(matched_prs)):
+                    pr_data.update(enrichment)
         
-            # Sort PRs by creation date (newest first)
-            all_prs.sort(key=lambda x: x['created_on'], reverse=True)
+            # Sort PRs by creation time (newest first)
+            all_prs.sort(key=lambda x: x['created_at'], reverse=True)
             return all_prs
             
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"Error details: {str(e)}")
+            logger.exception("Error fetching PRs: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Error fetching PRs: {str(e)}"
@@ -0,0 +1,193 @@
+import csv
+import io
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Ask buglist.cgi for only the columns reports read (false sends Bugzilla's defaults)
+COLUMN_PROJECTION = os.getenv('BUGZILLA_COLUMN_PROJECTION', 'true').lower() in ('1', 'true', 'yes')
+# Download each report once without columnlist to measure the bytes projection saves (one extra full query per report and process)
+COLUMN_BASELINE = os.getenv('BUGZILLA_COLUMN_BASELINE', 'false').lower() in ('1', 'true', 'yes')
+
+# Fields read by the bug cards in GoogleChatService
+CARD_COLUMNS = ("bug_id", "product", "component", "assigned_to", "bug_status", "short_desc", "changeddate")
+
+# Fields kept by ReportDeltaTracker for fingerprints and removed-bug descriptions
+DELTA_COLUMNS = ("bug_id", "changeddate", "short_desc", "component", "assigned_to")
+
+
+def report_columns(*renderers: Sequence[str]) -> Tuple[str, ...]:
+    """Union of the columns several renderers need, in first-seen order"""
+    columns: List[str] = []
+    for renderer in renderers:
+        for column in renderer:
+            if column not in columns:
+                columns.append(column)
+    return tuple(columns)
+
+
+def columnlist_param(columns: Sequence[str]) -> str:
+    """buglist.cgi `columnlist` value; bug_id is always returned and cannot be listed"""
+    return ",".join(column for column in columns if column != "bug_id")
+
+
+def parse_csv(text: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Parse Bugzilla CSV output
+
+    Quoted cells may contain commas, doubled quotes and newlines, which a
+    plain split on commas would break apart.
+
+    Returns:
+        Header row and data rows
+    """
+    rows = [[cell.strip() for cell in row] for row in csv.reader(io.StringIO(text.strip())) if row]
+    if not rows:
+        return [], []
+    return rows[0], rows[1:]
+
+
+def parse_csv_lines(lines: Iterable[str], max_rows: Optional[int] = None) -> Tuple[List[str], List[List[str]]]:
+    """
+    Parse Bugzilla CSV output from an iterator of lines, stopping after max_rows data rows
+
+    Lines are consumed only as far as needed, so a streamed download is cut
+    off as soon as the row limit is reached.
+
+    Returns:
+        Header row and at most max_rows data rows
+    """
+    reader = csv.reader(lines)
+    headers: List[str] = []
+    rows: List[List[str]] = []
+    for row in reader:
+        if not row:
+            continue
+        if not headers:
+            headers = [cell.strip() for cell in row]
+            continue
+        if max_rows is not None and len(rows) >= max_rows:
+            break
+        rows.append([cell.strip() for cell in row])
+    return headers, rows
+
+
+class ColumnProjectionStats:
+    """
+    Per-report counters for buglist.cgi downloads
+
+    `bytes_saved` compares each projected download with the bytes per row of
+    an unprojected download of the same report, once one has been sampled.
+    Each report is sampled at most once per process, whether or not the
+    sample succeeds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        self._baseline_claimed = set()
+
+    def _entry(self, report: str) -> Dict[str, Any]:
+        return self._reports.setdefault(report, {
+            "queries": 0,
+            "rows": 0,
+            "bytes": 0,
+            "bytes_saved": 0,
+            "baseline_bytes_per_row": None,
+            "baseline_error": None,
+            "header_mismatches": 0,
+            "last_query": None
+        })
+
+    def claim_baseline(self, report: str) -> bool:
+        """True exactly once per report, for the caller that should sample an unprojected download"""
+        with self._lock:
+            if report in self._baseline_claimed:
+                return False
+            self._baseline_claimed.add(report)
+            return True
+
+    def record_baseline(self, report: str, size: int, rows: int) -> None:
+        if not rows:
+            # Nothing to compare per row; the claim is kept so the report is not downloaded again
+            self.record_baseline_failure(report, "no rows")
+            return
+        with self._lock:
+            self._entry(report)["baseline_bytes_per_row"] = round(size / rows, 1)
+
+    def record_baseline_failure(self, report: str, error: str) -> None:
+        with self._lock:
+            self._baseline_claimed.add(report)
+            self._entry(report)["baseline_error"] = error
+
+    def record_query(
+        self,
+        report: str,
+        size: int,
+        rows: int,
+        missing: Iterable[str] = (),
+        unexpected: Iterable[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        Record one projected download
+
+        Returns:
+            Summary of the query, including the estimated bytes saved when a baseline is known
+        """
+        missing = list(missing)
+        unexpected = list(unexpected)
+        with self._lock:
+            entry = self._entry(report)
+            baseline = entry["baseline_bytes_per_row"]
+            saved = max(0, int(baseline * rows) - size) if baseline is not None and rows else None
+            entry["queries"] += 1
+            entry["rows"] += rows
+            entry["bytes"] += size
+            entry["bytes_saved"] += saved or 0
+            if missing or unexpected:
+                entry["header_mismatches"] += 1
+            query = {"bytes": size, "rows": rows, "bytes_saved": saved, "missing": missing, "unexpected": unexpected}
+            entry["last_query"] = query
+            return query
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {report: dict(entry) for report, entry in self._reports.items()}
+
+
+column_stats = ColumnProjectionStats()
+
+
+def project_rows(
+    headers: List[str],
+    rows: List[List[str]],
+    columns: Optional[Sequence[str]] = None
+) -> Tuple[List[Dict[str, str]], List[str], List[str]]:
+    """
+    Turn CSV rows into bug dictionaries holding only the requested columns
+
+    Args:
+        headers: CSV header row
+        rows: CSV data rows; rows whose length differs from the header are skipped
+        columns: Columns to keep, or None to keep every column
+
+    Returns:
+        Bug dictionaries, requested columns missing from the header, and
+        returned columns that were not requested
+    """
+    if columns is None:
+        keep = list(range(len(headers)))
+        missing: List[str] = []
+        unexpected: List[str] = []
+    else:
+        wanted = set(columns)
+        keep = [i for i, header in enumerate(headers) if header in wanted]
+        missing = [column for column in columns if column not in headers]
+        unexpected = [header for header in headers if header not in wanted]
+
+    bugs = [
+        {headers[i]: row[i] for i in keep}
+        for row in rows
+        if len(row) == len(headers)
+    ]
+    return bugs, missing, unexpected
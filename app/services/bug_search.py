@@ -0,0 +1,203 @@
+import bisect
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({"a", "an", "and", "are", "com", "for", "in", "is", "of", "on", "or", "the", "to", "with"})
+
+# Matches in the component or assignee count more than a word in the summary
+FIELD_WEIGHTS = {"short_desc": 1.0, "component": 2.0, "assigned_to": 1.5}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BugSearchIndex:
+    """
+    In-memory inverted index over the bugs seen in report fetches.
+
+    Each bug's summary, component and assignee are tokenized into weighted
+    term frequencies, and postings map each term to the bugs containing it.
+    Adding a bug that is already indexed with the same text only refreshes
+    its last-seen time. Results are ranked with BM25, and the last query
+    term also matches as a prefix. At most `max_bugs` bugs are kept; the
+    least recently seen are evicted first, and bugs not seen for
+    `max_age_seconds` are dropped, since they have most likely been closed.
+    """
+
+    def __init__(self, max_bugs: int = 20000, max_age_seconds: float = 7 * 86400):
+        self.max_bugs = max_bugs
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._posting_count = 0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+
+    def _remove(self, bug_id: str) -> None:
+        doc = self._docs.pop(bug_id)
+        for term in doc["terms"]:
+            postings = self._postings[term]
+            del postings[bug_id]
+            self._posting_count -= 1
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+        self._total_length -= self._lengths.pop(bug_id)
+
+    def add_bugs(self, bugs: List[Dict[str, Any]]) -> int:
+        """
+        Add or refresh bug rows from a report fetch
+
+        Returns:
+            Number of bugs whose text was (re)indexed
+        """
+        now = time.time()
+        indexed = 0
+        with self._lock:
+            for bug in bugs:
+                bug_id = str(bug.get("bug_id", ""))
+                if not bug_id:
+                    continue
+                text = tuple(bug.get(field, "") for field in FIELD_WEIGHTS)
+                existing = self._docs.get(bug_id)
+                if existing and existing["text"] == text:
+                    existing["seen_at"] = now
+                    existing["bug_status"] = bug.get("bug_status", existing["bug_status"])
+                    self._docs.move_to_end(bug_id)
+                    continue
+                if existing:
+                    self._remove(bug_id)
+
+                terms: Dict[str, float] = {}
+                for field, value in zip(FIELD_WEIGHTS, text):
+                    for token in tokenize(value):
+                        terms[token] = terms.get(token, 0.0) + FIELD_WEIGHTS[field]
+                if not terms:
+                    # Nothing to match, and a zero length would skew the average length
+                    continue
+                for term, weight in terms.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = {}
+                        self._vocabulary_dirty = True
+                    postings[bug_id] = weight
+                self._posting_count += len(terms)
+                length = sum(terms.values())
+                self._lengths[bug_id] = length
+                self._docs[bug_id] = {
+                    "text": text,
+                    "terms": list(terms),
+                    "bug_status": bug.get("bug_status", ""),
+                    "seen_at": now
+                }
+                self._total_length += length
+                indexed += 1
+
+            self._evict(now)
+        return indexed
+
+    def _evict(self, now: float) -> None:
+        # Docs are ordered by last sighting, so expired and surplus ones are at the front
+        while self._docs:
+            bug_id, doc = next(iter(self._docs.items()))
+            if len(self._docs) > self.max_bugs or now - doc["seen_at"] > self.max_age_seconds:
+                self._remove(bug_id)
+            else:
+                break
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, query: str, limit: int = 10, component: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rank indexed bugs against a free-text query
+
+        Args:
+            query: Search text; every term adds to the score, none is required
+            limit: Maximum number of results
+            component: Optional case-insensitive component filter
+
+        Returns:
+            Dictionary with ranked "results" (bug fields, score and last-seen
+            time) and "total_matches"
+        """
+        terms = tokenize(query)
+        with self._lock:
+            self._evict(time.time())
+            count = len(self._docs)
+            if not terms or not count or self._total_length <= 0:
+                return {"results": [], "total_matches": 0}
+
+            # BM25 length normalisation: K1 * (1 - B + B * length / average_length)
+            norm_base = K1 * (1 - B)
+            norm_scale = K1 * B * count / self._total_length
+            lengths = self._lengths
+            scores: Dict[str, float] = {}
+            for position, term in enumerate(terms):
+                # The last term may still be being typed
+                candidates = self._expand_prefix(term) if position == len(terms) - 1 and len(term) >= 3 else [term]
+                for candidate in candidates:
+                    postings = self._postings.get(candidate)
+                    if not postings:
+                        continue
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    # Prefix expansions score below the exact term
+                    weight = (1.0 if candidate == term else 0.5) * idf * (K1 + 1)
+                    for bug_id, tf in postings.items():
+                        scores[bug_id] = scores.get(bug_id, 0.0) + weight * tf / (tf + norm_base + norm_scale * lengths[bug_id])
+
+            if component:
+                component = component.lower()
+                scores = {bug_id: score for bug_id, score in scores.items() if self._docs[bug_id]["text"][1].lower() == component}
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = []
+            for bug_id, score in ranked:
+                doc = self._docs[bug_id]
+                short_desc, component_name, assigned_to = doc["text"]
+                results.append({
+                    "bug_id": bug_id,
+                    "score": round(score, 3),
+                    "short_desc": short_desc,
+                    "component": component_name,
+                    "assigned_to": assigned_to,
+                    "bug_status": doc["bug_status"],
+                    "last_seen": int(doc["seen_at"])
+                })
+            return {"results": results, "total_matches": len(scores)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "indexed_bugs": len(self._docs),
+                "terms": len(self._postings),
+                "postings": self._posting_count,
+                "max_bugs": self.max_bugs,
+                "max_age_seconds": self.max_age_seconds
+            }
+
+
+bug_search_index = BugSearchIndex(
+    max_bugs=int(os.getenv('BUG_SEARCH_MAX_BUGS', '20000')),
+    max_age_seconds=float(os.getenv('BUG_SEARCH_MAX_AGE_SECONDS', str(7 * 86400)))
+)
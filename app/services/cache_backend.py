@@ -0,0 +1,304 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store shared by the report cache, Bugzilla sessions and the
+    Bitbucket client. Values must be JSON-serializable; ``ttl`` is in seconds
+    and ``None`` means the entry never expires.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set the key only if it does not exist; returns whether it was set"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process backend, used when no shared backend is configured"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > time.time()):
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """File-backed backend shared by every worker on the same host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (key, time.time())
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+class RedisConnection:
+    """One socket to a Redis-protocol server, used by one thread at a time"""
+
+    def __init__(self, host: str, port: int, db: int, password: Optional[str], timeout: float):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._reader = self._sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", str(db))
+
+    def command(self, *args: str) -> Any:
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+        finally:
+            self._sock.close()
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode() if isinstance(arg, str) else arg
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Cache server error: {payload.decode()}")
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(payload)
+            if count == -1:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected reply from cache server: {line!r}")
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend speaking the Redis protocol (RESP) over a plain socket, so it
+    works against Redis, Valkey, KeyDB or a local stand-in without an extra
+    client dependency.
+
+    Commands run on a pool of up to ``max_connections`` connections, so
+    threadpool workers do not wait for each other's round trips; a caller
+    waits only when every connection is busy.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 5.0, max_connections: int = 16):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: List[RedisConnection] = []
+        self._idle_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._command("GET", key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        args = ["SET", key, json.dumps(value)]
+        if ttl:
+            args += ["PX", str(int(ttl * 1000))]
+        self._command(*args)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        args = ["SET", key, json.dumps(value), "NX"]
+        if ttl:
+            args += ["PX", str(int(ttl * 1000))]
+        return self._command(*args) is not None
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def close(self) -> None:
+        """Close the idle connections"""
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _command(self, *args: str) -> Any:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ConnectionError("No cache server connection available")
+        conn = None
+        try:
+            conn = self._checkout()
+            try:
+                return conn.command(*args)
+            except (OSError, ConnectionError):
+                # Reconnect once; the server may have closed an idle connection
+                conn.close()
+                conn = self._connect()
+                return conn.command(*args)
+        except (OSError, ConnectionError):
+            if conn is not None:
+                conn.close()
+                conn = None
+            raise
+        finally:
+            # Error replies leave the connection usable, so only broken ones are dropped
+            if conn is not None:
+                with self._idle_lock:
+                    self._idle.append(conn)
+            self._slots.release()
+
+    def _checkout(self) -> RedisConnection:
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _connect(self) -> RedisConnection:
+        return RedisConnection(self.host, self.port, self.db, self.password, self.timeout)
+
+
+def create_cache_backend(url: str) -> CacheBackend:
+    """
+    Create a cache backend from a URL
+
+    Args:
+        url: ``memory://``, ``sqlite:///relative/cache.db``,
+             ``sqlite:////absolute/cache.db`` or
+             ``redis://[:password@]host[:port][/db]``
+
+    Returns:
+        CacheBackend instance
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "memory"):
+        return MemoryCacheBackend()
+    if parsed.scheme == "sqlite":
+        return SQLiteCacheBackend(parsed.path[1:] or "bitzilla_cache.db")
+    if parsed.scheme == "redis":
+        return RedisCacheBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+            max_connections=int(os.getenv('CACHE_BACKEND_POOL_SIZE', '16'))
+        )
+    raise ValueError(f"Unsupported cache backend URL: {url}")
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend() -> CacheBackend:
+    """Get the process-wide cache backend configured by CACHE_BACKEND_URL"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_cache_backend(os.getenv('CACHE_BACKEND_URL', 'memory://'))
+        return _backend
@@ -1,26 +1,154 @@
-from datetime import datetime
-import pytz
 import requests
+import json
+import logging
 from fastapi import HTTPException
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import os
+import threading
+import time
+
+from app.services.http import shared_session
+from app.services.profiler import sampled
+from app.services.timestamps import format_ist
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent webhook POSTs when a message goes to several spaces
+CHAT_FANOUT_WORKERS = int(os.getenv('CHAT_FANOUT_WORKERS', '8'))
+# Non-urgent notifications to one webhook within this window are posted as one message; 0 posts at once
+CHAT_DIGEST_WINDOW_SECONDS = float(os.getenv('CHAT_DIGEST_WINDOW_SECONDS', '0'))
+# A webhook's batch is posted early once it holds this many messages
+CHAT_DIGEST_MAX_MESSAGES = int(os.getenv('CHAT_DIGEST_MAX_MESSAGES', '10'))
+
+def mask_webhook(webhook_url: str) -> str:
+    """Identify a webhook target without exposing its key and token"""
+    parsed = urlparse(webhook_url)
+    return f"{parsed.netloc}{parsed.path}"
+
+def resolve_webhooks(
+    webhook_urls: Optional[List[str]] = None,
+    webhook_group: Optional[str] = None,
+    default_webhook: Optional[str] = None
+) -> Tuple[List[str], str]:
+    """
+    Resolve the Google Chat targets for a request
+    
+    Args:
+        webhook_urls: Custom webhook URLs; each entry may hold several comma-separated URLs
+        webhook_group: Name of a target group defined in GOOGLE_CHAT_WEBHOOK_GROUPS
+        default_webhook: Webhook used when neither of the above is given
+        
+    Returns:
+        Tuple of (de-duplicated webhook URLs, webhook_type)
+        
+    Raises:
+        HTTPException: If the group is unknown or no webhook URL is available
+    """
+    urls = [
+        url.strip()
+        for entry in (webhook_urls or [])
+        for url in entry.split(",")
+        if url.strip()
+    ]
+    webhook_type = "custom" if urls else "default"
+    
+    if webhook_group:
+        groups = json.loads(os.getenv('GOOGLE_CHAT_WEBHOOK_GROUPS') or '{}')
+        if webhook_group not in groups:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown webhook group '{webhook_group}'. Available groups: {', '.join(groups) or 'none'}"
+            )
+        urls += groups[webhook_group]
+        webhook_type = f"group:{webhook_group}" if webhook_type == "default" else "custom"
+    
+    if not urls and default_webhook:
+        urls = [default_webhook]
+        
+    if not urls:
+        raise HTTPException(
+            status_code=400,
+            detail="Google Chat webhook URL not configured"
+        )
+    
+    # Preserve order while dropping duplicates so a space never gets the same card twice
+    return list(dict.fromkeys(urls)), webhook_type
     
 class GoogleChatService:
-    def __init__(self, webhook_url: str, base_url: str = None):
-        self.webhook_url = webhook_url
+    def __init__(self, webhook_url: Union[str, List[str]], base_url: str = None):
+        self.webhook_urls = [webhook_url] if isinstance(webhook_url, str) else list(webhook_url)
+        self.webhook_url = self.webhook_urls[0] if self.webhook_urls else None
         self.base_url = base_url or os.getenv('BUGZILLA_URL', 'https://bugzilla.bizom.in')
 
+    def _post(self, webhook_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a rendered message to one webhook and describe the outcome"""
+        try:
+            response = shared_session("chat").post(webhook_url, json=payload)
+        except requests.RequestException as e:
+            # Connection errors echo the URL, which carries the webhook key and token
+            query = urlparse(webhook_url).query
+            error = str(e).replace(query, "***") if query else str(e)
+            logger.warning("Failed to send notification to Google Chat: %s", error)
+            return {"target": mask_webhook(webhook_url), "delivered": False, "status_code": None, "error": error}
+            
+        if response.status_code != 200:
+            logger.warning("Google Chat answered %d for %s: %s", response.status_code, mask_webhook(webhook_url), response.text[:500])
+            return {"target": mask_webhook(webhook_url), "delivered": False, "status_code": response.status_code, "error": response.text}
+            
+        return {"target": mask_webhook(webhook_url), "delivered": True, "status_code": response.status_code, "error": None}
+
+    def deliver(self, payload: Dict[str, Any], urgent: bool = False) -> List[Dict[str, Any]]:
+        """
+        POST an already rendered message to every configured webhook concurrently
+        
+        When a digest window is configured, the message is queued per webhook
+        instead and posted together with the others at the end of the window.
+        Urgent messages are always posted at once.
+        
+        Args:
+            payload: Rendered Google Chat message
+            urgent: Post immediately even when digest batching is enabled
+            
+        Returns:
+            One delivery result per webhook, in configuration order
+        """
+        if CHAT_DIGEST_WINDOW_SECONDS > 0 and not urgent:
+            batcher = get_digest_batcher()
+            return [batcher.add(url, payload) for url in self.webhook_urls]
+            
+        if len(self.webhook_urls) == 1:
+            return [self._post(self.webhook_url, payload)]
+            
+        with ThreadPoolExecutor(max_workers=min(CHAT_FANOUT_WORKERS, len(self.webhook_urls))) as pool:
+            # Each post runs in a copy of the caller's context, so its log records keep the request id,
+            # and its thread is sampled when the request is profiled
+            futures = [pool.submit(contextvars.copy_context().run, sampled(self._post), url, payload) for url in self.webhook_urls]
+            return [future.result() for future in futures]
+
+    def post_message(self, payload: Dict[str, Any]) -> bool:
+        """Send a rendered message and report whether every webhook accepted or queued it"""
+        return all(delivery["delivered"] or delivery.get("queued") for delivery in self.deliver(payload))
+
+    def send_message(self, text: str) -> bool:
+        """Send a plain text message"""
+        return self.post_message({"text": text})
+
     def send_current_day_bug_notification(self, teams_data: dict, team_name: str) -> bool:
         """Send notification to Google Chat for a specific team with modern card layout"""
+        return self.post_message(self.build_current_day_bug_card(teams_data, team_name))
+
+    def build_current_day_bug_card(self, teams_data: dict, team_name: str) -> Dict[str, Any]:
+        """Render the current day status card for a specific team"""
         try:
             team_data = teams_data.get(team_name.upper())
             if not team_data:
                 raise ValueError(f"Team '{team_name}' not found in the report")
             
             # Get current date in IST
-            ist_timezone = pytz.timezone('Asia/Kolkata')
-            ist_time = datetime.now(ist_timezone)
-            datetime_str = ist_time.strftime('%d %b %Y | %I:%M %p IST')
+            datetime_str = format_ist()
             
             bugzilla_url = os.getenv('BUGZILLA_URL')
             
@@ -106,17 +234,10 @@ class GoogleChatService:
                 ]
             }
             
-            # Send the card to Google Chat
-            response = requests.post(self.webhook_url, json=card)
-            
-            if response.status_code != 200:
-                print(f"Failed to send notification to Google Chat: {response.text}")
-                return False
-            
-            return True
+            return card
             
         except Exception as e:
-            print(f"Error sending notification: {str(e)}")
+            logger.exception("Error sending notification: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to send notification: {str(e)}"
@@ -126,20 +247,30 @@ class GoogleChatService:
         """
         Send SLA miss notification to Google Chat.
         
+        Args:
+            result: Dictionary containing SLA miss data
+            team_name: Name of the team to notify
+        """
+        card = self.build_priority_bug_card(result, team_name)
+        if card is None:
+            return
+            
+        return self.post_message(card)
+
+    def build_priority_bug_card(self, result, team_name) -> Optional[Dict[str, Any]]:
+        """
+        Render the P0/P1 SLA miss card, or None when there are no bugs.
+        
         Args:
             result: Dictionary containing SLA miss data
             team_name: Name of the team to notify
         """
         bugs = result.get("bugs", [])
         if not bugs:
-            return
+            return None
             
         # Get current date in IST
-        import pytz
-        from datetime import datetime
-        ist_timezone = pytz.timezone('Asia/Kolkata')
-        ist_time = datetime.now(ist_timezone)
-        datetime_str = ist_time.strftime('%d %b %Y | %I:%M %p IST')
+        datetime_str = format_ist()
         
         # Create a card-based message for Google Chat with modern design
         card = {
@@ -253,33 +384,36 @@ class GoogleChatService:
             ]
         })
         
-        # Send the card to Google Chat
-        response = requests.post(self.webhook_url, json=card)
-        
-        if response.status_code != 200:
-            print(f"Failed to send notification to Google Chat: {response.text}")
-            return False
-        
-        return True
+        return card
 
     def send_sla_missed_bugs_notification(self, result, team_name):
         """
         Send SLA missed bugs notification to Google Chat.
         
+        Args:
+            result: Dictionary containing SLA missed bugs data
+            team_name: Name of the team to notify
+        """
+        card = self.build_sla_missed_bugs_card(result, team_name)
+        if card is None:
+            return False
+            
+        return self.post_message(card)
+
+    def build_sla_missed_bugs_card(self, result, team_name) -> Optional[Dict[str, Any]]:
+        """
+        Render the SLA missed bugs card, or None when there are no bugs.
+        
         Args:
             result: Dictionary containing SLA missed bugs data
             team_name: Name of the team to notify
         """
         bugs = result.get("bugs", [])
         if not bugs:
-            return False
+            return None
             
         # Get current date in IST
-        import pytz
-        from datetime import datetime
-        ist_timezone = pytz.timezone('Asia/Kolkata')
-        ist_time = datetime.now(ist_timezone)
-        datetime_str = ist_time.strftime('%d %b %Y | %I:%M %p IST')
+        datetime_str = format_ist()
         
         # Create a card-based message for Google Chat
         card = {
@@ -369,8 +503,8 @@ class GoogleChatService:
         
             card["cards"][0]["sections"].append(component_section)
         
-            # Add a footer section with action items
-            card["cards"][0]["sections"].append({
+        # Add a footer section with action items
+        card["cards"][0]["sections"].append({
             "widgets": [
                 {
                     "textParagraph": {
@@ -393,15 +527,70 @@ class GoogleChatService:
                 }
             ]
         })
+        
+        return card
+
+    def build_bug_delta_card(self, delta: Dict[str, Any], team_name: str, report_title: str) -> Optional[Dict[str, Any]]:
+        """
+        Render a card listing only new, updated and no-longer-listed bugs, or None when nothing changed.
+        
+        Args:
+            delta: Delta computed by ReportDeltaTracker
+            team_name: Name of the team to notify
+            report_title: Report name shown in the header, e.g. "SLA Missed Bugs"
+        """
+        counts = delta["counts"]
+        if not (counts["added"] or counts["changed"] or counts["removed"]):
+            return None
             
-            # Send the card to Google Chat
-            response = requests.post(self.webhook_url, json=card)
+        datetime_str = format_ist()
+        
+        card = {
+            "cards": [
+                {
+                    "header": {
+                        "title": f"🔁 {report_title} Changes - {team_name.upper()} TEAM",
+                        "subtitle": f"{counts['added']} new | {counts['changed']} updated | {counts['removed']} no longer listed | {datetime_str}"
+                    },
+                    "sections": []
+                }
+            ]
+        }
+        
+        for label, bugs in (("New", delta["added"]), ("Updated", delta["changed"])):
+            if not bugs:
+                continue
+            section = {"header": f"{label} ({len(bugs)})", "widgets": []}
+            for bug in bugs:
+                bug_id = bug.get("bug_id", "N/A")
+                section["widgets"].append({
+                    "keyValue": {
+                        "topLabel": f"Bug #{bug_id} | {bug.get('component', 'Other')}",
+                        "content": bug.get("short_desc", "No description"),
+                        "contentMultiline": True,
+                        "bottomLabel": f"Status: {bug.get('bug_status', 'N/A')} | Assigned to: {bug.get('assigned_to', 'Unassigned')}",
+                        "onClick": {"openLink": {"url": f"{self.base_url}/show_bug.cgi?id={bug_id}"}}
+                    }
+                })
+            card["cards"][0]["sections"].append(section)
             
-            if response.status_code != 200:
-                print(f"Failed to send notification to Google Chat: {response.text}")
-                return False
+        if delta["removed"]:
+            card["cards"][0]["sections"].append({
+                "header": f"No longer listed ({len(delta['removed'])})",
+                "widgets": [
+                    {
+                        "keyValue": {
+                            "topLabel": f"Bug #{bug['bug_id']} | {bug.get('component') or 'Other'}",
+                            "content": bug.get("short_desc") or "No description",
+                            "contentMultiline": True,
+                            "onClick": {"openLink": {"url": f"{self.base_url}/show_bug.cgi?id={bug['bug_id']}"}}
+                        }
+                    }
+                    for bug in delta["removed"]
+                ]
+            })
             
-            return True
+        return card
 
     def send_open_bitbucket_prs_notification(self, prs: List[Dict]) -> bool:
         """
@@ -413,13 +602,23 @@ class GoogleChatService:
         Returns:
             bool: True if notification was sent successfully
         """
+        return self.post_message(self.build_open_bitbucket_prs_message(prs))
+
+    def build_open_bitbucket_prs_message(self, prs: List[Dict]) -> Dict[str, Any]:
+        """
+        Render the open PRs text message
+        
+        Args:
+            prs: List of pull request dictionaries
+            
+        Returns:
+            dict: Google Chat message payload
+        """
         if not prs:
-            return self.send_message("No open pull requests found.")
+            return {"text": "No open pull requests found."}
         
         # Get current date in IST
-        ist_timezone = pytz.timezone('Asia/Kolkata')
-        ist_time = datetime.now(ist_timezone)
-        datetime_str = ist_time.strftime('%d %b %Y | %I:%M %p IST')
+        datetime_str = format_ist()
         
         # Group PRs by author
         prs_by_author = {}
@@ -456,18 +655,134 @@ class GoogleChatService:
                 text_message += f"\n*{pr['title']}*\n"
                 text_message += f"Source: `{pr['source_branch']}` → Target: `{pr['destination_branch']}`\n"
                 text_message += f"Created: {pr['created_on']}\n"
+                if 'build_status' in pr:
+                    text_message += (
+                        f"Reviews: {pr['approval_count']}/{len(pr['reviewers'])} approved"
+                        f"{' | Changes requested' if pr['changes_requested_by'] else ''}"
+                        f" | Build: {pr['build_status']}"
+                        f" | +{pr['lines_added']}/-{pr['lines_removed']} in {pr['files_changed']} files\n"
+                    )
                 text_message += f"Link: {pr['url']}\n"
                 text_message += "───────────────────\n"
         
         # Send as a simple text message
-        simple_message = {
+        return {
             "text": text_message
         }
+
+    def build_digest_message(self, messages: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Combine rendered messages into one Google Chat message
         
-        response = requests.post(self.webhook_url, json=simple_message)
+        Text parts are joined in order and the cards of all parts are shown
+        below them, so several reports arrive as a single post.
         
-        if response.status_code != 200:
-            print(f"Failed to send notification to Google Chat: {response.text}")
-            return False
+        Args:
+            messages: Rendered messages; None entries (reports with nothing to show) are skipped
+            
+        Returns:
+            dict: Google Chat message payload, or None when every part was empty
+        """
+        texts = [message["text"] for message in messages if message and message.get("text")]
+        cards = [card for message in messages if message for card in message.get("cards", [])]
+        if not texts and not cards:
+            return None
+            
+        digest: Dict[str, Any] = {}
+        if texts:
+            digest["text"] = "\n\n".join(texts)
+        if cards:
+            digest["cards"] = cards
+        return digest
+
+
+class DigestBatcher:
+    """
+    Collects notifications per webhook and posts each batch as one message
+    
+    The first message queued for a webhook opens a window of
+    `window_seconds`; everything queued for that webhook until the window
+    closes is merged with build_digest_message and posted once. A batch that
+    reaches `max_messages` is posted straight away, which keeps the combined
+    message within Google Chat's size limits.
+    """
+    
+    def __init__(self, window_seconds: float, max_messages: int = 10):
+        self.window_seconds = window_seconds
+        self.max_messages = max(1, max_messages)
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        
+    def add(self, webhook_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a message for one webhook and describe when it will be sent"""
+        with self._lock:
+            pending = self._pending.setdefault(webhook_url, [])
+            pending.append(payload)
+            if len(pending) == 1:
+                self._deadlines[webhook_url] = time.monotonic() + self.window_seconds
+                timer = threading.Timer(self.window_seconds, self.flush, args=(webhook_url,))
+                timer.daemon = True
+                self._timers[webhook_url] = timer
+                timer.start()
+            full = len(pending) >= self.max_messages
+            send_in = max(0.0, self._deadlines[webhook_url] - time.monotonic())
+            
+        # This message completed the batch, so its outcome is that of the combined post
+        if full:
+            result = self.flush(webhook_url)
+            if result is not None:
+                return result
+        return {
+            "target": mask_webhook(webhook_url),
+            "delivered": False,
+            "queued": True,
+            "send_in_seconds": round(send_in, 1),
+            "status_code": None,
+            "error": None
+        }
         
-        return True
\ No newline at end of file
+    def flush(self, webhook_url: str) -> Optional[Dict[str, Any]]:
+        """Post the pending batch of one webhook, if any"""
+        with self._lock:
+            pending = self._pending.pop(webhook_url, [])
+            self._deadlines.pop(webhook_url, None)
+            timer = self._timers.pop(webhook_url, None)
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return None
+            
+        service = GoogleChatService(webhook_url)
+        message = pending[0] if len(pending) == 1 else service.build_digest_message(pending)
+        if message is None:
+            return None
+        result = service._post(webhook_url, message)
+        if result["delivered"]:
+            logger.info("Posted digest of %d notification(s) to %s", len(pending), result["target"])
+        return dict(result, batched=len(pending))
+        
+    def flush_all(self) -> List[Dict[str, Any]]:
+        """Post every pending batch now, e.g. on shutdown"""
+        with self._lock:
+            webhook_urls = list(self._pending)
+        return [result for result in map(self.flush, webhook_urls) if result is not None]
+        
+    def pending(self) -> Dict[str, int]:
+        """Queued message count per (masked) webhook"""
+        with self._lock:
+            return {mask_webhook(url): len(messages) for url, messages in self._pending.items()}
+
+
+_digest_batcher: Optional[DigestBatcher] = None
+_digest_batcher_lock = threading.Lock()
+
+
+def get_digest_batcher() -> DigestBatcher:
+    """Process-wide digest batcher using CHAT_DIGEST_WINDOW_SECONDS and CHAT_DIGEST_MAX_MESSAGES"""
+    global _digest_batcher
+    with _digest_batcher_lock:
+        if _digest_batcher is None:
+            _digest_batcher = DigestBatcher(CHAT_DIGEST_WINDOW_SECONDS, CHAT_DIGEST_MAX_MESSAGES)
+        return _digest_batcher
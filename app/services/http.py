@@ -0,0 +1,139 @@
+import codecs
+import logging
+import os
+import threading
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+import requests
+from fastapi import HTTPException
+from requests.adapters import HTTPAdapter
+
+from app.services.traffic import create_traffic_adapter, traffic_mode
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections kept per upstream host
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+
+# Largest upstream response body read into memory
+UPSTREAM_MAX_BYTES = int(os.getenv('UPSTREAM_MAX_BYTES', str(32 * 1024 * 1024)))
+
+_adapters: Dict[str, HTTPAdapter] = {}
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def get_adapter(upstream: str) -> HTTPAdapter:
+    """
+    Connection pool shared by every session talking to one upstream
+
+    With UPSTREAM_RECORD_DIR or UPSTREAM_REPLAY_DIR set, the adapter also
+    records the upstream's responses, or serves recorded ones instead.
+    """
+    with _lock:
+        adapter = _adapters.get(upstream)
+        if adapter is None:
+            pool = {"pool_connections": 4, "pool_maxsize": HTTP_POOL_SIZE, "pool_block": False}
+            adapter = create_traffic_adapter(upstream, **pool) or HTTPAdapter(**pool)
+            if traffic_mode():
+                logger.info("Upstream traffic for %s: %s mode", upstream, traffic_mode())
+            _adapters[upstream] = adapter
+        return adapter
+
+
+def new_session(upstream: str) -> requests.Session:
+    """
+    Create a session with its own cookies that reuses the upstream's pooled connections
+
+    Use this where each caller needs separate state, such as Bugzilla login
+    cookies; the TCP and TLS connections underneath are still shared.
+    """
+    session = requests.Session()
+    adapter = get_adapter(upstream)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def shared_session(upstream: str) -> requests.Session:
+    """Process-wide session for stateless calls to an upstream (auth passed per request)"""
+    with _lock:
+        session = _sessions.get(upstream)
+    if session is None:
+        session = new_session(upstream)
+        with _lock:
+            session = _sessions.setdefault(upstream, session)
+    return session
+
+
+def warm_connection(upstream: str, url: Optional[str], timeout: float = 10) -> Optional[int]:
+    """
+    Open a pooled connection to the host of a URL
+
+    Sends a HEAD request to the bare origin, so DNS, TCP and TLS are done
+    before the first real request and no path, query or credential is sent.
+
+    Returns:
+        HTTP status of the HEAD request, or None when no URL is configured
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    response = shared_session(upstream).head(f"{parsed.scheme}://{parsed.netloc}/", timeout=timeout, allow_redirects=False)
+    return response.status_code
+
+
+class StreamedBody:
+    """
+    Reads a response opened with stream=True in chunks, up to a byte limit
+
+    Either read the whole body with `read()`, or iterate `lines()` and stop
+    early; in both cases at most `max_bytes` are held in memory. The caller
+    closes the response.
+    """
+
+    def __init__(self, response: requests.Response, max_bytes: Optional[int] = None, chunk_size: int = 65536):
+        self.response = response
+        self.max_bytes = max_bytes or UPSTREAM_MAX_BYTES
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    def _chunks(self) -> Iterator[bytes]:
+        for chunk in self.response.iter_content(self.chunk_size):
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                self.response.close()
+                host = urlparse(self.response.url).netloc
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"Response from {host} exceeded {self.max_bytes} bytes"
+                )
+            yield chunk
+
+    def read(self) -> bytes:
+        """Read the whole body and keep it on the response, so .text and .json() work as usual"""
+        content = b"".join(self._chunks())
+        self.response._content = content
+        return content
+
+    def lines(self) -> Iterator[str]:
+        """Decoded lines, each ending with its newline except possibly the last"""
+        decoder = codecs.getincrementaldecoder(self.response.encoding or "utf-8")(errors="replace")
+        pending = ""
+        for chunk in self._chunks():
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+
+def read_body(response: requests.Response, max_bytes: Optional[int] = None) -> bytes:
+    """Read a streamed response body, failing with 502 once it exceeds max_bytes"""
+    try:
+        return StreamedBody(response, max_bytes).read()
+    finally:
+        response.close()
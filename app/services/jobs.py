@@ -0,0 +1,119 @@
+import contextvars
+import hashlib
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services.cache_backend import CacheBackend, get_cache_backend
+
+# Report jobs run at the same time per worker, and jobs a worker accepts before answering 503
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_QUEUE_LIMIT = int(os.getenv('JOB_QUEUE_LIMIT', '100'))
+# How long a job and its result can be fetched from /jobs/{id}
+JOB_RESULT_TTL_SECONDS = int(os.getenv('JOB_RESULT_TTL_SECONDS', '3600'))
+
+ACTIVE_STATES = ("queued", "running")
+
+# Record of the job the current task runs for, used to report progress
+current_job: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("current_job", default=None)
+
+
+def job_key(method: str, path: str, query: List[Tuple[str, str]]) -> str:
+    """Identify a request by method, path and query, ignoring parameter order"""
+    canonical = "&".join(f"{name}={value}" for name, value in sorted(query))
+    return hashlib.sha256(f"{method} {path}?{canonical}".encode()).hexdigest()
+
+
+class JobStore:
+    """
+    Job records with their results, kept for `ttl_seconds`
+
+    Records live in the shared cache backend, so with a SQLite or Redis
+    backend any worker can answer for a job another worker runs, and an
+    identical request is only run once across workers.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, backend: Optional[CacheBackend] = None):
+        self.ttl_seconds = ttl_seconds
+        self._backend = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get(f"job:{job_id}")
+
+    def save(self, job: Dict[str, Any]) -> None:
+        self.backend.set(f"job:{job['id']}", job, self.ttl_seconds)
+
+    def submit(self, method: str, path: str, key: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Create a queued job, or return the identical job that is still queued or running
+
+        Returns:
+            Tuple of (job record, whether it is an existing job)
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            # The query is left out; it can carry webhook keys and tokens
+            "method": method,
+            "path": path,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "queue_ms": None,
+            "duration_ms": None,
+            "progress": None,
+            "status_code": None,
+            "result": None
+        }
+        if not self.backend.add(f"job-key:{key}", job["id"], self.ttl_seconds):
+            existing = self.get(self.backend.get(f"job-key:{key}") or "")
+            if existing is not None and existing["status"] in ACTIVE_STATES:
+                return existing, True
+            self.backend.set(f"job-key:{key}", job["id"], self.ttl_seconds)
+        self.save(job)
+        return job, False
+
+    def start(self, job: Dict[str, Any]) -> None:
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        job["queue_ms"] = round((job["started_at"] - job["submitted_at"]) * 1000, 1)
+        self.save(job)
+
+    def finish(self, job: Dict[str, Any], key: str, status_code: Optional[int], result: Any) -> None:
+        job["status"] = "succeeded" if status_code is not None and status_code < 400 else "failed"
+        job["finished_at"] = time.time()
+        job["duration_ms"] = round((job["finished_at"] - job["started_at"]) * 1000, 1)
+        job["status_code"] = status_code
+        job["result"] = result
+        self.save(job)
+        # Identical requests start a new job from now on
+        if self.backend.get(f"job-key:{key}") == job["id"]:
+            self.backend.delete(f"job-key:{key}")
+
+
+_job_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    """Process-wide job store keeping results for JOB_RESULT_TTL_SECONDS"""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(JOB_RESULT_TTL_SECONDS)
+    return _job_store
+
+
+async def report_progress(done: int, total: int, last_step: Optional[str] = None) -> None:
+    """Record how far the current job is; a no-op outside of a job"""
+    job = current_job.get()
+    if job is None:
+        return
+    # The running worker owns the record; the final save on finish carries the last progress
+    job["progress"] = {"done": done, "total": total, "last_step": last_step}
+    await run_in_threadpool(get_job_store().save, dict(job))
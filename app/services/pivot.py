@@ -0,0 +1,114 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# buglist.cgi columns fetched for pivots; any of them can be used as an axis or filter
+PIVOT_FIELDS = tuple(
+    field.strip()
+    for field in os.getenv(
+        'BUGZILLA_PIVOT_FIELDS',
+        'product,component,version,bug_status,bug_severity,priority,assigned_to,target_milestone'
+    ).split(',')
+    if field.strip()
+)
+
+
+def encode_rows(bugs: List[Dict[str, str]], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Store bug rows column by column with integer codes
+
+    Each field keeps its distinct values once, in first-seen order, and one
+    integer code per bug pointing into them. That keeps the cached snapshot
+    small and lets pivots count straight into a dense matrix.
+
+    Returns:
+        Dictionary with "rows" and, per field, its "values" and "codes"
+    """
+    columns = {}
+    for field in fields:
+        index: Dict[str, int] = {}
+        codes = []
+        for bug in bugs:
+            codes.append(index.setdefault(bug.get(field, ""), len(index)))
+        columns[field] = {"values": list(index), "codes": codes}
+    return {"rows": len(bugs), "fields": columns}
+
+
+def parse_filters(filters: Optional[List[str]]) -> List[Tuple[str, List[str]]]:
+    """
+    Parse "field:value" filters; several values for one field are alternatives
+
+    Raises:
+        ValueError: If a filter has no ":" separator
+    """
+    parsed: Dict[str, List[str]] = {}
+    for item in filters or []:
+        field, separator, value = item.partition(":")
+        if not separator:
+            raise ValueError(f"Filter '{item}' must have the form field:value")
+        parsed.setdefault(field.strip(), []).append(value.strip())
+    return list(parsed.items())
+
+
+def pivot(
+    snapshot: Dict[str, Any],
+    x_axis: str,
+    y_axis: Optional[str] = None,
+    filters: Optional[List[Tuple[str, List[str]]]] = None
+) -> Dict[str, Any]:
+    """
+    Count bugs by one or two fields of an encoded snapshot
+
+    Counts go into a flat list indexed by x_code * len(y_values) + y_code,
+    so a pivot is one pass over the integer codes. Values without any
+    matching bug are dropped from the result.
+
+    Args:
+        snapshot: Output of encode_rows
+        x_axis: Field for the rows of the matrix
+        y_axis: Optional field for the columns; without it each row has one count
+        filters: (field, allowed values) pairs a bug must all match
+
+    Returns:
+        Dictionary with the axis values, the count matrix and its totals
+
+    Raises:
+        KeyError: If an axis or filter field is not in the snapshot
+    """
+    fields = snapshot["fields"]
+    x = fields[x_axis]
+    y = fields[y_axis] if y_axis else {"values": ["count"], "codes": None}
+    width = len(y["values"])
+    counts = [0] * (len(x["values"]) * width)
+
+    selected = range(snapshot["rows"])
+    for field, allowed in filters or []:
+        column = fields[field]
+        allowed_codes = {code for code, value in enumerate(column["values"]) if value in allowed}
+        codes = column["codes"]
+        selected = [row for row in selected if codes[row] in allowed_codes]
+
+    x_codes = x["codes"]
+    y_codes = y["codes"]
+    if y_codes is None:
+        for row in selected:
+            counts[x_codes[row]] += 1
+    else:
+        for row in selected:
+            counts[x_codes[row] * width + y_codes[row]] += 1
+
+    matrix = [counts[i * width:(i + 1) * width] for i in range(len(x["values"]))]
+    row_totals = [sum(row) for row in matrix]
+    column_totals = [sum(column) for column in zip(*matrix)] if matrix else [0] * width
+    keep_x = [i for i, total in enumerate(row_totals) if total]
+    keep_y = [j for j, total in enumerate(column_totals) if total]
+
+    return {
+        "x_axis": x_axis,
+        "y_axis": y_axis,
+        "x_values": [x["values"][i] for i in keep_x],
+        "y_values": [y["values"][j] for j in keep_y],
+        "counts": [[matrix[i][j] for j in keep_y] for i in keep_x],
+        "row_totals": [row_totals[i] for i in keep_x],
+        "column_totals": [column_totals[j] for j in keep_y],
+        "total": sum(row_totals)
+    }
@@ -0,0 +1,94 @@
+import bisect
+import heapq
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+GROUP_FIELDS = {"author": "author", "repository": "repository"}
+
+
+def bucket_labels(bucket_days: Sequence[float]) -> List[str]:
+    """Labels for the age ranges split at bucket_days, e.g. [1, 3] -> ["<1d", "1-3d", ">=3d"]"""
+    bounds = [f"{days:g}" for days in bucket_days]
+    if not bounds:
+        return ["all"]
+    labels = [f"<{bounds[0]}d"]
+    labels += [f"{low}-{high}d" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f">={bounds[-1]}d")
+    return labels
+
+
+def build_pr_aging(
+    prs: List[Dict[str, Any]],
+    sla_hours: float,
+    bucket_days: Sequence[float],
+    top_k: int = 5,
+    group_by: str = "author",
+    now: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Summarize how long open PRs have been waiting
+
+    Every PR is bucketed by age and flagged when it is older than the review
+    SLA. For each author (or repository) the oldest `top_k` PRs are picked
+    with a heap, so a large workspace costs O(n log k) rather than a full
+    sort per group.
+
+    Args:
+        prs: Open PRs as returned by BitbucketAPI.get_all_open_prs (with created_at epochs)
+        sla_hours: Review SLA; older PRs are flagged past_sla
+        bucket_days: Ascending age boundaries in days
+        top_k: Oldest PRs listed per group
+        group_by: "author" or "repository"
+        now: Reference time, defaults to the current time
+
+    Returns:
+        Dictionary with totals, per-bucket counts and per-group oldest PRs
+    """
+    now = time.time() if now is None else now
+    field = GROUP_FIELDS[group_by]
+    bounds = sorted(bucket_days)
+    sla_seconds = sla_hours * 3600
+    labels = bucket_labels(bounds)
+    bucket_counts = [0] * len(labels)
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    past_sla = 0
+
+    for pr in prs:
+        age_seconds = max(0.0, now - pr["created_at"])
+        bucket_counts[bisect.bisect_right(bounds, age_seconds / 86400)] += 1
+        if age_seconds > sla_seconds:
+            past_sla += 1
+        groups.setdefault(pr[field], []).append(pr)
+
+    def describe(pr: Dict[str, Any]) -> Dict[str, Any]:
+        age_seconds = max(0.0, now - pr["created_at"])
+        return {
+            "id": pr.get("id"),
+            "title": pr["title"],
+            "author": pr["author"],
+            "repository": pr["repository"],
+            "created_on": pr["created_on"],
+            "age_hours": round(age_seconds / 3600, 1),
+            "past_sla": age_seconds > sla_seconds,
+            "url": pr["url"]
+        }
+
+    group_summaries = {}
+    for name, group_prs in groups.items():
+        oldest = heapq.nsmallest(top_k, group_prs, key=lambda pr: pr["created_at"])
+        group_summaries[name] = {
+            "count": len(group_prs),
+            "past_sla": sum(1 for pr in group_prs if now - pr["created_at"] > sla_seconds),
+            "oldest_age_hours": round(max(0.0, now - oldest[0]["created_at"]) / 3600, 1),
+            "oldest": [describe(pr) for pr in oldest]
+        }
+
+    return {
+        "total": len(prs),
+        "past_sla": past_sla,
+        "sla_hours": sla_hours,
+        "group_by": group_by,
+        "buckets": [{"age": label, "count": count} for label, count in zip(labels, bucket_counts)],
+        # Groups with the oldest waiting PR first
+        "groups": dict(sorted(group_summaries.items(), key=lambda item: -item[1]["oldest_age_hours"]))
+    }
@@ -0,0 +1,306 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields kept per PR; the same subset the open-PRs listing requests
+PR_FIELDS = ("id", "title", "author", "destination", "source", "created_on", "updated_on", "links", "state")
+
+OPEN_EVENTS = ("pullrequest:created", "pullrequest:updated")
+CLOSED_EVENTS = ("pullrequest:fulfilled", "pullrequest:rejected")
+
+
+def slim_pr(pr: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields the open-PRs report reads"""
+    slim = {field: pr[field] for field in PR_FIELDS if field in pr}
+    author = slim.get("author") or {}
+    slim["author"] = {"display_name": author.get("display_name") or author.get("nickname") or "Unknown"}
+    links = slim.get("links") or {}
+    slim["links"] = {name: {"href": links[name]["href"]} for name in ("html", "self") if name in links}
+    return slim
+
+
+def repository_slug(repository: Dict[str, Any]) -> Optional[str]:
+    """
+    Slug of a repository object, taken from its full_name ("workspace/slug")
+
+    The display name can differ from the slug that listings are fetched by,
+    so it is only used when full_name is missing.
+    """
+    full_name = repository.get("full_name")
+    name = full_name.rsplit("/", 1)[-1] if full_name else repository.get("name")
+    return name.lower() if name else None
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check an X-Hub-Signature header ("sha256=<hex hmac>") against the raw body"""
+    if not signature or "=" not in signature:
+        return False
+    algorithm, _, digest = signature.partition("=")
+    if algorithm != "sha256":
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+class PRIndex:
+    """
+    Open pull requests kept up to date by Bitbucket webhook events.
+
+    Events upsert or remove one PR by repository and id, and events older
+    than the stored revision (by `updated_on`) are ignored, so redelivered
+    or out-of-order events are harmless. Closed PRs keep their last revision
+    until the next reconciliation, so a late event cannot reopen them.
+    Repositories are matched by slug. The index is written atomically to
+    a JSON file after every change, and reloaded when another worker has
+    written a newer file, so all workers on a host answer from the same
+    index. A periodic reconciliation poll replaces the index with the full
+    listing to repair missed events.
+    """
+
+    def __init__(self, path: str, repositories: List[str]):
+        self.path = path
+        self.repositories = [repository.lower() for repository in repositories]
+        self._lock = threading.RLock()
+        self._prs: Dict[str, Dict[str, Any]] = {}
+        # updated_on of PRs closed since the last reconciliation
+        self._closed: Dict[str, str] = {}
+        # When an event last changed each PR, to keep changes newer than a reconciliation listing
+        self._changed_at: Dict[str, float] = {}
+        self._updated_at: Optional[float] = None
+        self._synced_at: Optional[float] = None
+        self._events = 0
+        # Bumped on every change, to know when the formatted listing is out of date
+        self._version = 0
+        self._formatted: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+        self._mtime: Optional[float] = None
+        self._reconciler: Optional[threading.Thread] = None
+        self._load()
+
+    @staticmethod
+    def _key(repository: str, pr_id: Any) -> str:
+        return f"{repository}#{pr_id}"
+
+    def _load(self) -> None:
+        """Read the index file if it exists and changed since the last read"""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to load PR index from %s: %s", self.path, e)
+            return
+        self._prs = state.get("prs", {})
+        self._closed = state.get("closed", {})
+        self._changed_at = state.get("changed_at", {})
+        self._updated_at = state.get("updated_at")
+        self._synced_at = state.get("synced_at")
+        self._events = state.get("events", 0)
+        self._version += 1
+        self._mtime = mtime
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        state = {
+            "prs": self._prs,
+            "closed": self._closed,
+            "changed_at": self._changed_at,
+            "updated_at": self._updated_at,
+            "synced_at": self._synced_at,
+            "events": self._events
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.warning("Failed to save PR index to %s: %s", self.path, e)
+
+    def apply_event(self, event_key: str, payload: Dict[str, Any]) -> str:
+        """
+        Apply one Bitbucket webhook event
+
+        Args:
+            event_key: Value of the X-Event-Key header
+            payload: Decoded event body with "pullrequest" and "repository"
+
+        Returns:
+            "upserted", "removed", "outdated" or "ignored"
+        """
+        pr = payload.get("pullrequest")
+        repository = repository_slug(payload.get("repository") or {}) \
+            or repository_slug(((pr or {}).get("destination") or {}).get("repository") or {})
+        if not pr or repository not in self.repositories:
+            return "ignored"
+        if event_key not in OPEN_EVENTS and event_key not in CLOSED_EVENTS:
+            return "ignored"
+
+        key = self._key(repository, pr.get("id"))
+        with self._lock:
+            self._load()
+            stored = self._prs.get(key)
+            revision = stored.get("updated_on") if stored else self._closed.get(key)
+            if revision and revision > (pr.get("updated_on") or ""):
+                return "outdated"
+
+            if event_key in OPEN_EVENTS and pr.get("state", "OPEN") == "OPEN":
+                self._prs[key] = slim_pr(pr)
+                self._closed.pop(key, None)
+                action = "upserted"
+            elif key in self._prs:
+                del self._prs[key]
+                self._closed[key] = pr.get("updated_on") or ""
+                action = "removed"
+            else:
+                return "ignored"
+
+            self._events += 1
+            self._version += 1
+            self._updated_at = self._changed_at[key] = time.time()
+            self._save()
+            return action
+
+    def replace_all(self, prs: List[Dict[str, Any]], started_at: float) -> Dict[str, int]:
+        """
+        Replace the index with a full listing of open PRs
+
+        Events applied after the listing was started may be missing from it,
+        so the PRs they opened, updated or closed keep their indexed state
+        unless the listing has a newer revision.
+
+        Args:
+            prs: Open PRs of the indexed repositories
+            started_at: Time the listing was started
+
+        Returns:
+            Counts of PRs added and removed by the reconciliation
+        """
+        fresh = {}
+        for pr in prs:
+            repository = repository_slug(pr["destination"]["repository"])
+            if repository in self.repositories:
+                fresh[self._key(repository, pr["id"])] = slim_pr(pr)
+        with self._lock:
+            self._load()
+            recent = {key for key, changed_at in self._changed_at.items() if changed_at >= started_at}
+            for key in recent:
+                listed = (fresh.get(key) or {}).get("updated_on") or ""
+                if key in self._prs and listed <= (self._prs[key].get("updated_on") or ""):
+                    fresh[key] = self._prs[key]
+                elif key in self._closed and key in fresh and listed <= self._closed[key]:
+                    del fresh[key]
+            added = len(fresh.keys() - self._prs.keys())
+            removed = len(self._prs.keys() - fresh.keys())
+            self._prs = fresh
+            # Older closed revisions are covered by the listing
+            self._closed = {key: revision for key, revision in self._closed.items() if key in recent and key not in fresh}
+            self._changed_at = {key: self._changed_at[key] for key in recent}
+            self._version += 1
+            self._synced_at = self._updated_at = time.time()
+            self._save()
+        if added or removed:
+            logger.info("PR index reconciliation: %d added, %d removed", added, removed)
+        return {"added": added, "removed": removed}
+
+    def open_prs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            return list(self._prs.values())
+
+    def formatted_prs(self, format_prs: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Open PRs as formatted by format_prs, computed once per change of the index
+
+        The returned list is shared between callers and must not be modified.
+        """
+        with self._lock:
+            self._load()
+            if self._formatted is None or self._formatted[0] != self._version:
+                self._formatted = (self._version, format_prs(list(self._prs.values())))
+            return self._formatted[1]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load()
+            now = time.time()
+            return {
+                "open_prs": len(self._prs),
+                "events_applied": self._events,
+                "updated_at": int(self._updated_at) if self._updated_at else None,
+                "synced_at": int(self._synced_at) if self._synced_at else None,
+                "age_seconds": int(now - self._updated_at) if self._updated_at else None,
+                "repositories": self.repositories
+            }
+
+    @property
+    def synced(self) -> bool:
+        with self._lock:
+            self._load()
+            return self._synced_at is not None
+
+    def age_seconds(self) -> Optional[int]:
+        with self._lock:
+            return int(time.time() - self._updated_at) if self._updated_at else None
+
+    def needs_reconcile(self, interval_seconds: float) -> bool:
+        with self._lock:
+            self._load()
+            return self._synced_at is None or time.time() - self._synced_at >= interval_seconds
+
+    def start_reconciler(self, fetch: Callable[[], List[Dict[str, Any]]], interval_seconds: float) -> None:
+        """
+        Start the background reconciliation poll once per process
+
+        Workers share the index file, so a worker skips its poll when another
+        one reconciled recently.
+        """
+        with self._lock:
+            if self._reconciler is not None or interval_seconds <= 0:
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval_seconds)
+                    if not self.needs_reconcile(interval_seconds):
+                        continue
+                    try:
+                        started_at = time.time()
+                        self.replace_all(fetch(), started_at)
+                    except Exception as e:
+                        logger.exception("PR index reconciliation failed: %s", e)
+
+            self._reconciler = threading.Thread(target=run, name="pr-index-reconciler", daemon=True)
+            self._reconciler.start()
+
+
+_index: Optional[PRIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_pr_index() -> PRIndex:
+    """Process-wide PR index stored at PR_INDEX_PATH (empty keeps it in memory only)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            repositories = os.getenv('BITBUCKET_PR_INDEX_REPOS', 'bizomweb2')
+            _index = PRIndex(
+                os.getenv('PR_INDEX_PATH', 'bitzilla_pr_index.json'),
+                [name.strip() for name in repositories.split(",") if name.strip()]
+            )
+        return _index
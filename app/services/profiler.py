@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool as starlette_run_in_threadpool
+
+# Leaf frames of threads that are parked rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+}
+
+
+def new_profile_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stacks of the threads working for one request at a fixed interval
+
+    The work of a request runs on the event loop thread and on threadpool
+    threads. Threads are sampled only while they are registered with
+    add_thread(), which `sampled` does for the duration of a call, so
+    threadpool work of other requests is left out. The event loop thread is
+    shared by every request, so its samples can include other requests'
+    coroutines. Threads parked in a wait are skipped, which leaves the frames
+    that were using the CPU or blocked on network I/O. Stacks are counted in
+    folded form (root first, frames separated by ";"), as read by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval_seconds: float = 0.005):
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: int) -> None:
+        with self._threads_lock:
+            self._threads[thread_id] += 1
+
+    def remove_thread(self, thread_id: int) -> None:
+        with self._threads_lock:
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            with self._threads_lock:
+                thread_ids = set(self._threads)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in thread_ids:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                labels: List[str] = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# Sampler of the request being profiled, seen by the code running for it
+current_sampler: contextvars.ContextVar[Optional[StackSampler]] = contextvars.ContextVar("current_sampler", default=None)
+
+
+def sampled(func: Callable) -> Callable:
+    """
+    Wrap func so the thread running it is sampled for the request being profiled
+
+    Call it in the request's context, before handing func to another thread;
+    outside a profiled request func is returned unchanged.
+    """
+    sampler = current_sampler.get()
+    if sampler is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        sampler.add_thread(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.remove_thread(thread_id)
+
+    return run
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs) -> Any:
+    """starlette's run_in_threadpool, with the worker thread sampled when the request is profiled"""
+    return await starlette_run_in_threadpool(sampled(func), *args, **kwargs)
+
+
+class ProfileStore:
+    """
+    Profiles saved as files, keeping only the most recent `retention`
+
+    Each profile is a folded-stack file with a JSON metadata file next to it.
+    Files are shared by every worker on a host, so a profile taken by one
+    worker can be downloaded through any of them.
+    """
+
+    def __init__(self, directory: str, retention: int = 20):
+        self.directory = directory
+        self.retention = retention
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def save(self, profile_id: str, sampler: StackSampler, meta: Dict[str, Any]) -> None:
+        """Write a finished profile and drop the oldest beyond the retention cap"""
+        meta = dict(meta, id=profile_id, samples=sampler.samples, interval_ms=sampler.interval_seconds * 1000)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id, ".folded"), "w") as f:
+                f.write(sampler.folded())
+            with open(self._path(profile_id, ".json"), "w") as f:
+                json.dump(meta, f)
+            for old in self.list()[self.retention:]:
+                for suffix in (".folded", ".json"):
+                    try:
+                        os.remove(self._path(old["id"], suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored profiles, newest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda profile: profile.get("started_at", 0), reverse=True)
+
+    def folded(self, profile_id: str) -> Optional[str]:
+        """Folded stacks of a profile, or None if it does not exist"""
+        # Ids are generated here; reject anything that could leave the directory
+        if not profile_id or os.path.basename(profile_id) != profile_id:
+            return None
+        try:
+            with open(self._path(profile_id, ".folded")) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    """Process-wide profile store in PROFILE_DIR keeping PROFILE_RETENTION profiles"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore(
+                os.getenv('PROFILE_DIR', 'profiles'),
+                int(os.getenv('PROFILE_RETENTION', '20'))
+            )
+        return _store
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be sent within the allowed wait"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket tracking an upstream request quota
+
+    The bucket holds up to `limit` tokens and refills at `limit / window`
+    tokens per second, so bursts are allowed while the long-run rate stays
+    within the quota. Quota headers from the upstream replace the local
+    estimate, since they also count requests made by other workers. A 429
+    empties the bucket and pauses every caller until its Retry-After has
+    passed.
+    """
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.rate = limit / window_seconds
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.server_limit: Optional[int] = None
+        self.server_remaining: Optional[int] = None
+        self.server_resource: Optional[str] = None
+        self.server_seen_at: Optional[float] = None
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if now < self.updated_at:
+            return
+        self.tokens = min(self.limit, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, max_wait: float) -> float:
+        """
+        Take one token, waiting for one to become available
+
+        Args:
+            max_wait: Longest time to wait in seconds
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: If no token is available within max_wait
+        """
+        started = time.monotonic()
+        deadline = started + max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    waited = now - started
+                    if waited > 0.001:
+                        self.waits += 1
+                        self.wait_seconds += waited
+                    return waited
+                ready_at = max(self.paused_until, now + (1 - self.tokens) / self.rate)
+                if ready_at > deadline:
+                    self.rejected += 1
+                    raise RateLimitExceeded(ready_at - now)
+                self._cond.wait(ready_at - now)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """Align the local estimate with X-RateLimit-* response headers"""
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        with self._cond:
+            try:
+                self.server_remaining = int(remaining)
+                if headers.get("X-RateLimit-Limit"):
+                    self.server_limit = int(headers["X-RateLimit-Limit"])
+            except ValueError:
+                return
+            self.server_resource = headers.get("X-RateLimit-Resource", self.server_resource)
+            self.server_seen_at = time.time()
+            # The server's count also covers other workers and clients sharing the quota
+            self._refill(time.monotonic())
+            self.tokens = float(min(self.limit, self.server_remaining))
+            self._cond.notify_all()
+
+    def pause(self, retry_after: float) -> None:
+        """Stop all callers for retry_after seconds after a 429"""
+        with self._cond:
+            now = time.monotonic()
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, now + retry_after)
+            # A single token becomes available once the pause ends, to probe the quota
+            self.tokens = 1.0
+            self.updated_at = self.paused_until
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "limit": self.limit,
+                "window_seconds": self.window_seconds,
+                "remaining": int(self.tokens),
+                "server_limit": self.server_limit,
+                "server_remaining": self.server_remaining,
+                "server_resource": self.server_resource,
+                "server_seen_at": int(self.server_seen_at) if self.server_seen_at else None,
+                "paused_for_seconds": round(max(0.0, self.paused_until - now), 1),
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "throttled": self.throttled,
+                "rejected": self.rejected
+            }
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Seconds from a Retry-After header (delta-seconds form), or the default"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bitbucket_limiter() -> TokenBucket:
+    """Process-wide bucket shared by every Bitbucket API call"""
+    with _buckets_lock:
+        if "bitbucket" not in _buckets:
+            _buckets["bitbucket"] = TokenBucket(
+                int(os.getenv('BITBUCKET_RATE_LIMIT', '1000')),
+                float(os.getenv('BITBUCKET_RATE_WINDOW_SECONDS', '3600'))
+            )
+        return _buckets["bitbucket"]
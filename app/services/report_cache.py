@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+from app.services.cache_backend import CacheBackend, get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    """
+    Stale-while-revalidate store for report results.
+
+    The first request for a key fetches synchronously. Afterwards the most
+    recent result is served immediately; once it is older than
+    ``fresh_seconds`` a single background refresh is started for that key.
+    If the refresh fails the last-known-good result keeps being served and
+    the error is reported alongside it. A result older than
+    ``max_stale_seconds`` (0 for no limit) is fetched again synchronously.
+    When a synchronous fetch fails and a previous result exists, that
+    result is served, flagged stale, with the error; only a report that was
+    never fetched raises.
+
+    Entries live in the shared cache backend, so with a SQLite or Redis
+    backend every worker serves the same results and only one of them
+    refreshes a given key at a time.
+    """
+
+    def __init__(
+        self,
+        fresh_seconds: float = 300,
+        max_stale_seconds: float = 0,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = "report",
+        refresh_lock_seconds: float = 120
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.namespace = namespace
+        self.refresh_lock_seconds = refresh_lock_seconds
+        self._backend = backend
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Any],
+        force_refresh: bool = False,
+        require_fresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Get the cached result for a key, fetching or refreshing as needed
+
+        Args:
+            key: Cache key identifying the report and its parameters
+            fetch: Zero-argument callable that produces a fresh result
+            force_refresh: Fetch synchronously even if a cached result exists
+            require_fresh: Fetch synchronously instead of serving a stale result
+
+        Returns:
+            Dictionary with the result ("data") and its freshness metadata
+
+        Raises:
+            Any exception raised by fetch when there is no cached result to fall back to
+        """
+        entry = self.backend.get(self._key(key))
+
+        if entry is not None and not force_refresh:
+            age = time.time() - entry["fetched_at"]
+            too_old = (
+                (self.max_stale_seconds > 0 and age >= self.max_stale_seconds)
+                or (require_fresh and age >= self.fresh_seconds)
+            )
+            if not too_old:
+                if age >= self.fresh_seconds:
+                    self._refresh_in_background(key, fetch)
+                return self._view(entry)
+
+        if entry is None:
+            return self._view(self._store(key, fetch()))
+        try:
+            return self._view(self._store(key, fetch()))
+        except Exception as e:
+            logger.warning("Refresh failed for %s, serving the cached result: %s", key, e)
+            entry["refresh_error"] = str(e)
+            self.backend.set(self._key(key), entry)
+            return self._view(entry, stale=True)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a cached report"""
+        self.backend.delete(self._key(key))
+
+    def _key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([self.namespace] + [str(part) for part in parts])
+
+    def _store(self, key: Hashable, data: Any) -> Dict[str, Any]:
+        entry = {"data": data, "fetched_at": time.time(), "refresh_error": None}
+        self.backend.set(self._key(key), entry)
+        return entry
+
+    def _view(self, entry: Dict[str, Any], stale: bool = False) -> Dict[str, Any]:
+        age = time.time() - entry["fetched_at"]
+        return {
+            "data": entry["data"],
+            "data_age_seconds": round(age, 1),
+            "stale": stale or age >= self.fresh_seconds,
+            "refresh_error": entry["refresh_error"]
+        }
+
+    def _refresh_in_background(self, key: Hashable, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        # Only one worker refreshes a key; the lock expires in case it dies mid-refresh
+        if not self.backend.add(f"{self._key(key)}:refreshing", True, self.refresh_lock_seconds):
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(key, fetch),
+            name=f"report-refresh-{key}",
+            daemon=True
+        )
+        thread.start()
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Any]) -> None:
+        try:
+            self._store(key, fetch())
+        except Exception as e:
+            logger.warning("Background refresh failed for %s: %s", key, e)
+            entry = self.backend.get(self._key(key))
+            if entry is not None:
+                entry["refresh_error"] = str(e)
+                self.backend.set(self._key(key), entry)
+        finally:
+            self.backend.delete(f"{self._key(key)}:refreshing")
+            with self._lock:
+                self._refreshing.discard(key)
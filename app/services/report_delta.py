@@ -0,0 +1,102 @@
+import hashlib
+from typing import Any, Dict, Hashable, List, Optional
+from app.services.cache_backend import CacheBackend, get_cache_backend
+
+
+def bug_fingerprint(bug: Dict[str, Any]) -> str:
+    """
+    Fingerprint a bug row for change detection
+
+    Bugzilla bumps ``changeddate`` on every edit (status, assignee, summary,
+    comments), so it is used directly when present. Rows without it fall
+    back to a hash of all their values.
+    """
+    if bug.get("changeddate"):
+        return bug["changeddate"]
+    row = "\x1f".join(f"{key}={bug[key]}" for key in sorted(bug))
+    return hashlib.blake2b(row.encode(), digest_size=8).hexdigest()
+
+
+def has_changes(delta: Optional[Dict[str, Any]]) -> bool:
+    """Check whether a delta contains any added, changed or removed bug"""
+    return bool(delta and (delta["added"] or delta["changed"] or delta["removed"]))
+
+
+class ReportDeltaTracker:
+    """
+    Remembers the previous bug set per report and computes what changed.
+
+    Only the bug id, its fingerprint and the few fields needed to describe
+    a removed bug are stored, keyed by report and team in the shared cache
+    backend, so every worker compares against the same baseline.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, namespace: str = "delta"):
+        self._backend = backend
+        self.namespace = namespace
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def _storage_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([self.namespace] + [str(part) for part in parts])
+
+    @staticmethod
+    def _state(bugs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        return {
+            str(bug.get("bug_id")): [
+                bug_fingerprint(bug),
+                bug.get("short_desc", ""),
+                bug.get("component", ""),
+                bug.get("assigned_to", "")
+            ]
+            for bug in bugs
+        }
+
+    def compare(self, key: Hashable, bugs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compare bugs with the stored baseline for the key, without changing it
+
+        Call commit() once the changes have been delivered, so changes that
+        were never posted are reported again by the next run.
+
+        Args:
+            key: Report identifier, e.g. ("priority", "OS")
+            bugs: Current bug rows
+
+        Returns:
+            Dictionary with "added", "changed" and "removed" bug lists and their counts.
+            Without a baseline every bug is reported as added.
+        """
+        stored = self.backend.get(self._storage_key(key))
+        previous = stored or {}
+        current = self._state(bugs)
+
+        added = []
+        changed = []
+        for bug in bugs:
+            bug_id = str(bug.get("bug_id"))
+            if bug_id not in previous:
+                added.append(bug)
+            elif previous[bug_id][0] != current[bug_id][0]:
+                changed.append(bug)
+
+        removed = [
+            {"bug_id": bug_id, "short_desc": state[1], "component": state[2], "assigned_to": state[3]}
+            for bug_id, state in previous.items()
+            if bug_id not in current
+        ]
+
+        return {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "counts": {"added": len(added), "changed": len(changed), "removed": len(removed)},
+            "is_baseline": stored is None
+        }
+
+    def commit(self, key: Hashable, bugs: List[Dict[str, Any]]) -> None:
+        """Store bugs as the baseline the next compare() for the key is made against"""
+        self.backend.set(self._storage_key(key), self._state(bugs))
@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+def encode_bug_ids(bug_ids: Iterable[int]) -> bytes:
+    """Encode a set of bug ids as sorted, delta-encoded unsigned varints"""
+    out = bytearray()
+    previous = 0
+    for bug_id in sorted(set(bug_ids)):
+        delta = bug_id - previous
+        previous = bug_id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_bug_ids(data: bytes) -> List[int]:
+    """Decode bug ids produced by encode_bug_ids"""
+    bug_ids = []
+    current = 0
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        current += value
+        bug_ids.append(current)
+        value = 0
+        shift = 0
+    return bug_ids
+
+
+class SnapshotStore:
+    """
+    Append-only history of report results in SQLite.
+
+    Teams, statuses and report names are stored once in lookup tables and
+    referenced by integer id. Matrix cells are keyed by (team, status, time)
+    in a WITHOUT ROWID table, so a time-range query for one series is a
+    single index range scan no matter how much history accumulates. The
+    last matrix of each UTC day is also kept in a rollup table, so day and
+    week trends over years read one row per day instead of every snapshot.
+    Bug-id sets are stored as delta-encoded varint blobs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._ids: Dict[str, Dict[str, int]] = {"teams": {}, "statuses": {}, "reports": {}}
+        self._ids_lock = threading.Lock()
+        conn = self._connect()
+        for table in self._ids:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS status_counts ("
+            "team_id INTEGER NOT NULL, status_id INTEGER NOT NULL, taken_at INTEGER NOT NULL, "
+            "count INTEGER NOT NULL, PRIMARY KEY (team_id, status_id, taken_at)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS status_counts_daily ("
+            "team_id INTEGER NOT NULL, status_id INTEGER NOT NULL, day INTEGER NOT NULL, "
+            "taken_at INTEGER NOT NULL, count INTEGER NOT NULL, "
+            "PRIMARY KEY (team_id, status_id, day)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bug_sets ("
+            "report_id INTEGER NOT NULL, team_id INTEGER NOT NULL, taken_at INTEGER NOT NULL, "
+            "bug_count INTEGER NOT NULL, bug_ids BLOB NOT NULL, "
+            "PRIMARY KEY (report_id, team_id, taken_at)) WITHOUT ROWID"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _id(self, table: str, name: str) -> int:
+        """Get the integer id for a name, creating it on first use"""
+        cached = self._ids[table].get(name)
+        if cached is not None:
+            return cached
+        conn = self._connect()
+        with self._ids_lock:
+            conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            conn.commit()
+            row = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()
+            self._ids[table][name] = row[0]
+        return row[0]
+
+    def _names(self, table: str) -> Dict[int, str]:
+        return dict(self._connect().execute(f"SELECT id, name FROM {table}").fetchall())
+
+    @staticmethod
+    def _filter_ids(names: Dict[int, str], wanted: Optional[List[str]]) -> List[int]:
+        """Ids whose name matches the case-insensitive filter, or all ids without one"""
+        if not wanted:
+            return list(names)
+        wanted_lower = {name.lower() for name in wanted}
+        return [i for i, name in names.items() if name.lower() in wanted_lower]
+
+    def record_status_matrix(self, matrix: Dict[str, Dict[str, int]], taken_at: Optional[float] = None) -> None:
+        """Append a team x status count matrix"""
+        taken_at = int(taken_at or time.time())
+        rows = [
+            (self._id("teams", team), self._id("statuses", status), taken_at, count)
+            for team, counts in matrix.items()
+            for status, count in counts.items()
+        ]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO status_counts (team_id, status_id, taken_at, count) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.executemany(
+                "INSERT INTO status_counts_daily (team_id, status_id, day, taken_at, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (team_id, status_id, day) DO UPDATE SET taken_at = excluded.taken_at, count = excluded.count "
+                "WHERE excluded.taken_at >= status_counts_daily.taken_at",
+                [(team_id, status_id, taken_at // 86400, taken_at, count) for team_id, status_id, taken_at, count in rows]
+            )
+
+    def record_bug_set(self, report: str, team: str, bug_ids: Iterable[int], taken_at: Optional[float] = None) -> None:
+        """Append the bug ids returned by a buglist report for a team"""
+        taken_at = int(taken_at or time.time())
+        bug_ids = list(bug_ids)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO bug_sets (report_id, team_id, taken_at, bug_count, bug_ids) VALUES (?, ?, ?, ?, ?)",
+                (self._id("reports", report), self._id("teams", team), taken_at, len(set(bug_ids)), encode_bug_ids(bug_ids))
+            )
+
+    def status_series(
+        self,
+        start: int,
+        end: int,
+        teams: Optional[List[str]] = None,
+        statuses: Optional[List[str]] = None,
+        bucket_seconds: int = 0
+    ) -> Dict[str, Dict[str, List[List[int]]]]:
+        """
+        Get status count time series per team
+
+        Args:
+            start: Range start (epoch seconds, inclusive)
+            end: Range end (epoch seconds, inclusive)
+            teams: Optional team filter
+            statuses: Optional status filter
+            bucket_seconds: Downsample to the last snapshot in each bucket (0 keeps every snapshot)
+
+        Returns:
+            {team: {status: [[taken_at, count], ...]}}
+        """
+        team_names = self._names("teams")
+        status_names = self._names("statuses")
+        team_ids = self._filter_ids(team_names, teams)
+        status_ids = self._filter_ids(status_names, statuses)
+
+        series: Dict[str, Dict[str, List[List[int]]]] = {}
+        conn = self._connect()
+        # Whole-day buckets are answered from the daily rollup; the last snapshot
+        # of a bucket is always the last snapshot of one of its days
+        use_daily = bucket_seconds and bucket_seconds % 86400 == 0
+        for team_id in team_ids:
+            for status_id in status_ids:
+                if use_daily:
+                    # SQLite returns the row holding MAX(taken_at) for the bare `count` column
+                    rows = conn.execute(
+                        "SELECT MAX(taken_at), count FROM status_counts_daily "
+                        "WHERE team_id = ? AND status_id = ? AND day BETWEEN ? AND ? AND taken_at >= ? "
+                        "GROUP BY day / ? ORDER BY 1",
+                        (team_id, status_id, start // 86400, end // 86400 - 1, start, bucket_seconds // 86400)
+                    ).fetchall()
+                    # The rollup of the last day may lie past `end`, so read it from the raw table
+                    last = conn.execute(
+                        "SELECT taken_at, count FROM status_counts "
+                        "WHERE team_id = ? AND status_id = ? AND taken_at BETWEEN ? AND ? "
+                        "ORDER BY taken_at DESC LIMIT 1",
+                        (team_id, status_id, max(start, end // 86400 * 86400), end)
+                    ).fetchone()
+                    if last:
+                        if rows and rows[-1][0] // bucket_seconds == last[0] // bucket_seconds:
+                            rows[-1] = last
+                        else:
+                            rows.append(last)
+                elif bucket_seconds:
+                    rows = conn.execute(
+                        "SELECT MAX(taken_at), count FROM status_counts "
+                        "WHERE team_id = ? AND status_id = ? AND taken_at BETWEEN ? AND ? "
+                        "GROUP BY taken_at / ? ORDER BY 1",
+                        (team_id, status_id, start, end, bucket_seconds)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        "SELECT taken_at, count FROM status_counts "
+                        "WHERE team_id = ? AND status_id = ? AND taken_at BETWEEN ? AND ? ORDER BY taken_at",
+                        (team_id, status_id, start, end)
+                    ).fetchall()
+                if rows:
+                    series.setdefault(team_names[team_id], {})[status_names[status_id]] = [list(row) for row in rows]
+        return series
+
+    def bug_count_series(
+        self,
+        report: str,
+        start: int,
+        end: int,
+        teams: Optional[List[str]] = None,
+        bucket_seconds: int = 0,
+        include_bug_ids: bool = False
+    ) -> Dict[str, List[list]]:
+        """
+        Get bug count time series per team for a buglist report
+
+        Returns:
+            {team: [[taken_at, bug_count], ...]}, with the bug ids appended to
+            each point when include_bug_ids is set
+        """
+        report_id = self._ids["reports"].get(report)
+        if report_id is None:
+            row = self._connect().execute("SELECT id FROM reports WHERE name = ?", (report,)).fetchone()
+            if row is None:
+                return {}
+            report_id = row[0]
+
+        team_names = self._names("teams")
+        team_ids = self._filter_ids(team_names, teams)
+        columns = "bug_count, bug_ids" if include_bug_ids else "bug_count"
+
+        series: Dict[str, List[list]] = {}
+        conn = self._connect()
+        for team_id in team_ids:
+            if bucket_seconds:
+                rows = conn.execute(
+                    f"SELECT MAX(taken_at), {columns} FROM bug_sets "
+                    "WHERE report_id = ? AND team_id = ? AND taken_at BETWEEN ? AND ? "
+                    "GROUP BY taken_at / ? ORDER BY 1",
+                    (report_id, team_id, start, end, bucket_seconds)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"SELECT taken_at, {columns} FROM bug_sets "
+                    "WHERE report_id = ? AND team_id = ? AND taken_at BETWEEN ? AND ? ORDER BY taken_at",
+                    (report_id, team_id, start, end)
+                ).fetchall()
+            if rows:
+                series[team_names[team_id]] = [
+                    [row[0], row[1], decode_bug_ids(row[2])] if include_bug_ids else list(row)
+                    for row in rows
+                ]
+        return series
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Get the snapshot store at SNAPSHOT_DB_PATH, or None when snapshots are disabled"""
+    global _store
+    path = os.getenv('SNAPSHOT_DB_PATH', 'bitzilla_snapshots.db')
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore(path)
+        return _store
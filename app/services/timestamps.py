@@ -0,0 +1,19 @@
+import time
+from datetime import datetime
+from typing import Optional
+
+import pytz
+
+# All report times are shown in IST
+IST = pytz.timezone('Asia/Kolkata')
+IST_FORMAT = '%d %b %Y | %I:%M %p IST'
+
+
+def to_epoch(value: str) -> float:
+    """Seconds since the epoch for an ISO 8601 timestamp such as Bitbucket's created_on"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def format_ist(epoch: Optional[float] = None) -> str:
+    """Display form of an epoch timestamp in IST, e.g. "05 Mar 2025 | 02:30 PM IST" (now when omitted)"""
+    return datetime.fromtimestamp(time.time() if epoch is None else epoch, IST).strftime(IST_FORMAT)
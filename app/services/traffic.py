@@ -0,0 +1,352 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.client import parse_headers
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+# Record upstream traffic into this directory, or serve it back from there instead of the network
+UPSTREAM_RECORD_DIR = os.getenv('UPSTREAM_RECORD_DIR')
+UPSTREAM_REPLAY_DIR = os.getenv('UPSTREAM_REPLAY_DIR')
+# Multiplier on recorded response times during replay; 0 answers without delay
+UPSTREAM_REPLAY_SPEED = float(os.getenv('UPSTREAM_REPLAY_SPEED', '1'))
+# Replace the local part of e-mail addresses in recordings with a hash of the same length
+UPSTREAM_RECORD_MASK_EMAILS = os.getenv('UPSTREAM_RECORD_MASK_EMAILS', 'true').lower() in ('1', 'true', 'yes')
+# Same for Bitbucket display names and nicknames; replays then filter by the masked names
+UPSTREAM_RECORD_MASK_NAMES = os.getenv('UPSTREAM_RECORD_MASK_NAMES', 'true').lower() in ('1', 'true', 'yes')
+# Largest response body stored in a recording; longer bodies are cut and the recording marked truncated
+UPSTREAM_RECORD_MAX_BYTES = int(os.getenv('UPSTREAM_RECORD_MAX_BYTES', os.getenv('UPSTREAM_MAX_BYTES', str(32 * 1024 * 1024))))
+
+# Query parameters whose values never reach a recording
+SECRET_PARAMS = {
+    "bugzilla_api_key", "api_key", "bugzilla_password", "bugzilla_login_token",
+    "bugzilla_token", "token", "key", "password", "access_token"
+}
+# Headers that are left out of recordings; bodies are stored decoded and re-framed on replay
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+REDACTED = "REDACTED"
+
+EMAIL_PATTERN = re.compile(r"\b([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})\b")
+# JSON string values of Bitbucket user names
+NAME_FIELD_PATTERN = re.compile(r'("(?:display_name|nickname)"\s*:\s*")((?:[^"\\]|\\.)*)(")')
+# Bugzilla login form inputs carrying the login and CSRF tokens
+INPUT_TAG_PATTERN = re.compile(r"<input\b[^>]*>", re.IGNORECASE)
+FORM_TOKEN_INPUTS = ('name="Bugzilla_login_token"', 'id="token"', 'name="token"')
+INPUT_VALUE_PATTERN = re.compile(r'value="[^"]*"')
+
+
+def _stable_hash(text: str) -> str:
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    # Same length and stable per value, so column widths and grouping by person survive
+    return (digest * (len(text) // len(digest) + 1))[:len(text)]
+
+
+def _mask_email(match: re.Match) -> str:
+    return f"{_stable_hash(match.group(1))}@{match.group(2)}"
+
+
+def _mask_name(match: re.Match) -> str:
+    return f"{match.group(1)}{_stable_hash(match.group(2))}{match.group(3)}"
+
+
+def _redact_form_token(match: re.Match) -> str:
+    tag = match.group(0)
+    if any(marker in tag for marker in FORM_TOKEN_INPUTS):
+        return INPUT_VALUE_PATTERN.sub(f'value="{REDACTED}"', tag)
+    return tag
+
+
+def mask_text(text: str) -> str:
+    return EMAIL_PATTERN.sub(_mask_email, text) if UPSTREAM_RECORD_MASK_EMAILS else text
+
+
+def sanitize_body(text: str) -> str:
+    """
+    Response body as it is stored in a recording
+
+    Login form tokens are always redacted; e-mail addresses and Bitbucket
+    names are masked as configured.
+    """
+    if "<input" in text:
+        text = INPUT_TAG_PATTERN.sub(_redact_form_token, text)
+    if UPSTREAM_RECORD_MASK_NAMES:
+        text = NAME_FIELD_PATTERN.sub(_mask_name, text)
+    return mask_text(text)
+
+
+def sanitize_url(url: str) -> str:
+    """Path and query of a URL with secret parameter values redacted; the host is dropped"""
+    parsed = urlparse(url)
+    query = [
+        (name, REDACTED if name.lower() in SECRET_PARAMS else mask_text(value))
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+    ]
+    return f"{parsed.path or '/'}?{urlencode(query)}" if query else (parsed.path or "/")
+
+
+def sanitize_set_cookie(value: str) -> str:
+    """Keep a cookie's name and attributes but not its value"""
+    name, _, rest = value.partition("=")
+    attributes = rest.partition(";")[2]
+    return f"{name}={REDACTED}" + (f";{attributes}" if attributes else "")
+
+
+def request_key(method: str, url: str) -> str:
+    """How a request is matched on replay: method plus sanitized path and query"""
+    return f"{method.upper()} {sanitize_url(url)}"
+
+
+class RecordedOriginal:
+    """
+    Stands in for the http.client response urllib3 wraps
+
+    requests reads Set-Cookie headers from its `msg`, so replayed logins
+    set session cookies like live ones.
+    """
+
+    def __init__(self, msg, method: str):
+        self.msg = msg
+        self._method = method
+        self._closed = False
+
+    def close(self) -> None:
+        self._closed = True
+
+    def isclosed(self) -> bool:
+        return self._closed
+
+
+class Cassette:
+    """
+    Recorded responses for one upstream, stored as JSON lines
+
+    Each line holds the sanitized request (method, path and query), the
+    response status, headers and body, and how long the response took.
+    Request bodies and headers are never stored; they carry credentials.
+    """
+
+    def __init__(self, directory: str, upstream: str):
+        self.path = os.path.join(directory, f"{upstream}.jsonl")
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._positions: Dict[str, int] = {}
+
+    def record(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        body: bytes,
+        truncated: bool,
+        headers_ms: float,
+        total_ms: float
+    ) -> None:
+        content_type = response.headers.get("Content-Type", "")
+        try:
+            stored_body, body_encoding = sanitize_body(body.decode("utf-8")), "text"
+        except UnicodeDecodeError as e:
+            if truncated and e.reason == "unexpected end of data":
+                # The cut split a multi-byte character
+                stored_body, body_encoding = sanitize_body(body[:e.start].decode("utf-8")), "text"
+            else:
+                stored_body, body_encoding = base64.b64encode(body).decode(), "base64"
+
+        headers = []
+        for name, value in response.raw.headers.items() if response.raw is not None else response.headers.items():
+            lowered = name.lower()
+            if lowered in DROPPED_HEADERS:
+                continue
+            if lowered == "set-cookie":
+                value = sanitize_set_cookie(value)
+            elif lowered == "location":
+                value = sanitize_url(value)
+            headers.append([name, value])
+
+        entry = {
+            "key": request_key(request.method, request.url),
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+            "content_type": content_type,
+            "body": stored_body,
+            "body_encoding": body_encoding,
+            "truncated": truncated,
+            "headers_ms": round(headers_ms, 1),
+            "total_ms": round(total_ms, 1),
+            "recorded_at": int(time.time())
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = {}
+            try:
+                with open(self.path) as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries.setdefault(entry["key"], []).append(entry)
+            except FileNotFoundError:
+                pass
+            self._entries = entries
+        return self._entries
+
+    def next_response(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The next recorded response for a request
+
+        Responses recorded for the same request are served in recording
+        order; after the last one it keeps being served, so a recording can
+        drive a benchmark of any length.
+        """
+        with self._lock:
+            entries = self._load().get(key)
+            if not entries:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+
+class PrefixedStream:
+    """
+    Response body stream that serves already read bytes before the rest
+
+    Stands in for the urllib3 response after the recorder has read the
+    start of the body, so the caller still streams the whole body with its
+    own size limits. Everything but reading (headers, cookies, closing) is
+    left to the urllib3 response.
+    """
+
+    def __init__(self, prefix: bytes, raw: HTTPResponse):
+        self._prefix = io.BytesIO(prefix)
+        self._raw = raw
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def read(self, amt: Optional[int] = None, decode_content: bool = True) -> bytes:
+        data = self._prefix.read(amt if amt is not None else -1)
+        if amt is None:
+            return data + self._raw.read(decode_content=True)
+        if not data:
+            return self._raw.read(amt, decode_content=True)
+        return data
+
+    def stream(self, amt: int = 2 ** 16, decode_content: bool = True) -> Iterator[bytes]:
+        while True:
+            data = self.read(amt)
+            if not data:
+                return
+            yield data
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Pooled adapter that also writes every response to the upstream's cassette
+
+    At most `max_bytes` of a body are read for the recording. The caller
+    reads those from memory and the rest from the connection, so a huge
+    body still hits the caller's size limits instead of being buffered
+    whole, and its recording is marked as truncated.
+    """
+
+    def __init__(self, cassette: Cassette, max_bytes: int = UPSTREAM_RECORD_MAX_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.max_bytes = max_bytes
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        headers_ms = (time.perf_counter() - started) * 1000
+        body = response.raw.read(self.max_bytes + 1, decode_content=True) or b""
+        truncated = len(body) > self.max_bytes
+        total_ms = (time.perf_counter() - started) * 1000
+        try:
+            self.cassette.record(request, response, body[:self.max_bytes], truncated, headers_ms, total_ms)
+        except OSError as e:
+            logger.warning("Failed to record upstream response: %s", e)
+        response.raw = PrefixedStream(body, response.raw)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Serves recorded responses instead of using the network
+
+    Responses are rebuilt as urllib3 responses, so cookies, streaming and
+    the body size limits behave as with a live upstream, and each one takes
+    its recorded time (scaled by UPSTREAM_REPLAY_SPEED). A request without
+    a recording fails like an unreachable host. A truncated recording is
+    served as a body cut off after its recorded part, so callers that stop
+    reading early still work and the others fail like a broken connection.
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.speed = speed
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None, verify=True, cert=None, proxies=None) -> requests.Response:
+        key = request_key(request.method, request.url)
+        entry = self.cassette.next_response(key)
+        if entry is None:
+            raise requests.ConnectionError(f"No recorded response for {key}", request=request)
+        if self.speed > 0:
+            time.sleep(entry["total_ms"] * self.speed / 1000)
+
+        body = entry["body"].encode() if entry["body_encoding"] == "text" else base64.b64decode(entry["body"])
+        raw_headers = "".join(f"{name}: {value}\r\n" for name, value in entry["headers"])
+        # One byte more than recorded makes urllib3 fail once the recorded part is read
+        raw_headers += f"Content-Length: {len(body) + 1 if entry.get('truncated') else len(body)}\r\n\r\n"
+        message = parse_headers(io.BytesIO(raw_headers.encode("latin-1")))
+        original = RecordedOriginal(message, request.method)
+
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=list(message.items()),
+            status=entry["status"],
+            reason=entry["reason"],
+            preload_content=False,
+            decode_content=False,
+            original_response=original
+        )
+        response = self.build_response(request, raw)
+        if not stream:
+            response.content
+        return response
+
+
+def traffic_mode() -> Optional[str]:
+    """"replay", "record" or None, from UPSTREAM_REPLAY_DIR and UPSTREAM_RECORD_DIR"""
+    if UPSTREAM_REPLAY_DIR:
+        return "replay"
+    if UPSTREAM_RECORD_DIR:
+        return "record"
+    return None
+
+
+def create_traffic_adapter(upstream: str, **kwargs) -> Optional[HTTPAdapter]:
+    """Adapter for record or replay mode, or None to use a plain pooled adapter"""
+    mode = traffic_mode()
+    if mode == "replay":
+        return ReplayAdapter(Cassette(UPSTREAM_REPLAY_DIR, upstream), UPSTREAM_REPLAY_SPEED, **kwargs)
+    if mode == "record":
+        return RecordingAdapter(Cassette(UPSTREAM_RECORD_DIR, upstream), **kwargs)
+    return None
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A warm-up step: name, zero-argument callable, and the name of a step it must wait for
+WarmupStep = Tuple[str, Callable[[], Any], Optional[str]]
+
+
+class Warmup:
+    """
+    Background warm-up run once at startup
+
+    Steps run concurrently on a small thread pool, except that a step naming
+    another step in its third field starts only after that one succeeded.
+    Liveness is not affected while steps run; readiness is reported through
+    `status()`. A failed or timed-out step marks the service degraded rather
+    than unready, since every request path can still fetch on demand.
+    """
+
+    def __init__(self, timeout_seconds: float = 60, workers: int = 4):
+        self.timeout_seconds = timeout_seconds
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._steps: Dict[str, Dict[str, Any]] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, steps: List[WarmupStep]) -> None:
+        """Run the steps in a daemon thread; later calls are ignored"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started_at = time.time()
+            for name, _, after in steps:
+                self._steps[name] = {"status": "pending", "after": after, "duration_ms": None, "error": None}
+                self._done[name] = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(steps,), name="warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self, steps: List[WarmupStep]) -> None:
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warmup")
+        futures = [executor.submit(self._run_step, name, fn, after) for name, fn, after in steps]
+        deadline = self._started_at + self.timeout_seconds
+        for future in futures:
+            try:
+                future.result(timeout=max(0.0, deadline - time.time()))
+            except Exception:
+                # Step errors are recorded by _run_step; this only guards the timeout
+                pass
+        # Timed-out steps keep running in the background; do not wait for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        with self._lock:
+            for step in self._steps.values():
+                if step["status"] in ("pending", "running"):
+                    step["status"] = "timeout"
+                    step["error"] = f"Not finished within {self.timeout_seconds:.0f}s"
+            self._finished_at = time.time()
+            failed = [name for name, step in self._steps.items() if step["status"] != "ok"]
+        elapsed = self._finished_at - self._started_at
+        if failed:
+            logger.warning("Warm-up finished in %.1fs with failed steps: %s", elapsed, ", ".join(failed))
+        else:
+            logger.info("Warm-up finished in %.1fs", elapsed)
+
+    def _run_step(self, name: str, fn: Callable[[], Any], after: Optional[str]) -> None:
+        step = self._steps[name]
+        try:
+            if after:
+                self._done[after].wait()
+                if self._steps[after]["status"] != "ok":
+                    self._set(name, "skipped", error=f"{after} did not succeed")
+                    return
+            self._set(name, "running")
+            started = time.monotonic()
+            try:
+                fn()
+            except Exception as e:
+                self._set(name, "failed", (time.monotonic() - started) * 1000, getattr(e, "detail", None) or str(e))
+                logger.warning("Warm-up step %s failed: %s", name, e)
+                return
+            if step["status"] == "running":
+                self._set(name, "ok", (time.monotonic() - started) * 1000)
+        finally:
+            self._done[name].set()
+
+    def _set(self, name: str, status: str, duration_ms: Optional[float] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            step = self._steps[name]
+            step["status"] = status
+            if duration_ms is not None:
+                step["duration_ms"] = round(duration_ms, 1)
+            step["error"] = error
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Current warm-up state
+
+        Returns:
+            Dictionary with "state" ("disabled", "warming", "ready" or
+            "degraded"), timing and per-step results
+        """
+        with self._lock:
+            if self._started_at is None:
+                state = "disabled"
+            elif self._finished_at is None:
+                state = "warming"
+            elif all(step["status"] == "ok" for step in self._steps.values()):
+                state = "ready"
+            else:
+                state = "degraded"
+            finished = self._finished_at
+            return {
+                "state": state,
+                "started_at": int(self._started_at) if self._started_at else None,
+                "duration_seconds": round((finished or time.time()) - self._started_at, 2) if self._started_at else None,
+                "steps": {name: dict(step) for name, step in self._steps.items()}
+            }
@@ -0,0 +1,454 @@
+"""
+Concurrency load test for the Bitzilla Report API.
+
+Starts fake Bugzilla/Bitbucket/Chat upstreams with injected latency, then
+drives the app with a ramp of concurrent virtual users, either in-process
+(calling the ASGI app on this event loop) or over local HTTP against
+uvicorn with one or more worker processes.
+
+Each stage reports throughput, latency percentiles, error rate and
+event-loop lag, and the whole run is written as a JSON summary.
+
+Usage:
+    python -m loadtest --concurrency 1,8,32 --duration 10
+    python -m loadtest --mode http --workers 1,2,4 --output loadtest.json
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from loadtest.fake_upstreams import UpstreamConfig, start_fake_upstreams, upstream_environment
+
+ENDPOINTS = {
+    "priority": ("/bugzilla/get-priority-bug", {"notify_team": "OS"}),
+    "priority_miss": ("/bugzilla/get-priority-bug-miss", {"notify_team": "OS"}),
+    "sla_missed": ("/bugzilla/get-sla-missed-bugs", {"notify_team": "OS", "days": 7}),
+    "current_day": ("/bugzilla/current-day-status", {}),
+    "open_prs": ("/bitbucket/open-prs", {}),
+    "open_prs_enriched": ("/bitbucket/open-prs", {"enrich": "true"}),
+}
+
+# Interval of the loop-lag probe; lag is how late each tick fires
+LAG_TICK_SECONDS = 0.01
+
+
+def endpoint_paths(names: List[str], cached: bool) -> List[Tuple[str, str]]:
+    """Build request paths for the endpoint mix, never posting to Chat"""
+    paths = []
+    for name in names:
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+        path, params = ENDPOINTS[name]
+        query = dict(params, skip_chat="true")
+        if not cached:
+            query["refresh"] = "true"
+        paths.append((name, f"{path}?{urlencode(query)}"))
+    return paths
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+def summarize(samples: List[Tuple[str, float, int]], lags: List[float], elapsed: float, concurrency: int) -> Dict[str, Any]:
+    """Aggregate (endpoint, latency_ms, status) samples of one stage"""
+    latencies = [latency for _, latency, _ in samples]
+    errors: Dict[str, int] = {}
+    per_endpoint: Dict[str, List[float]] = {}
+    for name, latency, status in samples:
+        per_endpoint.setdefault(name, []).append(latency)
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    error_count = sum(errors.values())
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "duration_seconds": round(elapsed, 2),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0,
+        "error_rate": round(error_count / len(samples), 4) if samples else 0,
+        "errors": errors,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 2) if latencies else None,
+            "mean": round(statistics.fmean(latencies), 2) if latencies else None
+        },
+        "endpoints": {
+            name: {"requests": len(values), "p50": percentile(values, 50), "p99": percentile(values, 99)}
+            for name, values in per_endpoint.items()
+        },
+        "loop_lag_ms": {
+            "p50": percentile(lags, 50),
+            "p99": percentile(lags, 99),
+            "max": round(max(lags), 2) if lags else None
+        }
+    }
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    """Record how late a fixed-interval timer fires on the running loop"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_TICK_SECONDS
+        await asyncio.sleep(LAG_TICK_SECONDS)
+        lags.append(max(0.0, (loop.time() - expected) * 1000))
+
+
+class InProcessClient:
+    """Calls the ASGI app directly on the current event loop"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def get(self, path: str) -> int:
+        status, _ = await self.request("GET", path)
+        return status
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers=None) -> Tuple[int, bytes]:
+        """Send one request through the app and return its status and body"""
+        route, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": route,
+            "raw_path": route.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"loadtest")] + [
+                (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        status = 0
+        chunks = []
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Never disconnect; the app finishes the response first
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 connections to a local server, one per virtual user"""
+
+    def __init__(self, host: str, port: int, concurrency: int):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=concurrency + 1, thread_name_prefix="loadtest")
+        self.connections: Dict[int, http.client.HTTPConnection] = {}
+
+    def _get_blocking(self, slot: int, path: str) -> int:
+        conn = self.connections.get(slot)
+        if conn is None:
+            conn = self.connections[slot] = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.connections.pop(slot, None)
+            return 0
+
+    async def get(self, path: str, slot: int = 0) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._get_blocking, slot, path)
+
+    async def close(self) -> None:
+        for conn in self.connections.values():
+            conn.close()
+        self.executor.shutdown(wait=False)
+
+
+async def run_stage(
+    get: Callable[[str, int], Any],
+    paths: List[Tuple[str, str]],
+    concurrency: int,
+    duration: float,
+    probe: Optional[Callable[[], Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run one stage: `concurrency` virtual users request the endpoint mix back to back
+
+    Args:
+        get: Coroutine function (path, user_slot) -> HTTP status (0 on transport error)
+        paths: (endpoint name, path) pairs, cycled by every user
+        concurrency: Number of virtual users
+        duration: Stage length in seconds
+        probe: Optional coroutine measuring server-side responsiveness instead of local loop lag
+
+    Returns:
+        Stage summary
+    """
+    samples: List[Tuple[str, float, int]] = []
+    lags: List[float] = []
+    stop = asyncio.Event()
+    deadline = time.perf_counter() + duration
+
+    async def user(slot: int) -> None:
+        i = slot
+        while time.perf_counter() < deadline:
+            name, path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status = await get(path, slot)
+            except Exception:
+                status = 0
+            samples.append((name, (time.perf_counter() - started) * 1000, status))
+
+    async def probe_loop() -> None:
+        # Over HTTP the server's loop is out of reach; a no-op endpoint's
+        # latency above its idle baseline stands in for its loop lag
+        while not stop.is_set():
+            started = time.perf_counter()
+            await probe()
+            lags.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(LAG_TICK_SECONDS * 10)
+
+    monitor = asyncio.create_task(probe_loop() if probe else measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(user(slot) for slot in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    stage = summarize(samples, lags, elapsed, concurrency)
+    stage["loop_lag_source"] = "root_probe" if probe else "event_loop"
+    return stage
+
+
+def print_stage(label: str, stage: Dict[str, Any]) -> None:
+    latency = stage["latency_ms"]
+    lag = stage["loop_lag_ms"]
+    print(
+        f"{label:>10} c={stage['concurrency']:<4} {stage['throughput_rps']:>8.1f} req/s  "
+        f"p50={latency['p50']}ms p99={latency['p99']}ms  "
+        f"errors={stage['error_rate'] * 100:.1f}%  lag p99={lag['p99']}ms",
+        file=sys.stderr
+    )
+
+
+async def run_in_process(args, paths) -> List[Dict[str, Any]]:
+    # Imported here so the environment pointing at the fake upstreams is in place first
+    from app.main import app
+
+    client = InProcessClient(app)
+    stages = []
+    for concurrency in args.concurrency:
+        if args.warmup:
+            await run_stage(lambda path, slot: client.get(path), paths, concurrency, args.warmup)
+        stage = await run_stage(lambda path, slot: client.get(path), paths, concurrency, args.duration)
+        print_stage("inprocess", stage)
+        stages.append(stage)
+    return stages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("uvicorn did not start listening in time")
+
+
+async def run_over_http(args, paths) -> List[Dict[str, Any]]:
+    runs = []
+    for workers in args.workers:
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            env=os.environ.copy()
+        )
+        try:
+            wait_for_server(port, process)
+            stages = []
+            for concurrency in args.concurrency:
+                client = HttpClient("127.0.0.1", port, concurrency)
+                probe_client = HttpClient("127.0.0.1", port, 1)
+                try:
+                    if args.warmup:
+                        await run_stage(client.get, paths, concurrency, args.warmup)
+                    stage = await run_stage(
+                        client.get, paths, concurrency, args.duration,
+                        probe=lambda: probe_client.get("/", 0)
+                    )
+                finally:
+                    await client.close()
+                    await probe_client.close()
+                stage["workers"] = workers
+                print_stage(f"w={workers}", stage)
+                stages.append(stage)
+            runs.append({"workers": workers, "stages": stages})
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return runs
+
+
+def scaling(stages: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """Throughput of each stage relative to the first one"""
+    base = stages[0]["throughput_rps"] if stages else 0
+    return {
+        str(stage["concurrency"]): round(stage["throughput_rps"] / base, 2) if base else None
+        for stage in stages
+    }
+
+
+def int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess",
+                        help="Call the ASGI app directly or go through uvicorn over local HTTP")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16, 64],
+                        help="Comma-separated ramp of concurrent virtual users (default 1,4,16,64)")
+    parser.add_argument("--workers", type=int_list, default=[1],
+                        help="Comma-separated uvicorn worker counts to compare in http mode (default 1)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per stage (default 10)")
+    parser.add_argument("--warmup", type=float, default=1, help="Unmeasured seconds before each stage (default 1)")
+    parser.add_argument("--endpoints", default="priority,sla_missed,current_day,open_prs",
+                        help=f"Comma-separated endpoint mix from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--cached", action="store_true",
+                        help="Let the report cache serve requests instead of forcing refresh=true")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Injected upstream latency (default 50)")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Upstream latency jitter (default 10)")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0,
+                        help="Fraction of upstream GETs answered with 503 (default 0)")
+    parser.add_argument("--bugs", type=int, default=200, help="Bugs per buglist response (default 200)")
+    parser.add_argument("--prs", type=int, default=120, help="Open PRs served by the fake Bitbucket (default 120)")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="Serve upstream responses recorded with UPSTREAM_RECORD_DIR instead of the fakes")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Multiplier on recorded response times with --replay; 0 for none (default 1)")
+    parser.add_argument("--output", help="Write the JSON summary here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = UpstreamConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        bugs=args.bugs,
+        prs=args.prs,
+        error_rate=args.upstream_error_rate
+    )
+    # Recorded traffic replaces the fakes; the latency and data-size knobs then do not apply
+    server = None if args.replay else start_fake_upstreams(config)
+    if args.replay:
+        os.environ["UPSTREAM_REPLAY_DIR"] = args.replay
+        os.environ["UPSTREAM_REPLAY_SPEED"] = str(args.replay_speed)
+
+    # Point the app at the fake upstreams and keep the run free of side effects
+    os.environ.update(upstream_environment(server))
+    os.environ.pop("BUGZILLA_API_KEY", None)
+    os.environ["SNAPSHOT_DB_PATH"] = ""
+    os.environ["CACHE_BACKEND_URL"] = "memory://"
+    os.environ.pop("GOOGLE_CHAT_WEBHOOK_GROUPS", None)
+
+    paths = endpoint_paths([name.strip() for name in args.endpoints.split(",") if name.strip()], args.cached)
+    started = time.time()
+
+    if args.mode == "inprocess":
+        stages = asyncio.run(run_in_process(args, paths))
+        runs = [{"workers": None, "stages": stages, "scaling": scaling(stages)}]
+    else:
+        runs = asyncio.run(run_over_http(args, paths))
+        for run in runs:
+            run["scaling"] = scaling(run["stages"])
+
+    summary = {
+        "mode": args.mode,
+        "started_at": int(started),
+        "config": {
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.mode == "http" else None,
+            "duration_seconds": args.duration,
+            "endpoints": [name for name, _ in paths],
+            "cached": args.cached,
+            "upstream_latency_ms": args.latency_ms,
+            "upstream_jitter_ms": args.jitter_ms,
+            "upstream_error_rate": args.upstream_error_rate,
+            "bugs": args.bugs,
+            "prs": args.prs,
+            "replay": args.replay
+        },
+        "runs": runs,
+        "upstream_requests": dict(sorted(config.requests.items()))
+    }
+    if args.mode == "http" and len(runs) > 1:
+        summary["worker_scaling"] = {
+            str(run["workers"]): {
+                str(stage["concurrency"]): stage["throughput_rps"] for stage in run["stages"]
+            }
+            for run in runs
+        }
+    if server is not None:
+        server.shutdown()
+
+    output = json.dumps(summary, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Summary written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    # Non-zero exit when any request failed, so CI can gate on it
+    failed = any(stage["error_rate"] for run in runs for stage in run["stages"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
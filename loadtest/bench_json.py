@@ -0,0 +1,162 @@
+"""
+Micro-benchmark for JSON rendering and gzip on a large bug report.
+
+Builds a format_response()-shaped payload with 10k bugs and measures, for the
+standard and the orjson response class: render time, the jsonable_encoder
+pass FastAPI adds when an endpoint returns a dict, body size with and
+without gzip, compression time and the resulting transfer time on a given
+link speed. It finishes with end-to-end requests through an app configured
+like app.main (response class and GZip middleware), returning a dict vs a
+pre-rendered response.
+
+Usage:
+    python -m loadtest.bench_json --bugs 10000 --mbps 20
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from loadtest.fake_upstreams import bug_csv
+
+
+def bug_payload(bugs: int) -> Dict[str, Any]:
+    rows = list(csv.DictReader(io.StringIO(bug_csv(bugs))))
+    return {
+        "status": "success",
+        "data": {"bugs": rows, "total": len(rows)},
+        "chat_posted": False,
+        "webhook_type": "default",
+        "cached": True,
+        "data_age_seconds": 12,
+        "stale": False
+    }
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest wall time of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def measure(response_class, payload: Dict[str, Any], repeat: int, level: int, mbps: float) -> Dict[str, Any]:
+    render = lambda: response_class(payload).body
+    body = render()
+    compressed = gzip.compress(body, compresslevel=level)
+    bytes_per_ms = mbps * 1_000_000 / 8 / 1000
+    render_ms = best_of(render, repeat)
+    # Paid when an endpoint returns a dict instead of a response
+    encoder_ms = best_of(lambda: jsonable_encoder(payload), repeat)
+    gzip_ms = best_of(lambda: gzip.compress(body, compresslevel=level), repeat)
+    return {
+        "render_ms": round(render_ms, 2),
+        "encoder_ms": round(encoder_ms, 2),
+        "bytes": len(body),
+        "gzip_bytes": len(compressed),
+        "gzip_ms": round(gzip_ms, 2),
+        "transfer_ms": round(len(body) / bytes_per_ms, 2),
+        "gzip_transfer_ms": round(len(compressed) / bytes_per_ms, 2),
+        "total_ms": round(render_ms + len(body) / bytes_per_ms, 2),
+        "gzip_total_ms": round(render_ms + gzip_ms + len(compressed) / bytes_per_ms, 2)
+    }
+
+
+async def end_to_end(bugs: int, repeat: int) -> Dict[str, Any]:
+    """Time a request through the app's stack: returning a dict vs a rendered response, with and without gzip"""
+    from fastapi import FastAPI
+    from fastapi.middleware.gzip import GZipMiddleware
+    from app.responses import GZIP_LEVEL, GZIP_MIN_BYTES, get_response_class, json_response
+
+    payload = bug_payload(bugs)
+    app = FastAPI(default_response_class=get_response_class())
+    if GZIP_MIN_BYTES > 0:
+        app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+    @app.get("/dict")
+    async def as_dict():
+        return payload
+
+    @app.get("/rendered")
+    async def rendered():
+        return json_response(payload)
+
+    async def request(path: str, accept_encoding: bytes) -> int:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": [(b"accept-encoding", accept_encoding)],
+            "client": ("127.0.0.1", 0), "server": ("bench", 80)
+        }
+        size = 0
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal size
+            if message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        await app(scope, receive, send)
+        return size
+
+    results = {}
+    cases = [(path, encoding) for path in ("/dict", "/rendered") for encoding in (b"identity", b"gzip")]
+    for path, encoding in cases:
+        label = f"{path.strip('/')}_{encoding.decode()}"
+        best = float("inf")
+        size = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = await request(path, encoding)
+            best = min(best, time.perf_counter() - started)
+        results[label] = {"ms": round(best * 1000, 2), "bytes": size}
+    results["response_class"] = get_response_class().__name__
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.bench_json", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bugs", type=int, default=10000, help="Bugs in the payload (default 10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is kept (default 5)")
+    parser.add_argument("--level", type=int, default=int(os.getenv("GZIP_LEVEL", "6")), help="gzip level (default 6)")
+    parser.add_argument("--mbps", type=float, default=20, help="Link speed used for transfer time (default 20)")
+    args = parser.parse_args(argv)
+
+    payload = bug_payload(args.bugs)
+    results = {"bugs": args.bugs, "gzip_level": args.level, "mbps": args.mbps, "classes": {}}
+    results["classes"]["JSONResponse"] = measure(JSONResponse, payload, args.repeat, args.level, args.mbps)
+
+    from app.responses import FastJSONResponse, orjson
+    if orjson is not None:
+        results["classes"]["FastJSONResponse"] = measure(FastJSONResponse, payload, args.repeat, args.level, args.mbps)
+        standard = results["classes"]["JSONResponse"]
+        fast = results["classes"]["FastJSONResponse"]
+        results["render_speedup"] = round(standard["render_ms"] / fast["render_ms"], 2)
+        results["gzip_ratio"] = round(fast["bytes"] / fast["gzip_bytes"], 2)
+        # Before: dict through jsonable_encoder and the standard encoder, sent uncompressed
+        before = standard["encoder_ms"] + standard["total_ms"]
+        results["end_to_end_speedup"] = round(before / fast["gzip_total_ms"], 2)
+    else:
+        print("orjson is not installed; only the standard response class was measured", file=sys.stderr)
+
+    results["asgi"] = asyncio.run(end_to_end(args.bugs, args.repeat))
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
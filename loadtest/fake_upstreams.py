@@ -0,0 +1,239 @@
+"""
+Fake Bugzilla, Bitbucket and Google Chat servers for load testing.
+
+A single threaded HTTP server answers every upstream the app talks to, with
+configurable latency, so the app can be driven without network access or
+credentials. Response shapes follow the real services closely enough for
+the app's parsers: quoted CSV with commas in summaries, paginated Bitbucket
+listings with `size`/`next`, and a login form carrying the Bugzilla tokens.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ["UNCONFIRMED", "CONFIRMED", "NEEDS_INFO", "IN_PROGRESS", "IN_PROGRESS_DEV", "UNDER_REVIEW", "RE-OPENED"]
+COMPONENTS = ["API", "Aqua", "Backend", "Bourbon", "Cross Platform", "Distiman", "RetailerApp", "UI"]
+TEAMS = ["OS", "CORE", "MOBILE", "DATA"]
+
+
+class UpstreamConfig:
+    """Knobs shared by every request the fake servers answer"""
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 10, bugs: int = 200,
+                 prs: int = 120, pr_page_size: int = 50, error_rate: float = 0.0, rate_limit: int = 1000000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bugs = bugs
+        self.prs = prs
+        self.pr_page_size = pr_page_size
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def delay(self) -> None:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def requests_total(self) -> int:
+        with self.lock:
+            return sum(self.requests.values())
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+
+# Bugzilla's default buglist columns, returned when no columnlist is given
+DEFAULT_COLUMNS = [
+    "bug_id", "product", "component", "assigned_to", "bug_status", "resolution", "short_desc", "changeddate",
+    "bug_severity", "priority", "op_sys", "rep_platform", "version", "target_milestone", "reporter", "keywords"
+]
+
+
+def bug_csv(count: int, columnlist: Optional[str] = None) -> str:
+    columns = ["bug_id"] + columnlist.split(",") if columnlist else DEFAULT_COLUMNS
+    rows = []
+    for i in range(count):
+        bug = {
+            "bug_id": str(100000 + i),
+            "product": "BizomWeb",
+            "component": COMPONENTS[i % len(COMPONENTS)],
+            "assigned_to": f"dev{i % 17}@example.com",
+            "bug_status": STATUSES[i % len(STATUSES)],
+            "resolution": "---",
+            "short_desc": f'Order sync fails for outlet {i}, retry, "quoted" part',
+            "changeddate": f"2026-10-{1 + i % 28:02d} 1{i % 10}:00:00",
+            "bug_severity": "critical",
+            "priority": "High",
+            "op_sys": "All",
+            "rep_platform": "All",
+            "version": TEAMS[i % len(TEAMS)],
+            "target_milestone": "---",
+            "reporter": f"qa{i % 5}@example.com",
+            "keywords": ""
+        }
+        rows.append(",".join(
+            bug["bug_id"] if column == "bug_id" else '"' + bug.get(column, "").replace('"', '""') + '"'
+            for column in columns
+        ))
+    return "\n".join([",".join(columns)] + rows)
+
+
+def status_matrix_csv() -> str:
+    lines = ["bug_status / version," + ",".join(TEAMS)]
+    for s, status in enumerate(STATUSES):
+        lines.append(status + "," + ",".join(str((s * 3 + t) % 11) for t in range(len(TEAMS))))
+    return "\n".join(lines)
+
+
+def pull_request(pr_id: int, base: str) -> Dict:
+    return {
+        "id": pr_id,
+        "title": f"Feature {pr_id}: improve order sync",
+        "author": {"display_name": f"Developer {pr_id % 9}"},
+        "destination": {"repository": {"name": "bizomweb2", "full_name": "bizom/bizomweb2"}, "branch": {"name": "master"}},
+        "source": {"branch": {"name": f"feature/{pr_id}"}},
+        "created_on": f"2026-{1 + pr_id % 9:02d}-{1 + pr_id % 27:02d}T{pr_id % 24:02d}:15:00.000000+00:00",
+        "updated_on": f"2026-10-{1 + pr_id % 18:02d}T08:00:00.000000+00:00",
+        "links": {
+            "html": {"href": f"https://bitbucket.org/bizom/bizomweb2/pull-requests/{pr_id}"},
+            "self": {"href": f"{base}/2.0/repositories/bizom/bizomweb2/pullrequests/{pr_id}"}
+        }
+    }
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: UpstreamConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, content_type: str = "text/plain", headers=()):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, payload, status: int = 200):
+        remaining = max(0, self.config.rate_limit - self.config.requests_total())
+        self._send(status, json.dumps(payload), "application/json", [
+            ("X-RateLimit-Limit", str(self.config.rate_limit)),
+            ("X-RateLimit-Remaining", str(remaining)),
+            ("X-RateLimit-Resource", "api-repository")
+        ])
+
+    def _base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.config.count(f"GET {url.path.rsplit('/', 1)[-1] if '/pullrequests/' in url.path else url.path}")
+        self.config.delay()
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            return self._send(503, "injected upstream failure")
+
+        if url.path == "/report.cgi":
+            if "ctype" not in query:
+                return self._send(
+                    200,
+                    '<form><input name="Bugzilla_login_token" value="lt"><input id="token" value="t"></form>',
+                    "text/html"
+                )
+            return self._send(200, status_matrix_csv(), "text/csv")
+        if url.path == "/buglist.cgi":
+            return self._send(200, bug_csv(self.config.bugs, query.get("columnlist", [None])[0]), "text/csv")
+
+        if url.path.startswith("/2.0/") and self.config.requests_total() > self.config.rate_limit:
+            return self._send(429, "Rate limit for this resource has been exceeded", "text/plain", [("Retry-After", "1")])
+        if url.path.endswith("/pullrequests"):
+            page = int(query.get("page", ["1"])[0])
+            page_size = int(query.get("pagelen", [self.config.pr_page_size])[0])
+            ids = list(range(1, self.config.prs + 1))[(page - 1) * page_size: page * page_size]
+            payload = {
+                "values": [pull_request(pr_id, self._base()) for pr_id in ids],
+                "size": self.config.prs,
+                "page": page,
+                "pagelen": page_size
+            }
+            if page * page_size < self.config.prs:
+                payload["next"] = f"{self._base()}{url.path}?state=OPEN&pagelen={page_size}&page={page + 1}"
+            return self._json(payload)
+        if url.path.endswith("/diffstat"):
+            return self._json({"values": [{"lines_added": 12, "lines_removed": 4}] * 3})
+        if url.path.endswith("/statuses"):
+            return self._json({"values": [{"state": "SUCCESSFUL", "name": "build"}]})
+        if "/pullrequests/" in url.path:
+            return self._json({"participants": [
+                {"role": "REVIEWER", "approved": True, "state": "approved", "user": {"display_name": "Reviewer A"}},
+                {"role": "REVIEWER", "approved": False, "state": None, "user": {"display_name": "Reviewer B"}}
+            ]})
+        if "/repositories" in url.path:
+            return self._json({"values": [{"slug": "bizomweb2", "name": "bizomweb2"}]})
+        if url.path.startswith("/2.0/users/"):
+            return self._json({"uuid": "{00000000-0000-0000-0000-000000000000}"})
+        return self._send(404, "not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.config.count(f"POST {url.path}")
+        self.config.delay()
+
+        if url.path == "/report.cgi":
+            return self._send(200, "logged in", "text/html", [
+                ("Set-Cookie", "Bugzilla_login=1; Path=/"),
+                ("Set-Cookie", "Bugzilla_logincookie=loadtest; Path=/")
+            ])
+        if url.path.startswith("/chat"):
+            return self._json({"name": "spaces/loadtest/messages/1"})
+        return self._send(404, "not found")
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+
+def start_fake_upstreams(config: Optional[UpstreamConfig] = None, port: int = 0) -> FakeUpstreamServer:
+    """
+    Start the fake upstream server in a background thread
+
+    Args:
+        config: Latency and data-size knobs; defaults are used when omitted
+        port: Port to bind on 127.0.0.1 (0 picks a free one)
+
+    Returns:
+        The running server; its base URL is http://127.0.0.1:<server.server_address[1]>
+    """
+    handler = type("Handler", (FakeUpstreamHandler,), {"config": config or UpstreamConfig()})
+    server = FakeUpstreamServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="fake-upstreams", daemon=True).start()
+    return server
+
+
+def upstream_environment(server: Optional[FakeUpstreamServer] = None) -> Dict[str, str]:
+    """Environment variables pointing the app at the fake upstreams, or at recordings when no server is given"""
+    base = f"http://127.0.0.1:{server.server_address[1]}" if server else "http://replay.invalid"
+    return {
+        "BUGZILLA_URL": base,
+        "BUGZILLA_EMAIL": "loadtest@example.com",
+        "BUGZILLA_PASSWORD": "loadtest",
+        "GOOGLE_CHAT_WEBHOOK": f"{base}/chat/loadtest",
+        "BITBUCKET_URL": base,
+        "BITBUCKET_API_URL": f"{base}/2.0",
+        "BITBUCKET_USERNAME": "loadtest",
+        "BITBUCKET_PASSWORD": "loadtest"
+    }
@@ -0,0 +1,114 @@
+"""
+Replay recorded Bitbucket webhook deliveries against POST /bitbucket/webhook.
+
+Each fixture holds the delivery headers and JSON body of one event, as
+Bitbucket sends them. Fixtures are posted in file-name order and the
+resulting index action is printed for each.
+
+Usage:
+    # Against a running server, signed with BITBUCKET_WEBHOOK_SECRET
+    python -m loadtest.replay_webhooks --url http://localhost:8000/bitbucket/webhook
+
+    # In-process against fake upstreams, with a throwaway index file
+    python -m loadtest.replay_webhooks --in-process
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "bitbucket_webhooks")
+
+
+def load_fixtures(paths: List[str]) -> List[Tuple[str, Dict[str, str], bytes]]:
+    fixtures = []
+    for path in paths:
+        with open(path) as f:
+            fixture = json.load(f)
+        fixtures.append((os.path.basename(path), fixture["headers"], json.dumps(fixture["body"]).encode()))
+    return fixtures
+
+
+def sign(headers: Dict[str, str], body: bytes, secret: Optional[str]) -> Dict[str, str]:
+    if not secret:
+        return headers
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return dict(headers, **{"X-Hub-Signature": f"sha256={digest}"})
+
+
+def post_over_http(url: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+async def replay_in_process(fixtures, secret) -> List[Tuple[str, int, bytes]]:
+    from loadtest.__main__ import InProcessClient
+    from loadtest.fake_upstreams import start_fake_upstreams, upstream_environment
+
+    server = start_fake_upstreams()
+    os.environ.update(upstream_environment(server))
+    os.environ["SNAPSHOT_DB_PATH"] = ""
+    os.environ["CACHE_BACKEND_URL"] = "memory://"
+    os.environ["PR_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bitzilla-replay-"), "pr_index.json")
+    os.environ["BITBUCKET_PR_INDEX"] = "true"
+    # The webhook only accepts signed deliveries
+    secret = secret or secrets.token_hex(16)
+    os.environ["BITBUCKET_WEBHOOK_SECRET"] = secret
+    from app.main import app
+
+    client = InProcessClient(app)
+    results = []
+    for name, headers, body in fixtures:
+        status, response = await client.request("POST", "/bitbucket/webhook", body, sign(headers, body, secret))
+        results.append((name, status, response))
+    server.shutdown()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest.replay_webhooks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("fixtures", nargs="*", help=f"Fixture files (default: every file in {FIXTURE_DIR})")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/bitbucket/webhook", help="Webhook endpoint to post to")
+    parser.add_argument("--in-process", action="store_true", help="Post to the app in this process instead of --url")
+    parser.add_argument("--secret", default=os.getenv("BITBUCKET_WEBHOOK_SECRET"),
+                        help="Sign deliveries with this secret (default: BITBUCKET_WEBHOOK_SECRET)")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json"))))
+    if args.in_process:
+        results = asyncio.run(replay_in_process(fixtures, args.secret))
+    else:
+        results = [
+            (name, *post_over_http(args.url, sign(headers, body, args.secret), body))
+            for name, headers, body in fixtures
+        ]
+
+    failed = False
+    for name, status, response in results:
+        try:
+            data = json.loads(response).get("data") or {}
+            summary = f"{data.get('action')} (open PRs: {data.get('index', {}).get('open_prs')})"
+        except ValueError:
+            summary = response[:200].decode(errors="replace")
+        if status != 200:
+            failed = True
+            summary = response[:200].decode(errors="replace")
+        print(f"{name}: {status} {summary}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
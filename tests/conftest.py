@@ -0,0 +1,13 @@
+import os
+
+# The routers read their configuration at import time; keep tests off real services and disk
+os.environ.setdefault('BUGZILLA_URL', 'http://bugzilla.invalid')
+os.environ.setdefault('BUGZILLA_API_KEY', 'test-key')
+os.environ.setdefault('GOOGLE_CHAT_WEBHOOK', 'http://chat.invalid/webhook')
+os.environ.setdefault('BITBUCKET_USERNAME', 'test')
+os.environ.setdefault('BITBUCKET_PASSWORD', 'test')
+os.environ.setdefault('BITBUCKET_URL', 'http://bitbucket.invalid')
+os.environ.setdefault('CACHE_BACKEND_URL', 'memory://')
+os.environ.setdefault('SNAPSHOT_DB_PATH', '')
+os.environ.setdefault('PR_INDEX_PATH', '')
+os.environ.setdefault('WARMUP_ENABLED', 'false')
@@ -0,0 +1,95 @@
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RespServer:
+    """
+    Minimal in-process server speaking the Redis protocol
+
+    Supports the commands RedisCacheBackend sends (AUTH, SELECT, GET, SET
+    with NX and PX, DEL) plus PING, keeping one keyspace per database.
+    `delay` slows every command down, to make concurrent round trips visible.
+    """
+
+    def __init__(self, password: Optional[str] = None, delay: float = 0.0):
+        self.password = password
+        self.delay = delay
+        self.data: Dict[Tuple[int, str], Tuple[bytes, Optional[float]]] = {}
+        self.connections = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with server.lock:
+                    server.connections += 1
+                state = {"db": 0, "authenticated": server.password is None}
+                while True:
+                    args = server.read_command(self.rfile)
+                    if args is None:
+                        return
+                    if server.delay:
+                        time.sleep(server.delay)
+                    self.wfile.write(server.execute(state, args))
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            # Room for every connection of a pool opened at once
+            request_queue_size = 64
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def read_command(reader) -> Optional[List[bytes]]:
+        line = reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(reader.readline()[1:-2])
+            args.append(reader.read(length + 2)[:-2])
+        return args
+
+    def execute(self, state: Dict[str, Any], args: List[bytes]) -> bytes:
+        name = args[0].decode().upper()
+        if name == "AUTH":
+            if args[1].decode() != self.password:
+                return b"-WRONGPASS invalid password\r\n"
+            state["authenticated"] = True
+            return b"+OK\r\n"
+        if not state["authenticated"]:
+            return b"-NOAUTH Authentication required\r\n"
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name == "SELECT":
+            state["db"] = int(args[1])
+            return b"+OK\r\n"
+
+        key = (state["db"], args[1].decode())
+        with self.lock:
+            item = self.data.get(key)
+            if item is not None and item[1] is not None and item[1] <= time.time():
+                del self.data[key]
+                item = None
+            if name == "GET":
+                return b"$-1\r\n" if item is None else b"$%d\r\n%s\r\n" % (len(item[0]), item[0])
+            if name == "DEL":
+                return b":%d\r\n" % int(self.data.pop(key, None) is not None)
+            if name == "SET":
+                options = [arg.decode().upper() for arg in args[3:]]
+                if "NX" in options and item is not None:
+                    return b"$-1\r\n"
+                expires_at = None
+                if "PX" in options:
+                    expires_at = time.time() + int(options[options.index("PX") + 1]) / 1000
+                self.data[key] = (args[2], expires_at)
+                return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
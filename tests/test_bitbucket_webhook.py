@@ -0,0 +1,177 @@
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import bitbucket
+from app.services import pr_index
+from app.services.pr_index import PRIndex, verify_signature
+
+SECRET = "webhook-secret"
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def pr_event(pr_id=1, state="OPEN", updated_on="2024-01-02T00:00:00+00:00") -> bytes:
+    return json.dumps({
+        "pullrequest": {
+            "id": pr_id,
+            "title": "Fix login",
+            "state": state,
+            "author": {"display_name": "Dev One"},
+            "destination": {"repository": {"name": "bizomweb2"}, "branch": {"name": "master"}},
+            "source": {"branch": {"name": "fix-login"}},
+            "created_on": "2024-01-01T00:00:00+00:00",
+            "updated_on": updated_on,
+            "links": {"html": {"href": "https://bitbucket.org/bizom/bizomweb2/pull-requests/1"}}
+        },
+        "repository": {"name": "bizomweb2"}
+    }).encode()
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = PRIndex("", ["bizomweb2"])
+    monkeypatch.setattr(pr_index, "_index", index)
+    return index
+
+
+@pytest.fixture
+def client(monkeypatch, index):
+    monkeypatch.setattr(bitbucket, "PR_INDEX_ENABLED", True)
+    monkeypatch.setattr(bitbucket, "BITBUCKET_WEBHOOK_SECRET", SECRET)
+    return TestClient(app)
+
+
+def post_event(client, body, event_key="pullrequest:created", signature=None):
+    headers = {"X-Event-Key": event_key}
+    if signature is not None:
+        headers["X-Hub-Signature"] = signature
+    return client.post("/bitbucket/webhook", content=body, headers=headers)
+
+
+def test_verify_signature():
+    body = pr_event()
+    assert verify_signature(SECRET, body, sign(body))
+    assert not verify_signature(SECRET, body, sign(body, "other-secret"))
+    assert not verify_signature(SECRET, body + b" ", sign(body))
+    assert not verify_signature(SECRET, body, "sha1=" + sign(body).partition("=")[2])
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, "")
+
+
+def test_signed_event_updates_index(client, index):
+    body = pr_event()
+
+    response = post_event(client, body, signature=sign(body))
+
+    assert response.status_code == 200
+    assert response.json()["data"]["action"] == "upserted"
+    assert [pr["id"] for pr in index.open_prs()] == [1]
+
+
+def test_missing_signature_is_rejected(client, index):
+    response = post_event(client, pr_event())
+
+    assert response.status_code == 401
+    assert index.open_prs() == []
+
+
+def test_invalid_signature_is_rejected(client, index):
+    body = pr_event()
+
+    response = post_event(client, body, signature=sign(body, "other-secret"))
+
+    assert response.status_code == 401
+    assert index.open_prs() == []
+
+
+def test_webhook_is_forbidden_without_secret(client, index, monkeypatch):
+    monkeypatch.setattr(bitbucket, "BITBUCKET_WEBHOOK_SECRET", None)
+    body = pr_event()
+
+    response = post_event(client, body, signature=sign(body))
+
+    assert response.status_code == 403
+    assert index.open_prs() == []
+
+
+def test_webhook_is_not_found_when_index_disabled(client, index, monkeypatch):
+    monkeypatch.setattr(bitbucket, "PR_INDEX_ENABLED", False)
+    body = pr_event()
+
+    response = post_event(client, body, signature=sign(body))
+
+    assert response.status_code == 404
+    assert index.open_prs() == []
+
+
+def test_invalid_json_is_rejected(client):
+    body = b"not json"
+
+    response = post_event(client, body, signature=sign(body))
+
+    assert response.status_code == 400
+
+
+def test_merged_event_removes_pr_and_older_events_cannot_reopen_it(client, index):
+    created = pr_event(updated_on="2024-01-02T00:00:00+00:00")
+    merged = pr_event(state="MERGED", updated_on="2024-01-03T00:00:00+00:00")
+    redelivered = pr_event(updated_on="2024-01-02T00:00:00+00:00")
+
+    post_event(client, created, signature=sign(created))
+    removed = post_event(client, merged, "pullrequest:fulfilled", sign(merged))
+    ignored = post_event(client, redelivered, signature=sign(redelivered))
+
+    assert removed.json()["data"]["action"] == "removed"
+    assert ignored.json()["data"]["action"] == "outdated"
+    assert index.open_prs() == []
+
+
+def listed_pr(pr_id, updated_on="2024-01-02T00:00:00+00:00", name="BizomWeb 2"):
+    pr = json.loads(pr_event(pr_id, updated_on=updated_on))["pullrequest"]
+    pr["destination"]["repository"] = {"name": name, "full_name": "bizom/bizomweb2"}
+    return pr
+
+
+def test_repositories_are_matched_by_slug(index):
+    body = json.loads(pr_event())
+    body["repository"] = {"name": "BizomWeb 2", "full_name": "bizom/bizomweb2"}
+
+    assert index.apply_event("pullrequest:created", body) == "upserted"
+    index.replace_all([listed_pr(2)], time.time())
+
+    assert [pr["id"] for pr in index.open_prs()] == [2]
+
+
+def test_reconciliation_keeps_events_newer_than_the_listing(index):
+    index.replace_all([listed_pr(1), listed_pr(2)], 0)
+    started_at = time.time()
+    # While the listing is fetched: PR 1 is updated, PR 2 merged and PR 3 created
+    index.apply_event("pullrequest:updated", json.loads(pr_event(1, updated_on="2024-01-05T00:00:00+00:00")))
+    index.apply_event("pullrequest:fulfilled", json.loads(pr_event(2, "MERGED", "2024-01-05T00:00:00+00:00")))
+    index.apply_event("pullrequest:created", json.loads(pr_event(3, updated_on="2024-01-05T00:00:00+00:00")))
+
+    index.replace_all([listed_pr(1), listed_pr(2)], started_at)
+
+    prs = {pr["id"]: pr for pr in index.open_prs()}
+    assert sorted(prs) == [1, 3]
+    assert prs[1]["updated_on"] == "2024-01-05T00:00:00+00:00"
+    # A late redelivery still cannot reopen the merged PR
+    assert index.apply_event("pullrequest:created", json.loads(pr_event(2))) == "outdated"
+
+
+def test_reconciliation_replaces_entries_older_than_the_listing(index):
+    index.apply_event("pullrequest:created", json.loads(pr_event(1)))
+    index.apply_event("pullrequest:fulfilled", json.loads(pr_event(2, "MERGED")))
+
+    index.replace_all([listed_pr(2, "2024-01-03T00:00:00+00:00")], time.time())
+
+    assert [pr["id"] for pr in index.open_prs()] == [2]
+    assert index._closed == {} and index._changed_at == {}
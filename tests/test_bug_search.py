@@ -0,0 +1,66 @@
+from app.services.bug_search import BugSearchIndex
+
+
+def bug(bug_id, short_desc="", component="", assigned_to=""):
+    return {"bug_id": bug_id, "short_desc": short_desc, "component": component, "assigned_to": assigned_to}
+
+
+def test_rows_without_tokens_are_not_indexed_and_search_is_empty():
+    index = BugSearchIndex()
+
+    indexed = index.add_bugs([{"bug_id": "1"}, bug("2", "the of and")])
+
+    assert indexed == 0
+    assert index.search("anything") == {"results": [], "total_matches": 0}
+    assert index.stats()["indexed_bugs"] == 0
+
+
+def test_bug_whose_text_becomes_empty_is_removed():
+    index = BugSearchIndex()
+    index.add_bugs([bug("1", "Login fails"), bug("2", "Checkout slow")])
+
+    index.add_bugs([bug("1")])
+
+    assert [result["bug_id"] for result in index.search("login checkout")["results"]] == ["2"]
+    assert index.stats()["indexed_bugs"] == 1
+
+
+def test_results_are_ranked_by_field_weight():
+    index = BugSearchIndex()
+    index.add_bugs([
+        bug("1", "Payment page shows wrong total", "Web"),
+        bug("2", "Crash on launch", "Payment"),
+        bug("3", "Unrelated issue", "Web")
+    ])
+
+    found = index.search("payment")
+
+    assert [result["bug_id"] for result in found["results"]] == ["2", "1"]
+    assert found["total_matches"] == 2
+
+
+def test_last_term_matches_as_prefix():
+    index = BugSearchIndex()
+    index.add_bugs([bug("1", "Invoice export broken"), bug("2", "Inventory sync")])
+
+    assert [result["bug_id"] for result in index.search("invo")["results"]] == ["1"]
+
+
+def test_component_filter_and_limit():
+    index = BugSearchIndex()
+    index.add_bugs([bug(str(i), "Report totals wrong", "Web" if i % 2 else "Mobile") for i in range(10)])
+
+    found = index.search("report", limit=2, component="web")
+
+    assert len(found["results"]) == 2
+    assert found["total_matches"] == 5
+    assert all(result["component"] == "Web" for result in found["results"])
+
+
+def test_least_recently_seen_bugs_are_evicted():
+    index = BugSearchIndex(max_bugs=2)
+    index.add_bugs([bug("1", "alpha"), bug("2", "beta")])
+    index.add_bugs([bug("1", "alpha"), bug("3", "gamma")])
+
+    assert index.search("beta")["results"] == []
+    assert index.stats()["indexed_bugs"] == 2
@@ -0,0 +1,149 @@
+import io
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+from app.routers import bugzilla
+from app.services.bug_columns import columnlist_param, parse_csv_lines, project_rows
+from app.services.http import StreamedBody, read_body
+
+
+class CountingBody(io.BytesIO):
+    """Response body that counts the bytes handed out"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.served = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.served += len(data)
+        return data
+
+
+def make_response(body, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = CountingBody(body)
+    response.url = "http://bugzilla.invalid/buglist.cgi"
+    response.encoding = "utf-8"
+    return response
+
+
+def csv_body(rows, headers="bug_id,short_desc,component"):
+    lines = [headers] + [f'{i},"Bug {i}, with a comma",API' for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class TestStreamedBody:
+    def test_read_keeps_content_on_the_response(self):
+        response = make_response(b'{"ok": true}')
+
+        assert StreamedBody(response, max_bytes=100).read() == b'{"ok": true}'
+        assert response.json() == {"ok": True}
+
+    def test_body_over_limit_fails_with_502(self):
+        response = make_response(b"x" * 1000)
+
+        with pytest.raises(HTTPException) as raised:
+            read_body(response, max_bytes=100)
+        assert raised.value.status_code == 502
+        assert "bugzilla.invalid" in raised.value.detail
+
+    def test_body_at_limit_is_read(self):
+        assert read_body(make_response(b"x" * 100), max_bytes=100) == b"x" * 100
+
+    def test_lines_decode_characters_split_across_chunks(self):
+        text = "bug_id,short_desc\n1,Café crashes\n2,naïve check"
+        body = StreamedBody(make_response(text.encode()), max_bytes=100, chunk_size=3)
+
+        assert list(body.lines()) == ["bug_id,short_desc\n", "1,Café crashes\n", "2,naïve check"]
+
+    def test_lines_over_limit_fail_with_502(self):
+        body = StreamedBody(make_response(csv_body(100)), max_bytes=200, chunk_size=64)
+
+        with pytest.raises(HTTPException) as raised:
+            list(body.lines())
+        assert raised.value.status_code == 502
+
+
+class TestParseCsvLines:
+    def test_quoted_cells_keep_commas_and_newlines(self):
+        lines = ['bug_id,short_desc\n', '1,"Fails, ""badly""\n', 'on retry"\n']
+
+        headers, rows = parse_csv_lines(lines)
+
+        assert headers == ["bug_id", "short_desc"]
+        assert rows == [["1", 'Fails, "badly"\non retry']]
+
+    def test_stops_reading_after_max_rows(self):
+        response = make_response(csv_body(2000))
+        body = StreamedBody(response, chunk_size=256)
+
+        headers, rows = parse_csv_lines(body.lines(), max_rows=5)
+
+        assert headers == ["bug_id", "short_desc", "component"]
+        assert [row[0] for row in rows] == ["0", "1", "2", "3", "4"]
+        assert response.raw.served < len(csv_body(2000)) // 10
+
+
+class TestColumnProjection:
+    def test_columnlist_leaves_out_bug_id(self):
+        assert columnlist_param(["bug_id", "short_desc", "component"]) == "short_desc,component"
+
+    def test_keeps_requested_columns_and_reports_differences(self):
+        headers = ["bug_id", "short_desc", "priority"]
+        rows = [["1", "Crash", "High"], ["2", "short row"]]
+
+        bugs, missing, unexpected = project_rows(headers, rows, ["bug_id", "short_desc", "component"])
+
+        assert bugs == [{"bug_id": "1", "short_desc": "Crash"}]
+        assert missing == ["component"]
+        assert unexpected == ["priority"]
+
+    def test_no_columns_keeps_everything(self):
+        bugs, missing, unexpected = project_rows(["bug_id", "priority"], [["1", "High"]])
+
+        assert bugs == [{"bug_id": "1", "priority": "High"}]
+        assert missing == unexpected == []
+
+
+class TestFetchBugList:
+    @pytest.fixture
+    def upstream(self, monkeypatch):
+        """Serves `body` for every buglist.cgi request and records the query parameters"""
+        calls = []
+        upstream = {"body": csv_body(3), "calls": calls}
+
+        def bugzilla_get(url, params, session=None):
+            calls.append(params)
+            return make_response(upstream["body"])
+
+        monkeypatch.setattr(bugzilla, "bugzilla_get", bugzilla_get)
+        monkeypatch.setattr(bugzilla, "COLUMN_PROJECTION", True)
+        monkeypatch.setattr(bugzilla, "COLUMN_BASELINE", False)
+        monkeypatch.setitem(bugzilla.REPORT_COLUMNS, "test", ("bug_id", "short_desc"))
+        return upstream
+
+    def test_requests_and_keeps_only_report_columns(self, upstream):
+        bugs = bugzilla.fetch_bug_list({"product": "BizomWeb"}, "test")
+
+        assert upstream["calls"] == [{"product": "BizomWeb", "columnlist": "short_desc"}]
+        assert bugs[0] == {"bug_id": "0", "short_desc": "Bug 0, with a comma"}
+        assert len(bugs) == 3
+
+    def test_download_is_cut_one_row_past_max_bugs(self, upstream):
+        upstream["body"] = csv_body(50)
+
+        bugs = bugzilla.fetch_bug_list({}, "test", max_bugs=10)
+
+        assert len(bugs) == 11
+        assert bugzilla.limit_bugs(bugs, 10) == (bugs[:10], True)
+
+    def test_response_without_bug_id_fails_with_502(self, upstream):
+        upstream["body"] = b"short_desc\nCrash\n"
+
+        with pytest.raises(HTTPException) as raised:
+            bugzilla.fetch_bug_list({}, "test")
+        assert raised.value.status_code == 502
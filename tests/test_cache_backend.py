@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from app.services.cache_backend import (
+    CacheBackend, MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend, create_cache_backend
+)
+from tests.resp_server import RespServer
+
+
+@pytest.fixture
+def resp_server():
+    server = RespServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryCacheBackend()
+    elif request.param == "sqlite":
+        yield SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    else:
+        server = RespServer()
+        backend = RedisCacheBackend(port=server.port)
+        yield backend
+        backend.close()
+        server.close()
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_set_and_get_round_trip_json_values(backend):
+    value = {"data": [1, 2, {"team": "OS"}], "fetched_at": 1.5, "refresh_error": None}
+
+    backend.set("report:priority:OS", value)
+
+    assert backend.get("report:priority:OS") == value
+    assert backend.get("report:priority:QA") is None
+
+
+def test_set_replaces_value(backend):
+    backend.set("key", "first")
+    backend.set("key", "second")
+
+    assert backend.get("key") == "second"
+
+
+def test_add_only_sets_missing_keys(backend):
+    assert backend.add("lock", True, 60) is True
+    assert backend.add("lock", False, 60) is False
+    assert backend.get("lock") is True
+
+
+def test_delete(backend):
+    backend.set("key", "value")
+
+    backend.delete("key")
+    backend.delete("missing")
+
+    assert backend.get("key") is None
+    assert backend.add("key", "again") is True
+
+
+def test_entries_expire_after_ttl(backend):
+    backend.set("short", "value", 0.05)
+    backend.set("long", "value", 60)
+    backend.set("forever", "value")
+
+    time.sleep(0.1)
+
+    assert backend.get("short") is None
+    assert backend.get("long") == "value"
+    assert backend.get("forever") == "value"
+
+
+def test_add_takes_over_expired_key(backend):
+    backend.add("lock", "first", 0.05)
+
+    time.sleep(0.1)
+
+    assert backend.add("lock", "second", 60) is True
+    assert backend.get("lock") == "second"
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SQLiteCacheBackend(path)
+    second = SQLiteCacheBackend(path)
+
+    first.set("key", "value")
+
+    assert second.get("key") == "value"
+    assert second.add("key", "other") is False
+
+
+def test_redis_backend_authenticates_and_selects_database():
+    server = RespServer(password="secret")
+    try:
+        backend = create_cache_backend(f"redis://:secret@127.0.0.1:{server.port}/2")
+        backend.set("key", "value")
+
+        assert backend.get("key") == "value"
+        assert (2, "key") in server.data
+    finally:
+        server.close()
+
+
+def test_redis_backend_reports_server_errors(resp_server):
+    backend = RedisCacheBackend(port=resp_server.port, password="wrong")
+
+    with pytest.raises(RuntimeError):
+        backend.get("key")
+
+
+def test_redis_backend_reconnects_after_connection_loss(resp_server):
+    backend = RedisCacheBackend(port=resp_server.port)
+    backend.set("key", "value")
+    for conn in backend._idle:
+        conn._sock.shutdown(2)
+
+    assert backend.get("key") == "value"
+
+
+def test_redis_backend_runs_commands_concurrently():
+    server = RespServer(delay=0.1)
+    backend = RedisCacheBackend(port=server.port, max_connections=8)
+    try:
+        started = time.monotonic()
+        threads = [threading.Thread(target=backend.set, args=(f"key{i}", i)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Serialized over one socket this would take at least 0.8 seconds
+        assert time.monotonic() - started < 0.5
+        assert server.connections == 8
+        assert sorted(key for _, key in server.data) == [f"key{i}" for i in range(8)]
+        # Idle connections are reused instead of opening new ones
+        backend.get("key0")
+        assert server.connections == 8
+    finally:
+        backend.close()
+        server.close()
+
+
+def test_redis_backend_limits_open_connections():
+    server = RespServer(delay=0.02)
+    backend = RedisCacheBackend(port=server.port, max_connections=2)
+    try:
+        threads = [threading.Thread(target=backend.set, args=(f"key{i}", i)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert server.connections <= 2
+        assert [backend.get(f"key{i}") for i in range(10)] == list(range(10))
+    finally:
+        backend.close()
+        server.close()
@@ -0,0 +1,182 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import app.jobs
+import app.routers.jobs
+from app.jobs import AsyncJobMiddleware
+from app.services import cache_backend
+from app.services.cache_backend import MemoryCacheBackend
+from app.services.jobs import JobStore, job_key
+
+
+class Clock:
+    """Stands in for time.time() in the cache backend, so entries can be expired"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store():
+    return JobStore(ttl_seconds=60, backend=MemoryCacheBackend())
+
+
+def test_job_key_ignores_parameter_order():
+    key = job_key("GET", "/reports/digest", [("team", "OS"), ("days", "3")])
+
+    assert key == job_key("GET", "/reports/digest", [("days", "3"), ("team", "OS")])
+    assert key != job_key("GET", "/reports/digest", [("team", "OS"), ("days", "7")])
+    assert key != job_key("GET", "/reports/other", [("team", "OS"), ("days", "3")])
+
+
+class TestJobStore:
+    def test_identical_request_joins_queued_and_running_job(self, store):
+        job, existing = store.submit("GET", "/reports/digest", "key")
+        assert existing is False
+
+        assert store.submit("GET", "/reports/digest", "key") == (job, True)
+        store.start(job)
+        joined, existing = store.submit("GET", "/reports/digest", "key")
+        assert (joined["id"], joined["status"], existing) == (job["id"], "running", True)
+
+    def test_finished_job_is_kept_but_not_joined(self, store):
+        job, _ = store.submit("GET", "/reports/digest", "key")
+        store.start(job)
+        store.finish(job, "key", 200, {"status": "success"})
+
+        new_job, existing = store.submit("GET", "/reports/digest", "key")
+
+        assert existing is False
+        assert new_job["id"] != job["id"]
+        finished = store.get(job["id"])
+        assert finished["status"] == "succeeded"
+        assert finished["result"] == {"status": "success"}
+        assert finished["duration_ms"] >= 0
+
+    def test_error_status_fails_the_job(self, store):
+        job, _ = store.submit("GET", "/reports/digest", "key")
+        store.start(job)
+        store.finish(job, "key", 502, {"detail": "Bugzilla down"})
+
+        assert store.get(job["id"])["status"] == "failed"
+        assert store.get(job["id"])["status_code"] == 502
+
+    def test_different_keys_run_separately(self, store):
+        first, _ = store.submit("GET", "/reports/digest", "one")
+        second, existing = store.submit("GET", "/reports/digest", "two")
+
+        assert existing is False
+        assert first["id"] != second["id"]
+
+    def test_records_expire_after_ttl(self, store, monkeypatch):
+        clock = Clock()
+        monkeypatch.setattr(cache_backend, "time", SimpleNamespace(time=clock))
+        job, _ = store.submit("GET", "/reports/digest", "key")
+
+        clock.now += 59
+        assert store.get(job["id"])["status"] == "queued"
+        clock.now += 2
+        assert store.get(job["id"]) is None
+
+        new_job, existing = store.submit("GET", "/reports/digest", "key")
+        assert existing is False
+        assert new_job["id"] != job["id"]
+
+    def test_key_left_by_an_expired_job_is_replaced(self, store):
+        job, _ = store.submit("GET", "/reports/digest", "key")
+        store.backend.delete(f"job:{job['id']}")
+
+        new_job, existing = store.submit("GET", "/reports/digest", "key")
+
+        assert existing is False
+        assert store.backend.get("job-key:key") == new_job["id"]
+
+
+class TestAsyncJobMiddleware:
+    @pytest.fixture
+    def client(self, monkeypatch, store):
+        self.release = threading.Event()
+        self.calls = []
+
+        api = FastAPI()
+        api.include_router(app.routers.jobs.router)
+
+        @api.get("/reports/slow")
+        def slow(team: str = "OS", days: int = 3):
+            self.calls.append((team, days))
+            assert self.release.wait(5)
+            return {"team": team, "days": days}
+
+        @api.get("/reports/missing")
+        def missing():
+            raise HTTPException(status_code=404, detail="No such report")
+
+        api.add_middleware(AsyncJobMiddleware)
+        monkeypatch.setattr(app.jobs, "get_job_store", lambda: store)
+        monkeypatch.setattr(app.routers.jobs, "get_job_store", lambda: store)
+        with TestClient(api) as client:
+            yield client
+            self.release.set()
+
+    def wait_for_job(self, client, job_id):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] not in ("queued", "running"):
+                return job
+            time.sleep(0.01)
+        raise AssertionError(f"Job {job_id} did not finish")
+
+    def test_identical_requests_share_one_run(self, client):
+        first = client.get("/reports/slow", params={"team": "OS", "days": 3, "async": "true"})
+        second = client.get("/reports/slow", params={"async": "true", "days": 3, "team": "OS"})
+
+        assert first.status_code == second.status_code == 202
+        assert first.headers["Location"] == f"/jobs/{first.json()['job_id']}"
+        assert second.json()["job_id"] == first.json()["job_id"]
+        assert second.json()["existing_job"] is True
+
+        self.release.set()
+        job = self.wait_for_job(client, first.json()["job_id"])
+
+        assert job["status"] == "succeeded"
+        assert job["result"] == {"team": "OS", "days": 3}
+        assert self.calls == [("OS", 3)]
+
+    def test_finished_job_does_not_block_a_new_run(self, client):
+        self.release.set()
+        first = client.get("/reports/slow", params={"async": "true"}).json()["job_id"]
+        self.wait_for_job(client, first)
+
+        second = client.get("/reports/slow", params={"async": "true"}).json()
+
+        assert second["job_id"] != first
+        assert second["existing_job"] is False
+
+    def test_failed_request_is_stored_with_its_status(self, client):
+        job_id = client.get("/reports/missing", params={"async": "true"}).json()["job_id"]
+
+        job = self.wait_for_job(client, job_id)
+
+        assert job["status"] == "failed"
+        assert job["status_code"] == 404
+        assert job["result"] == {"detail": "No such report"}
+
+    def test_request_without_async_runs_inline(self, client):
+        self.release.set()
+
+        response = client.get("/reports/slow", params={"async": "false"})
+
+        assert response.status_code == 200
+        assert response.json() == {"team": "OS", "days": 3}
+
+    def test_unknown_job_is_not_found(self, client):
+        assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,126 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import bugzilla
+from app.services.cache_backend import MemoryCacheBackend
+from app.services.pivot import encode_rows, parse_filters, pivot
+from app.services.report_cache import ReportCache
+
+FIELDS = ("version", "bug_status", "component")
+
+BUGS = [
+    {"bug_id": "1", "version": "OS", "bug_status": "CONFIRMED", "component": "API"},
+    {"bug_id": "2", "version": "OS", "bug_status": "CONFIRMED", "component": "Aqua"},
+    {"bug_id": "3", "version": "OS", "bug_status": "IN_PROGRESS", "component": "API"},
+    {"bug_id": "4", "version": "Mobile", "bug_status": "CONFIRMED", "component": "API"},
+    {"bug_id": "5", "version": "Mobile", "bug_status": "NEEDS_INFO"}
+]
+
+
+@pytest.fixture
+def snapshot():
+    return encode_rows(BUGS, FIELDS)
+
+
+def test_encode_rows_stores_each_value_once(snapshot):
+    assert snapshot["rows"] == 5
+    assert snapshot["fields"]["version"] == {"values": ["OS", "Mobile"], "codes": [0, 0, 0, 1, 1]}
+    # A missing field is encoded as an empty value
+    assert snapshot["fields"]["component"]["values"] == ["API", "Aqua", ""]
+
+
+def test_two_axis_pivot(snapshot):
+    result = pivot(snapshot, "version", "bug_status")
+
+    assert result["x_values"] == ["OS", "Mobile"]
+    assert result["y_values"] == ["CONFIRMED", "IN_PROGRESS", "NEEDS_INFO"]
+    assert result["counts"] == [[2, 1, 0], [1, 0, 1]]
+    assert result["row_totals"] == [3, 2]
+    assert result["column_totals"] == [3, 1, 1]
+    assert result["total"] == 5
+
+
+def test_one_axis_pivot_counts_rows(snapshot):
+    result = pivot(snapshot, "component")
+
+    assert result["y_values"] == ["count"]
+    assert result["counts"] == [[3], [1], [1]]
+
+
+def test_filters_combine_and_drop_empty_values(snapshot):
+    filters = parse_filters(["bug_status:CONFIRMED", "bug_status:NEEDS_INFO", "component:API"])
+
+    result = pivot(snapshot, "version", "bug_status", filters)
+
+    assert result["x_values"] == ["OS", "Mobile"]
+    assert result["y_values"] == ["CONFIRMED"]
+    assert result["counts"] == [[1], [1]]
+    assert result["total"] == 2
+
+
+def test_filter_matching_nothing_gives_empty_pivot(snapshot):
+    result = pivot(snapshot, "version", "bug_status", parse_filters(["component:Unknown"]))
+
+    assert result["x_values"] == result["y_values"] == result["counts"] == []
+    assert result["total"] == 0
+
+
+def test_empty_snapshot():
+    result = pivot(encode_rows([], FIELDS), "version", "bug_status")
+
+    assert result["counts"] == []
+    assert result["total"] == 0
+
+
+def test_parse_filters_groups_values_by_field():
+    assert parse_filters([" version : OS", "version:Mobile", "priority:High"]) == [
+        ("version", ["OS", "Mobile"]),
+        ("priority", ["High"])
+    ]
+    assert parse_filters(None) == []
+
+
+def test_parse_filters_requires_separator():
+    with pytest.raises(ValueError):
+        parse_filters(["version"])
+
+
+class TestPivotEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        self.fetches = 0
+
+        def fetch_bug_list(params, report, session=None, max_bugs=None):
+            self.fetches += 1
+            return BUGS
+
+        monkeypatch.setattr(bugzilla, "report_cache", ReportCache(backend=MemoryCacheBackend()))
+        monkeypatch.setattr(bugzilla, "fetch_bug_list", fetch_bug_list)
+        monkeypatch.setattr(bugzilla, "PIVOT_FIELDS", FIELDS)
+        return TestClient(app)
+
+    def test_breakdowns_share_one_fetch(self, client):
+        by_status = client.get("/bugzilla/pivot").json()["data"]
+        by_component = client.get(
+            "/bugzilla/pivot",
+            params={"x_axis": "component", "y_axis": "", "filter": "version:OS"}
+        ).json()["data"]
+
+        assert by_status["counts"] == [[2, 1, 0], [1, 0, 1]]
+        assert by_status["truncated"] is False
+        assert by_component["x_values"] == ["API", "Aqua"]
+        assert by_component["counts"] == [[2], [1]]
+        assert self.fetches == 1
+
+    def test_unknown_field_is_rejected(self, client):
+        response = client.get("/bugzilla/pivot", params={"x_axis": "reporter"})
+
+        assert response.status_code == 400
+        assert "reporter" in response.json()["detail"]
+        assert self.fetches == 0
+
+    def test_malformed_filter_is_rejected(self, client):
+        response = client.get("/bugzilla/pivot", params={"filter": "version"})
+
+        assert response.status_code == 400
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+from app.services.profiler import StackSampler, current_sampler, run_in_threadpool, sampled
+
+
+def busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def run_thread(name, target, *args):
+    thread = threading.Thread(target=target, args=args, name=name)
+    thread.start()
+    return thread
+
+
+def sampled_thread_names(sampler):
+    return {stack.split(";", 1)[0] for stack in sampler.stacks}
+
+
+def test_only_registered_threads_are_sampled():
+    sampler = StackSampler(0.002)
+    token = current_sampler.set(sampler)
+    try:
+        profiled = sampled(busy)
+    finally:
+        current_sampler.reset(token)
+
+    sampler.start()
+    threads = [run_thread("request-worker", profiled, 0.1), run_thread("other-request", busy, 0.1)]
+    for thread in threads:
+        thread.join()
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert sampled_thread_names(sampler) == {"request-worker"}
+
+
+def test_thread_is_unregistered_when_the_call_returns():
+    sampler = StackSampler(0.002)
+    token = current_sampler.set(sampler)
+    try:
+        sampled(lambda: None)()
+    finally:
+        current_sampler.reset(token)
+
+    assert not sampler._threads
+
+
+def test_sampled_returns_func_unchanged_outside_a_profiled_request():
+    assert sampled(busy) is busy
+
+
+def test_run_in_threadpool_samples_worker_of_profiled_request_only():
+    sampler = StackSampler(0.002)
+
+    async def profiled_request():
+        current_sampler.set(sampler)
+        await run_in_threadpool(busy, 0.1)
+
+    def other_work(seconds):
+        busy(seconds)
+
+    async def other_request():
+        await run_in_threadpool(other_work, 0.1)
+
+    async def main():
+        sampler.start()
+        await asyncio.gather(asyncio.create_task(profiled_request()), asyncio.create_task(other_request()))
+        sampler.stop()
+
+    asyncio.run(main())
+
+    stacks = "".join(sampler.stacks)
+    assert "busy" in stacks
+    assert "other_work" not in stacks
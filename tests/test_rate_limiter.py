@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import bitbucket
+from app.services.rate_limiter import RateLimitExceeded, TokenBucket, parse_retry_after
+
+
+def test_burst_up_to_limit_without_waiting():
+    bucket = TokenBucket(limit=5, window_seconds=3600)
+
+    waits = [bucket.acquire(0) for _ in range(5)]
+
+    assert all(waited < 0.01 for waited in waits)
+    snapshot = bucket.snapshot()
+    assert snapshot["requests"] == 5
+    assert snapshot["remaining"] == 0
+
+
+def test_empty_bucket_rejects_when_refill_exceeds_max_wait():
+    bucket = TokenBucket(limit=2, window_seconds=3600)
+    bucket.acquire(0)
+    bucket.acquire(0)
+
+    with pytest.raises(RateLimitExceeded) as error:
+        bucket.acquire(1)
+
+    # One token refills every 1800 seconds
+    assert error.value.retry_after == pytest.approx(1800, abs=5)
+    assert bucket.snapshot()["rejected"] == 1
+
+
+def test_empty_bucket_waits_for_refill():
+    bucket = TokenBucket(limit=10, window_seconds=1)
+    for _ in range(10):
+        bucket.acquire(0)
+
+    waited = bucket.acquire(1)
+
+    # One token refills every 0.1 seconds
+    assert 0.05 <= waited <= 0.5
+    assert bucket.snapshot()["waits"] == 1
+
+
+def test_server_headers_replace_local_estimate():
+    bucket = TokenBucket(limit=100, window_seconds=3600)
+
+    bucket.observe({"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "1", "X-RateLimit-Resource": "api"})
+
+    bucket.acquire(0)
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(0)
+    snapshot = bucket.snapshot()
+    assert snapshot["server_limit"] == 1000
+    assert snapshot["server_remaining"] == 1
+    assert snapshot["server_resource"] == "api"
+
+
+def test_headers_without_remaining_or_with_bad_values_are_ignored():
+    bucket = TokenBucket(limit=3, window_seconds=3600)
+
+    bucket.observe({})
+    bucket.observe({"X-RateLimit-Remaining": "many"})
+
+    assert bucket.snapshot()["remaining"] == 3
+    assert bucket.snapshot()["server_remaining"] is None
+
+
+def test_pause_blocks_all_callers_until_retry_after():
+    bucket = TokenBucket(limit=100, window_seconds=1)
+
+    bucket.pause(0.2)
+
+    with pytest.raises(RateLimitExceeded) as error:
+        bucket.acquire(0)
+    assert error.value.retry_after == pytest.approx(0.2, abs=0.05)
+    waited = bucket.acquire(1)
+    assert waited >= 0.15
+    assert bucket.snapshot()["throttled"] == 1
+
+
+def test_concurrent_callers_never_exceed_the_bucket():
+    bucket = TokenBucket(limit=20, window_seconds=3600)
+    granted = []
+    rejected = []
+
+    def take():
+        try:
+            bucket.acquire(0)
+            granted.append(1)
+        except RateLimitExceeded:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=take) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 20
+    assert len(rejected) == 30
+
+
+@pytest.mark.parametrize("value, expected", [("30", 30.0), ("0", 0.0), ("-5", 0.0), (None, 60.0), ("soon", 60.0)])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value, 60) == expected
+
+
+def test_bitbucket_request_answers_429_when_quota_is_exhausted(monkeypatch):
+    bucket = TokenBucket(limit=1, window_seconds=3600)
+    bucket.acquire(0)
+    monkeypatch.setattr(bitbucket, "get_bitbucket_limiter", lambda: bucket)
+    monkeypatch.setattr(bitbucket, "RATE_LIMIT_MAX_WAIT", 0)
+    api = bitbucket.BitbucketAPI("user", "password", "bizom", "http://bitbucket.invalid")
+
+    started = time.monotonic()
+    with pytest.raises(HTTPException) as error:
+        api._request("http://bitbucket.invalid/repositories")
+
+    assert time.monotonic() - started < 0.5
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) > 0
@@ -0,0 +1,232 @@
+import threading
+import time
+
+import pytest
+
+from app.services.cache_backend import MemoryCacheBackend
+from app.services.report_cache import ReportCache
+
+
+class Fetcher:
+    """Returns 1, 2, 3, ... on successive calls, or raises once `error` is set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.done = threading.Event()
+
+    def __call__(self):
+        try:
+            if self.error:
+                raise self.error
+            self.calls += 1
+            return self.calls
+        finally:
+            self.done.set()
+
+
+def make_cache(**kwargs):
+    return ReportCache(backend=MemoryCacheBackend(), **kwargs)
+
+
+def age_entry(cache, key, seconds):
+    """Pretend the cached entry for key was fetched `seconds` ago"""
+    entry = cache.backend.get(cache._key(key))
+    entry["fetched_at"] = time.time() - seconds
+    cache.backend.set(cache._key(key), entry)
+
+
+def wait_for_refresh(cache, key, fetch):
+    assert fetch.done.wait(2)
+    deadline = time.time() + 2
+    while cache.backend.get(f"{cache._key(key)}:refreshing") is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_first_get_fetches_and_then_serves_from_cache():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+
+    first = cache.get("report", fetch)
+    second = cache.get("report", fetch)
+
+    assert first["data"] == second["data"] == 1
+    assert fetch.calls == 1
+    assert second["stale"] is False
+    assert second["refresh_error"] is None
+
+
+def test_force_refresh_fetches_synchronously():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+
+    result = cache.get("report", fetch, force_refresh=True)
+
+    assert result["data"] == 2
+    assert result["stale"] is False
+
+
+def test_stale_entry_is_served_while_refreshing_in_background():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 120)
+    fetch.done.clear()
+
+    result = cache.get("report", fetch)
+
+    assert result["data"] == 1
+    assert result["stale"] is True
+    wait_for_refresh(cache, "report", fetch)
+    refreshed = cache.get("report", fetch)
+    assert refreshed["data"] == 2
+    assert refreshed["stale"] is False
+
+
+def test_failed_background_refresh_keeps_last_good_result():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 120)
+    fetch.done.clear()
+    fetch.error = RuntimeError("upstream down")
+
+    cache.get("report", fetch)
+    wait_for_refresh(cache, "report", fetch)
+    result = cache.get("report", fetch)
+
+    assert result["data"] == 1
+    assert result["refresh_error"] == "upstream down"
+
+
+def test_entry_older_than_max_stale_is_fetched_synchronously():
+    cache = make_cache(fresh_seconds=60, max_stale_seconds=600)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 900)
+
+    result = cache.get("report", fetch)
+
+    assert result["data"] == 2
+    assert result["stale"] is False
+
+
+def test_entry_older_than_max_stale_is_served_when_fetch_fails():
+    cache = make_cache(fresh_seconds=60, max_stale_seconds=600)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 900)
+    fetch.error = RuntimeError("upstream down")
+
+    result = cache.get("report", fetch)
+
+    assert result["data"] == 1
+    assert result["stale"] is True
+    assert result["refresh_error"] == "upstream down"
+
+
+@pytest.mark.parametrize("options", [{"force_refresh": True}, {"require_fresh": True}])
+def test_failed_synchronous_fetch_serves_cached_result(options):
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 120)
+    fetch.error = RuntimeError("upstream down")
+
+    result = cache.get("report", fetch, **options)
+
+    assert result["data"] == 1
+    assert result["stale"] is True
+    assert result["refresh_error"] == "upstream down"
+
+
+def test_failed_first_fetch_raises():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    fetch.error = RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("report", fetch)
+
+
+def test_forced_fetch_of_fresh_entry_that_fails_is_flagged_stale():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    fetch.error = RuntimeError("upstream down")
+
+    result = cache.get("report", fetch, force_refresh=True)
+
+    assert result["data"] == 1
+    assert result["stale"] is True
+
+
+def test_require_fresh_fetches_stale_entry_synchronously():
+    cache = make_cache(fresh_seconds=60, max_stale_seconds=600)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+    age_entry(cache, "report", 120)
+
+    result = cache.get("report", fetch, require_fresh=True)
+
+    assert result["data"] == 2
+    assert result["stale"] is False
+
+
+def test_require_fresh_serves_fresh_entry_from_cache():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+    cache.get("report", fetch)
+
+    result = cache.get("report", fetch, require_fresh=True)
+
+    assert result["data"] == 1
+    assert fetch.calls == 1
+
+
+def test_keys_with_different_parameters_are_cached_separately():
+    cache = make_cache(fresh_seconds=60)
+    fetch = Fetcher()
+
+    cache.get(("priority", "OS"), fetch)
+    cache.get(("priority", "QA"), fetch)
+    cache.invalidate(("priority", "OS"))
+    cache.get(("priority", "OS"), fetch)
+    cache.get(("priority", "QA"), fetch)
+
+    assert fetch.calls == 3
+
+
+class TestCurrentDayEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.routers import bugzilla
+
+        self.cache = make_cache(fresh_seconds=60, max_stale_seconds=600)
+        self.fetch = Fetcher()
+        self.cache.get(("current_day",), lambda: {"OS": {"new": 1}})
+        age_entry(self.cache, ("current_day",), 120)
+        self.fetch.error = RuntimeError("Bugzilla down")
+        monkeypatch.setattr(bugzilla, "report_cache", self.cache)
+        monkeypatch.setattr(bugzilla, "fetch_current_day_status", lambda session=None: self.fetch())
+        return TestClient(app)
+
+    def test_default_request_serves_stale_report(self, client):
+        response = client.get("/bugzilla/current-day-status", params={"skip_chat": "true"})
+
+        assert response.status_code == 200
+        assert response.json()["stale"] is True
+
+    def test_require_fresh_falls_back_to_cached_report(self, client):
+        response = client.get(
+            "/bugzilla/current-day-status",
+            params={"skip_chat": "true", "require_fresh": "true"}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["stale"] is True
+        assert body["refresh_error"] == "Bugzilla down"
@@ -0,0 +1,158 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import bugzilla
+from app.services.cache_backend import MemoryCacheBackend
+from app.services.google_chat import GoogleChatService
+from app.services.report_delta import ReportDeltaTracker
+
+KEY = ("priority", "OS")
+
+
+def bug(bug_id, changed="2024-01-01 10:00:00"):
+    return {"bug_id": bug_id, "short_desc": f"Bug {bug_id}", "component": "Web", "assigned_to": "dev", "changeddate": changed}
+
+
+def delivered(ok=True):
+    return {"target": "chat", "delivered": ok, "status_code": 200 if ok else 500, "error": None if ok else "failed"}
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = ReportDeltaTracker(backend=MemoryCacheBackend())
+    monkeypatch.setattr(bugzilla, "report_deltas", tracker)
+    return tracker
+
+
+def test_compare_does_not_move_the_baseline(tracker):
+    first = tracker.compare(KEY, [bug(1)])
+    second = tracker.compare(KEY, [bug(1)])
+
+    assert first["is_baseline"] and second["is_baseline"]
+    assert second["counts"] == {"added": 1, "changed": 0, "removed": 0}
+
+
+def test_compare_against_committed_baseline(tracker):
+    tracker.commit(KEY, [bug(1), bug(2)])
+
+    result = tracker.compare(KEY, [bug(1, "2024-01-02 10:00:00"), bug(3)])
+
+    assert [b["bug_id"] for b in result["added"]] == [3]
+    assert [b["bug_id"] for b in result["changed"]] == [1]
+    assert [b["bug_id"] for b in result["removed"]] == ["2"]
+    assert result["is_baseline"] is False
+
+
+def test_advance_delta_commits_after_successful_delivery(tracker):
+    bugs = [bug(1)]
+    bug_delta = tracker.compare(KEY, bugs)
+
+    bugzilla.advance_delta(KEY, bugs, bug_delta, False, [delivered()])
+
+    assert tracker.compare(KEY, bugs)["counts"]["added"] == 0
+
+
+def test_advance_delta_keeps_baseline_while_card_is_queued(tracker):
+    bugs = [bug(1)]
+    bug_delta = tracker.compare(KEY, bugs)
+
+    bugzilla.advance_delta(KEY, bugs, bug_delta, False, [dict(delivered(False), queued=True)])
+
+    assert tracker.compare(KEY, bugs)["counts"]["added"] == 1
+
+
+@pytest.mark.parametrize("deliveries", [None, [], [delivered(False)], [delivered(), delivered(False)]])
+def test_advance_delta_keeps_baseline_when_delivery_failed(tracker, deliveries):
+    bugs = [bug(1)]
+    bug_delta = tracker.compare(KEY, bugs)
+
+    bugzilla.advance_delta(KEY, bugs, bug_delta, False, deliveries)
+
+    assert tracker.compare(KEY, bugs)["counts"]["added"] == 1
+
+
+def test_advance_delta_keeps_baseline_for_skip_chat_preview(tracker):
+    bugs = [bug(1)]
+    bug_delta = tracker.compare(KEY, bugs)
+
+    bugzilla.advance_delta(KEY, bugs, bug_delta, True, [delivered()])
+
+    assert tracker.compare(KEY, bugs)["counts"]["added"] == 1
+
+
+def test_advance_delta_commits_when_nothing_changed(tracker):
+    bug_delta = tracker.compare(KEY, [])
+
+    bugzilla.advance_delta(KEY, [], bug_delta, False, None)
+
+    assert bug_delta["is_baseline"] is True
+    assert tracker.compare(KEY, [])["is_baseline"] is False
+
+
+class TestPriorityEndpoint:
+    @pytest.fixture
+    def client(self, monkeypatch, tracker):
+        self.bugs = [bug(1)]
+        self.deliveries = [delivered()]
+        self.posted = []
+        self.urgent = []
+
+        async def get_cached_report(key, fetch, refresh=False, require_fresh=False):
+            return {"data": list(self.bugs), "data_age_seconds": 0, "stale": False, "refresh_error": None}
+
+        def deliver(chat_service, payload, urgent=False):
+            self.posted.append(payload)
+            self.urgent.append(urgent)
+            return self.deliveries
+
+        monkeypatch.setattr(bugzilla, "get_cached_report", get_cached_report)
+        monkeypatch.setattr(GoogleChatService, "deliver", deliver)
+        return TestClient(app)
+
+    def get_delta(self, client, **params):
+        response = client.get("/bugzilla/get-priority-bug", params=dict(delta="true", **params))
+        assert response.status_code == 200
+        return response.json()
+
+    def test_failed_post_reports_same_changes_again(self, client):
+        self.deliveries = [delivered(False)]
+        first = self.get_delta(client)
+        self.deliveries = [delivered()]
+        second = self.get_delta(client)
+        third = self.get_delta(client)
+
+        assert first["data"]["delta"]["counts"]["added"] == 1
+        assert second["data"]["delta"]["counts"]["added"] == 1
+        assert third["data"]["delta"]["counts"]["added"] == 0
+        assert len(self.posted) == 2
+
+    def test_skip_chat_preview_does_not_consume_changes(self, client):
+        preview = self.get_delta(client, skip_chat="true")
+        posted = self.get_delta(client)
+
+        assert preview["data"]["delta"]["counts"]["added"] == 1
+        assert posted["data"]["delta"]["counts"]["added"] == 1
+        assert len(self.posted) == 1
+
+    def test_removed_bugs_are_reported_until_posted(self, client):
+        self.get_delta(client)
+        self.bugs = []
+        self.deliveries = [delivered(False)]
+        failed = self.get_delta(client)
+        self.deliveries = [delivered()]
+        posted = self.get_delta(client)
+        quiet = self.get_delta(client)
+
+        assert failed["data"]["delta"]["counts"]["removed"] == 1
+        assert posted["data"]["delta"]["counts"]["removed"] == 1
+        assert quiet["posted_to_chat"] is False
+        assert len(self.posted) == 3
+
+    def test_delta_cards_skip_the_digest_window(self, client):
+        response = client.get("/bugzilla/get-sla-missed-bugs", params={"delta": "true"})
+        plain = client.get("/bugzilla/get-sla-missed-bugs")
+
+        assert response.json()["posted_to_chat"] is True
+        assert plain.json()["posted_to_chat"] is True
+        assert self.urgent == [True, False]
@@ -0,0 +1,131 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import bugzilla
+from app.services.snapshot_store import SnapshotStore, decode_bug_ids, encode_bug_ids
+
+DAY = 86400
+# Midnight UTC of an arbitrary day
+T0 = 20000 * DAY
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots.db"))
+
+
+def test_bug_ids_round_trip_sorted_and_unique():
+    bug_ids = [300000, 5, 5, 127, 128, 2 ** 40]
+
+    assert decode_bug_ids(encode_bug_ids(bug_ids)) == [5, 127, 128, 300000, 2 ** 40]
+    assert decode_bug_ids(encode_bug_ids([])) == []
+
+
+class TestStatusSeries:
+    def test_every_snapshot_in_range(self, store):
+        for hour in range(4):
+            store.record_status_matrix({"OS": {"new": hour, "open": 10}}, T0 + hour * 3600)
+
+        series = store.status_series(T0 + 3600, T0 + 2 * 3600)
+
+        assert series == {"OS": {"new": [[T0 + 3600, 1], [T0 + 7200, 2]], "open": [[T0 + 3600, 10], [T0 + 7200, 10]]}}
+
+    def test_team_and_status_filters_ignore_case(self, store):
+        store.record_status_matrix({"OS": {"new": 1, "open": 2}, "Mobile": {"new": 3}}, T0)
+
+        series = store.status_series(T0, T0, teams=["os"], statuses=["NEW"])
+
+        assert series == {"OS": {"new": [[T0, 1]]}}
+
+    def test_buckets_keep_the_last_snapshot(self, store):
+        for minute in (0, 20, 40, 60, 80):
+            store.record_status_matrix({"OS": {"new": minute}}, T0 + minute * 60)
+
+        series = store.status_series(T0, T0 + DAY, bucket_seconds=3600)
+
+        assert series["OS"]["new"] == [[T0 + 2400, 40], [T0 + 4800, 80]]
+
+    def test_day_buckets_use_the_daily_rollup(self, store):
+        for day in range(3):
+            for hour in (1, 12, 23):
+                store.record_status_matrix({"OS": {"new": day * 100 + hour}}, T0 + day * DAY + hour * 3600)
+        store.record_status_matrix({"OS": {"new": 1}}, T0 + 3600)
+
+        series = store.status_series(T0, T0 + 3 * DAY, bucket_seconds=DAY)
+
+        assert series["OS"]["new"] == [[T0 + 23 * 3600, 23], [T0 + DAY + 23 * 3600, 123], [T0 + 2 * DAY + 23 * 3600, 223]]
+
+    def test_day_buckets_stop_at_the_end_of_the_range(self, store):
+        for day in range(2):
+            for hour in (1, 12, 23):
+                store.record_status_matrix({"OS": {"new": day * 100 + hour}}, T0 + day * DAY + hour * 3600)
+
+        series = store.status_series(T0, T0 + DAY + 12 * 3600, bucket_seconds=DAY)
+
+        assert series["OS"]["new"] == [[T0 + 23 * 3600, 23], [T0 + DAY + 12 * 3600, 112]]
+
+    def test_history_survives_a_new_store(self, tmp_path):
+        SnapshotStore(str(tmp_path / "snapshots.db")).record_status_matrix({"OS": {"new": 1}}, T0)
+
+        assert SnapshotStore(str(tmp_path / "snapshots.db")).status_series(T0, T0) == {"OS": {"new": [[T0, 1]]}}
+
+
+class TestBugCountSeries:
+    def test_counts_and_bug_ids_per_team(self, store):
+        store.record_bug_set("priority", "OS", [3, 1, 2], T0)
+        store.record_bug_set("priority", "OS", [1], T0 + 60)
+        store.record_bug_set("priority", "Mobile", [7], T0)
+        store.record_bug_set("sla_missed:3", "OS", [9], T0)
+
+        assert store.bug_count_series("priority", T0, T0 + 60, teams=["OS"]) == {"OS": [[T0, 3], [T0 + 60, 1]]}
+        assert store.bug_count_series("priority", T0, T0, include_bug_ids=True) == {
+            "OS": [[T0, 3, [1, 2, 3]]],
+            "Mobile": [[T0, 1, [7]]]
+        }
+
+    def test_buckets_keep_the_last_set(self, store):
+        for minute in (0, 30, 60):
+            store.record_bug_set("priority", "OS", range(minute + 1), T0 + minute * 60)
+
+        series = store.bug_count_series("priority", T0, T0 + DAY, bucket_seconds=3600, include_bug_ids=True)
+
+        assert [point[:2] for point in series["OS"]] == [[T0 + 1800, 31], [T0 + 3600, 61]]
+        assert series["OS"][0][2] == list(range(31))
+
+    def test_unknown_report_is_empty(self, store):
+        store.record_bug_set("priority", "OS", [1], T0)
+
+        assert store.bug_count_series("unknown", T0, T0) == {}
+
+
+class TestSlaTrends:
+    @pytest.fixture
+    def client(self, monkeypatch, store):
+        monkeypatch.setattr(bugzilla, "get_snapshot_store", lambda: store)
+        return TestClient(app)
+
+    def record_sla_run(self, monkeypatch, days, bug_ids):
+        rows = [{"bug_id": str(bug_id)} for bug_id in bug_ids]
+        monkeypatch.setattr(bugzilla, "fetch_bug_list", lambda *args, **kwargs: rows)
+        bugzilla.fetch_sla_missed_bugs("OS", days)
+
+    def trend(self, client, report):
+        response = client.get("/bugzilla/trends", params={"report": report, "include_bug_ids": "true"})
+        assert response.status_code == 200
+        return response.json()["data"]["series"]
+
+    def test_look_back_windows_are_separate_series(self, monkeypatch, client):
+        self.record_sla_run(monkeypatch, 3, [1, 2])
+        self.record_sla_run(monkeypatch, 7, [1, 2, 3, 4])
+
+        default = self.trend(client, "sla_missed")
+        week = self.trend(client, "sla_missed:7")
+
+        assert [point[1:] for point in default["OS"]] == [[2, [1, 2]]]
+        assert [point[1:] for point in week["OS"]] == [[4, [1, 2, 3, 4]]]
+
+    def test_unset_look_back_is_recorded_as_default(self, monkeypatch, client):
+        self.record_sla_run(monkeypatch, 0, [5])
+
+        assert [point[1] for point in self.trend(client, "sla_missed:3")["OS"]] == [1]
@@ -0,0 +1,116 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+from app.services.http import read_body
+from app.services.traffic import Cassette, RecordingAdapter, ReplayAdapter
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves /size/<n> as n bytes of text and sets a session cookie"""
+
+    def do_GET(self):
+        body = b"x" * int(self.path.rsplit("/", 1)[-1])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=abc; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def recording_session(cassette, max_bytes):
+    session = requests.Session()
+    session.mount("http://", RecordingAdapter(cassette, max_bytes=max_bytes))
+    return session
+
+
+def replay_session(cassette):
+    session = requests.Session()
+    session.mount("http://", ReplayAdapter(cassette, speed=0))
+    return session
+
+
+def recorded(cassette):
+    with open(cassette.path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestRecording:
+    def test_small_body_is_recorded_whole(self, upstream, tmp_path):
+        cassette = Cassette(str(tmp_path), "test")
+        session = recording_session(cassette, max_bytes=100)
+
+        response = session.get(f"{upstream}/size/50", stream=True)
+
+        assert read_body(response) == b"x" * 50
+        assert session.cookies.get("session") == "abc"
+        [entry] = recorded(cassette)
+        assert entry["body"] == "x" * 50
+        assert entry["truncated"] is False
+
+    def test_large_body_is_capped_but_reaches_the_caller_whole(self, upstream, tmp_path):
+        cassette = Cassette(str(tmp_path), "test")
+        session = recording_session(cassette, max_bytes=100)
+
+        response = session.get(f"{upstream}/size/5000", stream=True)
+
+        assert read_body(response, max_bytes=10000) == b"x" * 5000
+        [entry] = recorded(cassette)
+        assert entry["body"] == "x" * 100
+        assert entry["truncated"] is True
+
+    def test_caller_limit_still_applies(self, upstream, tmp_path):
+        session = recording_session(Cassette(str(tmp_path), "test"), max_bytes=100)
+
+        response = session.get(f"{upstream}/size/5000", stream=True)
+
+        with pytest.raises(HTTPException) as raised:
+            read_body(response, max_bytes=1000)
+        assert raised.value.status_code == 502
+
+    def test_non_streamed_request_reads_the_rest(self, upstream, tmp_path):
+        session = recording_session(Cassette(str(tmp_path), "test"), max_bytes=100)
+
+        assert session.get(f"{upstream}/size/5000").content == b"x" * 5000
+
+
+class TestReplay:
+    def test_replays_recorded_body(self, upstream, tmp_path):
+        cassette = Cassette(str(tmp_path), "test")
+        recording_session(cassette, max_bytes=100).get(f"{upstream}/size/50").content
+
+        session = replay_session(Cassette(str(tmp_path), "test"))
+        response = session.get(f"{upstream}/size/50", stream=True)
+
+        assert read_body(response) == b"x" * 50
+        # Cookie values are redacted in the recording, but the cookie is still set
+        assert "session" in session.cookies
+
+    def test_truncated_recording_fails_after_recorded_part(self, upstream, tmp_path):
+        cassette = Cassette(str(tmp_path), "test")
+        recording_session(cassette, max_bytes=100).get(f"{upstream}/size/5000").content
+
+        session = replay_session(Cassette(str(tmp_path), "test"))
+        response = session.get(f"{upstream}/size/5000", stream=True)
+
+        assert response.raw.read(100) == b"x" * 100
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            session.get(f"{upstream}/size/5000").content